@@ -0,0 +1,244 @@
+# ==========================================
+# ANALISIS OSILOMETRIK KURVA TEKANAN (NUMPY)
+# ==========================================
+#
+# Memproses banyak kurva (waveform.py) sekaligus. Kurva dikemas menjadi
+# matriks (n_kurva x panjang_maks) berisi NaN untuk padding, lalu semua
+# perhitungan dilakukan per kolom tanpa loop Python per sampel.
+#
+# Metrik per kurva:
+# - laju inflasi (awal -> puncak) dan laju deflasi (regresi linier
+#   puncak -> akhir), mmHg/s;
+# - envelope amplitudo osilasi (RMS bergerak dari tekanan dikurangi
+#   baseline rata-rata bergerak);
+# - estimasi MAP: baseline pada titik envelope maksimum saat deflasi;
+# - tanda kebocoran (bandingkan dengan error 0x02) dan tekanan berlebih
+#   (bandingkan dengan error 0x07 / 0x10).
+
+import glob
+import os
+from typing import NamedTuple
+
+import numpy as np
+
+from waveform import CURVE_SUFFIX, load_curve, outcome_code
+
+BASELINE_WINDOW = 2.0
+ENVELOPE_WINDOW = 1.0
+MIN_PEAK_PRESSURE = 60
+MAX_DEFLATION_RATE = 15.0
+OVER_PRESSURE_LIMIT = 290
+
+ERROR_LEAK = 0x02
+ERROR_OVER_PRESSURE = (0x07, 0x10)
+
+
+class CurveBatch(NamedTuple):
+    """Kurva yang sudah dikemas. `times` relatif terhadap sampel pertama."""
+    times: np.ndarray
+    pressures: np.ndarray
+    lengths: np.ndarray
+    mask: np.ndarray
+    outcomes: np.ndarray
+    devices: list
+
+
+class CurveMetrics(NamedTuple):
+    peak_pressure: np.ndarray
+    inflation_rate: np.ndarray
+    deflation_rate: np.ndarray
+    map_estimate: np.ndarray
+    envelope_peak: np.ndarray
+    leak: np.ndarray
+    over_pressure: np.ndarray
+
+
+# ================= PENGEMASAN =================
+
+def pack_curves(curves) -> CurveBatch:
+    curves = list(curves)
+    n = len(curves)
+    lengths = np.fromiter((len(c.pressures) for c in curves), dtype=np.int64, count=n)
+    width = int(lengths.max()) if n else 0
+
+    times = np.full((n, width), np.nan)
+    pressures = np.full((n, width), np.nan)
+    total = int(lengths.sum())
+    if total:
+        flat_p = np.concatenate([np.asarray(c.pressures, dtype=np.float64) for c in curves])
+        flat_t = np.concatenate([np.asarray(c.timestamps, dtype=np.float64) for c in curves])
+
+        rows = np.repeat(np.arange(n), lengths)
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        cols = np.arange(total) - np.repeat(offsets, lengths)
+
+        pressures[rows, cols] = flat_p
+        times[rows, cols] = flat_t - np.repeat(flat_t[offsets[lengths > 0]], lengths[lengths > 0])
+
+    mask = np.arange(width)[None, :] < lengths[:, None]
+    outcomes = np.fromiter(
+        (outcome_code(c.outcome) for c in curves), dtype=np.int64, count=n
+    )
+    return CurveBatch(times, pressures, lengths, mask, outcomes, [c.device for c in curves])
+
+
+def load_curves(directory: str) -> CurveBatch:
+    paths = sorted(glob.glob(os.path.join(directory, "*" + CURVE_SUFFIX)))
+    return pack_curves(load_curve(p) for p in paths)
+
+
+# ================= OPERASI BERGERAK =================
+
+def _sample_interval(batch: CurveBatch) -> float:
+    dt = np.diff(batch.times, axis=1)
+    dt = dt[np.isfinite(dt) & (dt > 0)]
+    return float(np.median(dt)) if dt.size else 1.0
+
+
+def _moving_mean(values: np.ndarray, mask: np.ndarray, half_width: int) -> np.ndarray:
+    """Rata-rata bergerak terpusat per baris, hanya atas sampel valid."""
+    width = values.shape[1]
+    zero_filled = np.where(mask, values, 0.0)
+    csum = np.zeros((values.shape[0], width + 1))
+    np.cumsum(zero_filled, axis=1, out=csum[:, 1:])
+    ccount = np.zeros((values.shape[0], width + 1))
+    np.cumsum(mask, axis=1, out=ccount[:, 1:])
+
+    cols = np.arange(width)
+    lo = np.clip(cols - half_width, 0, width)
+    hi = np.clip(cols + half_width + 1, 0, width)
+    counts = ccount[:, hi] - ccount[:, lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (csum[:, hi] - csum[:, lo]) / counts
+    return np.where(mask, mean, np.nan)
+
+
+def _half_width(batch: CurveBatch, window: float) -> int:
+    return max(1, int(round(window / _sample_interval(batch) / 2)))
+
+
+def baseline(batch: CurveBatch, window: float = BASELINE_WINDOW) -> np.ndarray:
+    """Tekanan manset tanpa osilasi denyut (rata-rata bergerak `window` detik)."""
+    return _moving_mean(batch.pressures, batch.mask, _half_width(batch, window))
+
+
+def oscillation_envelope(batch: CurveBatch, base: np.ndarray = None,
+                         window: float = ENVELOPE_WINDOW) -> np.ndarray:
+    """Envelope amplitudo osilasi: RMS bergerak dari (tekanan - baseline)."""
+    if base is None:
+        base = baseline(batch)
+    osc = batch.pressures - base
+    return np.sqrt(_moving_mean(osc * osc, batch.mask, _half_width(batch, window)))
+
+
+# ================= METRIK =================
+
+def analyze(batch: CurveBatch,
+            min_peak_pressure: float = MIN_PEAK_PRESSURE,
+            max_deflation_rate: float = MAX_DEFLATION_RATE,
+            over_pressure_limit: float = OVER_PRESSURE_LIMIT) -> CurveMetrics:
+    n, width = batch.pressures.shape
+    if not width:
+        empty = np.full(n, np.nan)
+        no_flag = np.zeros(n, dtype=bool)
+        return CurveMetrics(empty, empty, empty, empty, empty, no_flag, no_flag)
+
+    rows = np.arange(n)
+    cols = np.arange(width)[None, :]
+    mask = batch.mask
+    has_data = batch.lengths > 0
+
+    p = np.where(mask, batch.pressures, -np.inf)
+    peak_idx = np.argmax(p, axis=1)
+    peak = np.where(has_data, p[rows, peak_idx], np.nan)
+
+    t = batch.times
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t_peak = t[rows, peak_idx]
+        p0 = batch.pressures[:, 0]
+        inflation = np.where(t_peak > 0, (peak - p0) / t_peak, np.nan)
+
+        # Regresi linier tekanan terhadap waktu pada segmen deflasi
+        deflating = mask & (cols >= peak_idx[:, None])
+        td = np.where(deflating, t, 0.0)
+        pd = np.where(deflating, batch.pressures, 0.0)
+        count = deflating.sum(axis=1)
+        st = td.sum(axis=1)
+        sp = pd.sum(axis=1)
+        stt = (td * td).sum(axis=1)
+        stp = (td * pd).sum(axis=1)
+        denom = count * stt - st * st
+        deflation = np.where((count >= 2) & (denom > 0), (count * stp - st * sp) / denom, np.nan)
+
+    base = baseline(batch)
+    envelope = oscillation_envelope(batch, base)
+
+    # Di sekitar puncak dan ujung kurva baseline bergerak tidak mengikuti
+    # tekanan (sudut / jendela terpotong), jadi area itu tidak dipakai
+    # untuk mencari titik MAP.
+    edge = _half_width(batch, BASELINE_WINDOW) + _half_width(batch, ENVELOPE_WINDOW)
+    usable = (
+        deflating
+        & (cols >= peak_idx[:, None] + edge)
+        & (cols < batch.lengths[:, None] - edge)
+        & np.isfinite(envelope)
+    )
+    env_deflating = np.where(usable, envelope, -np.inf)
+    map_idx = np.argmax(env_deflating, axis=1)
+    found = np.isfinite(env_deflating[rows, map_idx])
+    map_estimate = np.where(found, base[rows, map_idx], np.nan)
+    envelope_peak = np.where(found, envelope[rows, map_idx], np.nan)
+
+    leak = has_data & ((peak < min_peak_pressure) | (deflation < -max_deflation_rate))
+    over_pressure = has_data & (peak > over_pressure_limit)
+
+    return CurveMetrics(peak, inflation, deflation, map_estimate, envelope_peak, leak, over_pressure)
+
+
+def compare_with_errors(batch: CurveBatch, metrics: CurveMetrics) -> dict:
+    """
+    Membandingkan tanda dari kurva dengan kode error 0x25 yang dilaporkan
+    perangkat: berapa yang cocok, terlewat, dan tanda tanpa error.
+    """
+    reported_leak = batch.outcomes == ERROR_LEAK
+    reported_over = np.isin(batch.outcomes, ERROR_OVER_PRESSURE)
+    summary = {}
+    for name, flagged, reported in (
+        ("leak", metrics.leak, reported_leak),
+        ("over_pressure", metrics.over_pressure, reported_over),
+    ):
+        summary[name] = {
+            "both": int((flagged & reported).sum()),
+            "device_only": int((~flagged & reported).sum()),
+            "curve_only": int((flagged & ~reported).sum()),
+        }
+    return summary
+
+
+# ================= MAIN =================
+
+def main(directory: str):
+    batch = load_curves(directory)
+    if not len(batch.lengths):
+        print(f"Tidak ada file {CURVE_SUFFIX} di {directory}")
+        return
+
+    metrics = analyze(batch)
+    print(f"Kurva dianalisis : {len(batch.lengths)}")
+    print(f"Puncak rata-rata : {np.nanmean(metrics.peak_pressure):.1f} mmHg")
+    print(f"Inflasi rata-rata: {np.nanmean(metrics.inflation_rate):.2f} mmHg/s")
+    print(f"Deflasi rata-rata: {np.nanmean(metrics.deflation_rate):.2f} mmHg/s")
+    print(f"MAP rata-rata    : {np.nanmean(metrics.map_estimate):.1f} mmHg")
+    print(f"Tanda bocor      : {int(metrics.leak.sum())}")
+    print(f"Tanda overpress  : {int(metrics.over_pressure.sum())}")
+    for name, counts in compare_with_errors(batch, metrics).items():
+        print(f"{name:16} : {counts}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Pemakaian: python analysis.py <direktori_kurva>")
+        sys.exit(1)
+    main(sys.argv[1])
@@ -0,0 +1,666 @@
+# ==========================================
+# DECODE ARSIP REKAMAN PARALEL (KOLOMNAR)
+# ==========================================
+#
+# Mengubah banyak file `.bpmcap` (capture.py) menjadi tabel kolom biner yang
+# bisa dibuka dengan mmap / numpy. Setiap file dibagi menjadi rentang blok
+# (sekitar TASK_BYTES data terkompresi), lalu setiap rentang di-decode oleh
+# satu proses di ProcessPoolExecutor. Hasil digabung sesuai urutan rekaman.
+#
+# Batas rentang jatuh di tengah aliran byte tiap alat, jadi satu frame bisa
+# terpotong di dua rentang. Setiap worker menyinkronkan ulang per alat: byte
+# sebelum frame pertama yang sah (0x5A + panjang masuk akal + CRC benar)
+# dikembalikan sebagai "kepala", byte frame terakhir yang belum lengkap
+# sebagai "ekor". Proses induk men-decode ekor rentang sebelumnya + kepala
+# rentang berikutnya, sehingga frame dan statistik decoder sama dengan decode
+# serial (`capture.replay_packets`). Bedanya hanya di sekitar byte rusak di
+# batas rentang: decoder serial bisa menahan frame sampai field length palsu
+# terpenuhi, di sini frame tersebut mendapat waktu potongan yang
+# melengkapinya (lebih awal beberapa milidetik).
+#
+# Struktur direktori hasil:
+#     <kolom>.bin   satu file per kolom, nilai little-endian lebar tetap
+#     devices.txt   tabel tag alat, nomor baris = nilai kolom `device`
+#     meta.json     tipe kolom, jumlah baris, nama kind, teks Device ID,
+#                   daftar file sumber dan statistik decoder
+#
+# Pemakaian:
+#   python archive.py decode hasil/ rekaman/*.bpmcap
+#   python archive.py decode hasil/ rekaman/ --workers 8 --task-mb 8
+#   python archive.py info hasil/
+
+import json
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from typing import NamedTuple
+
+from capture import FILE_MAGIC, RX, CaptureError, block_index, read_capture
+from crc16 import CRC_LITTLE, check_frame
+from framing import MIN_FRAME_LEN, START_BYTE, FrameDecoder
+from packets import (DeviceId, ErrorReport, ExecStatus, MeasurementResult, RealtimePressure,
+                     StorageCount, StoredResult, decode_packet)
+
+CAPTURE_SUFFIX = ".bpmcap"
+DEVICES_FILE = "devices.txt"
+META_FILE = "meta.json"
+
+# Ukuran data terkompresi per tugas worker
+TASK_BYTES = 4 * 1024 * 1024
+
+# (nama kolom, typecode array)
+COLUMNS = (
+    ("timestamp", "d"),
+    ("device", "I"),
+    ("kind", "B"),
+    ("packet_id", "B"),
+    # realtime: tekanan, exec_status: status, error: kode,
+    # storage_count: jumlah, stored_result: nomor record (-1 = tidak ada)
+    ("value", "i"),
+    ("systolic", "H"),
+    ("diastolic", "H"),
+    ("mean", "H"),
+    ("heart_rate", "H"),
+    ("year", "H"),
+    ("month", "B"),
+    ("day", "B"),
+    ("hour", "B"),
+    ("minute", "B"),
+)
+
+# Urutan sama dengan field MeasurementResult
+RESULT_COLUMNS = ("systolic", "diastolic", "mean", "heart_rate", "year",
+                  "month", "day", "hour", "minute")
+
+# typecode array -> dtype numpy (little-endian)
+DTYPES = {"d": "<f8", "I": "<u4", "B": "u1", "i": "<i4", "H": "<u2", "q": "<i8"}
+
+KINDS = (RealtimePressure, MeasurementResult, ExecStatus, DeviceId, ErrorReport,
+         StorageCount, StoredResult)
+KIND_CODES = {packet_type: code for code, packet_type in enumerate(KINDS)}
+
+DECODER_STATS = (
+    "frames_ok", "crc_errors", "crc_little_endian", "length_errors", "resyncs", "dropped_bytes",
+)
+
+
+class ArchiveError(Exception):
+    """Direktori hasil tidak valid."""
+
+
+# ================= KOLOM =================
+
+class _Columns:
+    """
+    Penampung baris hasil decode dalam array per kolom. Semua frame dari
+    satu potongan rekaman berbagi seq/timestamp/alat, jadi ketiganya
+    disimpan sekali per potongan (run) dan baru diulang saat ditulis. Kolom
+    hasil pengukuran (systolic..minute) hanya disimpan untuk baris 0x22/0x2C.
+    """
+
+    __slots__ = ("devices", "device_index", "kind", "packet_id", "value",
+                 "run_seq", "run_timestamp", "run_device", "run_length",
+                 "result_rows", "result_values", "texts")
+
+    def __init__(self, devices=()):
+        self.devices = list(devices)
+        self.device_index = {name: i for i, name in enumerate(self.devices)}
+        self.kind = array("B")
+        self.packet_id = array("B")
+        self.value = array("i")
+        # Nomor potongan asal (kunci pengurutan saat digabung), waktu, alat
+        self.run_seq = array("q")
+        self.run_timestamp = array("d")
+        self.run_device = array("I")
+        self.run_length = array("I")
+        self.result_rows = array("I")
+        # len(RESULT_COLUMNS) nilai per baris di result_rows
+        self.result_values = array("H")
+        # (baris, teks) untuk record DeviceId
+        self.texts = []
+
+    def __len__(self):
+        return len(self.kind)
+
+    def device(self, name: str) -> int:
+        index = self.device_index.get(name)
+        if index is None:
+            index = self.device_index[name] = len(self.devices)
+            self.devices.append(name)
+        return index
+
+    def add(self, packet_id: int, packet):
+        packet_type = type(packet)
+        if packet_type is RealtimePressure:
+            value = packet.pressure
+        elif packet_type is MeasurementResult:
+            value = 0
+            self.result_rows.append(len(self.kind))
+            self.result_values.extend(packet)
+        elif packet_type is StoredResult:
+            value = packet.index
+            self.result_rows.append(len(self.kind))
+            self.result_values.extend(packet.result)
+        elif packet_type is ExecStatus:
+            value = packet.status
+        elif packet_type is ErrorReport:
+            value = packet.code
+        elif packet_type is StorageCount:
+            value = packet.count
+        else:
+            value = 0
+            self.texts.append((len(self.kind), packet.text))
+        self.kind.append(KIND_CODES[packet_type])
+        self.packet_id.append(packet_id)
+        self.value.append(value)
+
+    def run(self, seq: int, timestamp: float, device: int, rows: int):
+        """`rows` baris terakhir berasal dari potongan `seq`."""
+        if rows:
+            self.run_seq.append(seq)
+            self.run_timestamp.append(timestamp)
+            self.run_device.append(device)
+            self.run_length.append(rows)
+
+    def column(self, name: str, np):
+        """Kolom `name` sebagai array numpy (indeks alat masih lokal)."""
+        if name in RESULT_COLUMNS:
+            column = np.zeros(len(self), dtype=DTYPES[dict(COLUMNS)[name]])
+            if self.result_rows:
+                values = np.frombuffer(self.result_values, dtype=DTYPES["H"])
+                column[np.frombuffer(self.result_rows, dtype=DTYPES["I"])] = \
+                    values[RESULT_COLUMNS.index(name)::len(RESULT_COLUMNS)]
+            return column
+        if name in ("seq", "timestamp", "device"):
+            source = getattr(self, f"run_{name}")
+            runs = np.frombuffer(source, dtype=DTYPES[source.typecode])
+            return np.repeat(runs, np.frombuffer(self.run_length, dtype=DTYPES["I"]))
+        source = getattr(self, name)
+        return np.frombuffer(source, dtype=DTYPES[source.typecode])
+
+
+def _add_frames(columns: _Columns, frames, seq: int, timestamp: float, device: int):
+    rows = len(columns)
+    add = columns.add
+    for frame in frames:
+        packet = decode_packet(frame)
+        if packet is not None:
+            add(frame[2], packet)
+    columns.run(seq, timestamp, device, len(columns) - rows)
+
+
+# ================= WORKER =================
+
+class TaskResult(NamedTuple):
+    columns: _Columns
+    # {tag: [(seq, timestamp, bytes)]} byte sebelum frame sah pertama
+    heads: dict
+    # {tag: bytes} frame terakhir yang belum lengkap (kosong jika belum sinkron)
+    tails: dict
+    # tag yang sudah menemukan frame sah di rentang ini
+    synced: set
+    stats: dict
+
+
+def _find_sync(buf, pos: int):
+    """
+    Posisi frame sah pertama (0x5A, panjang masuk akal, CRC benar) mulai
+    `pos`. Mengembalikan (posisi, -) jika ketemu, atau (-1, posisi_lanjut)
+    jika perlu data tambahan.
+    """
+    end = len(buf)
+    while True:
+        pos = buf.find(START_BYTE, pos)
+        if pos < 0:
+            return -1, end
+        if end - pos < 2:
+            return -1, pos
+        length = buf[pos + 1]
+        if length >= MIN_FRAME_LEN:
+            if end - pos < length:
+                return -1, pos
+            if check_frame(buf[pos:pos + length]):
+                return pos, pos
+        pos += 1
+
+
+class _Syncing:
+    """Alat yang belum menemukan frame sah pertama di rentang ini."""
+
+    __slots__ = ("buf", "pieces", "scan")
+
+    def __init__(self):
+        self.buf = bytearray()
+        # (seq, timestamp, offset awal di buf)
+        self.pieces = []
+        self.scan = 0
+
+
+def _split_head(state: _Syncing, cut: int) -> list:
+    # Potongan pertama selalu ikut (boleh kosong): waktunya dipakai bila ekor
+    # rentang sebelumnya ternyata berisi frame utuh
+    head = []
+    buf = state.buf
+    for i, (seq, timestamp, offset) in enumerate(state.pieces):
+        if offset >= cut and head:
+            break
+        stop = state.pieces[i + 1][2] if i + 1 < len(state.pieces) else len(buf)
+        head.append((seq, timestamp, bytes(buf[offset:min(stop, cut)])))
+    return head
+
+
+def decode_range(path: str, start: int = None, stop: int = None) -> TaskResult:
+    """Decode satu rentang blok [start, stop) dari satu file (jalan di worker)."""
+    stats = {"chunks": 0, "bytes": 0}
+    columns = _Columns()
+    decoders = {}
+    syncing = {}
+    heads = {}
+
+    seq = -1
+    for chunk in read_capture(path, stats=stats, start=start, stop=stop):
+        seq += 1
+        if chunk.direction != RX:
+            continue
+        stats["chunks"] += 1
+        stats["bytes"] += len(chunk.data)
+        device = columns.device(chunk.device)
+
+        decoder = decoders.get(chunk.device)
+        if decoder is not None:
+            decoder.feed(chunk.data)
+            _add_frames(columns, decoder.frames(), seq, chunk.timestamp, device)
+            continue
+
+        state = syncing.get(chunk.device)
+        if state is None:
+            state = syncing[chunk.device] = _Syncing()
+        state.pieces.append((seq, chunk.timestamp, len(state.buf)))
+        state.buf += chunk.data
+        found, state.scan = _find_sync(state.buf, state.scan)
+        if found < 0:
+            continue
+
+        heads[chunk.device] = _split_head(state, found)
+        del syncing[chunk.device]
+        decoder = decoders[chunk.device] = FrameDecoder()
+        decoder.feed(memoryview(state.buf)[found:])
+        _add_frames(columns, decoder.frames(), seq, chunk.timestamp, device)
+
+    for tag, state in syncing.items():
+        heads[tag] = _split_head(state, len(state.buf))
+    for name in DECODER_STATS:
+        stats[name] = sum(getattr(d, name) for d in decoders.values())
+    tails = {tag: d.pending() for tag, d in decoders.items()}
+    return TaskResult(columns, heads, tails, set(decoders), stats)
+
+
+def _decode_task(task):
+    return decode_range(*task)
+
+
+def plan_tasks(paths, task_bytes: int = TASK_BYTES) -> list:
+    """Bagi setiap file menjadi (path, start, stop) berukuran ~task_bytes."""
+    tasks = []
+    for path in paths:
+        offsets = block_index(path)
+        size = os.path.getsize(path)
+        if size <= len(FILE_MAGIC):
+            continue
+        first = len(FILE_MAGIC)
+        for offset in offsets[1:]:
+            if offset - first >= task_bytes:
+                tasks.append((path, first, offset))
+                first = offset
+        tasks.append((path, first, size))
+    return tasks
+
+
+def expand_inputs(inputs) -> list:
+    """File dan direktori (semua *.bpmcap di dalamnya, urut nama)."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(
+                os.path.join(item, name) for name in os.listdir(item) if name.endswith(CAPTURE_SUFFIX)
+            ))
+        else:
+            paths.append(item)
+    return paths
+
+
+# ================= PENGGABUNG =================
+
+def _scan_boundary(buf, synced: bool, stats: dict):
+    """
+    Seperti FrameDecoder.frames(), tetapi untuk byte batas rentang. Jika
+    alat sudah sinkron di rentang berikutnya (`synced`), byte sesudah `buf`
+    pasti ada; kandidat frame yang melewati ujung `buf` tidak mungkin sah
+    (akan bertumpuk dengan frame pertama worker), jadi dianggap CRC salah.
+    Mengembalikan ([(posisi, panjang)], posisi_berhenti).
+    """
+    frames = []
+    pos = 0
+    end = len(buf)
+    while pos < end:
+        if buf[pos] != START_BYTE:
+            idx = buf.find(START_BYTE, pos)
+            if idx < 0:
+                stats["dropped_bytes"] += end - pos
+                return frames, end
+            stats["dropped_bytes"] += idx - pos
+            pos = idx
+
+        length = buf[pos + 1] if end - pos >= 2 else 0
+        if end - pos >= 2 and length < MIN_FRAME_LEN:
+            stats["length_errors"] += 1
+        elif end - pos >= max(length, 2) and (order := check_frame(buf[pos:pos + length])):
+            frames.append((pos, length))
+            stats["frames_ok"] += 1
+            if order == CRC_LITTLE:
+                stats["crc_little_endian"] += 1
+            pos += length
+            continue
+        elif not synced:
+            # Tunggu byte dari rentang sesudahnya
+            return frames, pos
+        else:
+            stats["crc_errors"] += 1
+        stats["resyncs"] += 1
+        stats["dropped_bytes"] += 1
+        pos += 1
+    return frames, pos
+
+
+class _Bridge:
+    """
+    Decode byte di batas rentang di proses induk: ekor rentang sebelumnya
+    + kepala rentang sekarang, per alat.
+    """
+
+    __slots__ = ("carry", "stats")
+
+    def __init__(self):
+        self.carry = {}
+        self.stats = dict.fromkeys(DECODER_STATS, 0)
+
+    def reset(self):
+        self.carry.clear()
+
+    def join(self, result: TaskResult) -> _Columns:
+        columns = _Columns(result.columns.devices)
+        # Setiap alat yang muncul di rentang punya kepala (minimal satu
+        # potongan); alat yang tidak muncul tetap membawa ekor lamanya
+        for tag, head in result.heads.items():
+            buf = bytearray(self.carry.pop(tag, b""))
+            starts = []
+            for _, _, data in head:
+                starts.append(len(buf))
+                buf += data
+            synced = tag in result.synced
+            frames, stop = _scan_boundary(buf, synced, self.stats)
+
+            device = columns.device(tag)
+            for pos, length in frames:
+                # Waktu = potongan yang melengkapi frame (seperti decoder serial)
+                seq, timestamp, _ = head[max(bisect_right(starts, pos + length - 1) - 1, 0)]
+                _add_frames(columns, (buf[pos:pos + length],), seq, timestamp, device)
+
+            if synced:
+                self.carry[tag] = result.tails[tag]
+            else:
+                self.carry[tag] = bytes(buf[stop:])
+        return columns
+
+
+class ColumnWriter:
+    """Menulis baris kolomnar ke direktori hasil secara bertahap."""
+
+    def __init__(self, path: str):
+        import numpy as np
+
+        self._np = np
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.devices = []
+        self._device_index = {}
+        self._files = {
+            name: open(os.path.join(path, f"{name}.bin"), "wb") for name, _ in COLUMNS
+        }
+        self.rows = 0
+        self.texts = {}
+
+    def _global_devices(self, devices):
+        mapping = []
+        for tag in devices:
+            index = self._device_index.get(tag)
+            if index is None:
+                index = self._device_index[tag] = len(self.devices)
+                self.devices.append(tag)
+            mapping.append(index)
+        return self._np.array(mapping, dtype=DTYPES["I"])
+
+    def write(self, *parts: _Columns):
+        """Gabung beberapa _Columns (urut stabil menurut seq) lalu tulis."""
+        np = self._np
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return
+        seq = np.concatenate([part.column("seq", np) for part in parts])
+        order = np.argsort(seq, kind="stable")
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+
+        for name, _ in COLUMNS:
+            chunks = []
+            for part in parts:
+                column = part.column(name, np)
+                if name == "device":
+                    column = self._global_devices(part.devices)[column]
+                chunks.append(column)
+            np.concatenate(chunks)[order].tofile(self._files[name])
+
+        base = 0
+        for part in parts:
+            for row, text in part.texts:
+                self.texts[str(self.rows + int(position[base + row]))] = text
+            base += len(part)
+        self.rows += len(order)
+
+    def close(self, sources=(), stats: dict = None):
+        for f in self._files.values():
+            f.close()
+        with open(os.path.join(self.path, DEVICES_FILE), "w", encoding="utf-8") as f:
+            for tag in self.devices:
+                f.write(tag + "\n")
+        meta = {
+            "rows": self.rows,
+            "columns": {name: DTYPES[code] for name, code in COLUMNS},
+            "kinds": [_kind_name(t) for t in KINDS],
+            "device_ids": self.texts,
+            "sources": list(sources),
+            "stats": stats or {},
+        }
+        tmp = os.path.join(self.path, META_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=1)
+        os.replace(tmp, os.path.join(self.path, META_FILE))
+
+
+def _kind_name(packet_type) -> str:
+    from render import PACKET_TYPE_NAMES
+
+    return PACKET_TYPE_NAMES[packet_type]
+
+
+def decode_archive(paths, out: str, workers: int = None, task_bytes: int = TASK_BYTES,
+                   progress=None) -> dict:
+    """
+    Decode semua file `paths` ke direktori `out`. `workers=1` berjalan di
+    proses ini (tanpa pool). `progress(selesai, total)` dipanggil per tugas.
+    Mengembalikan statistik gabungan.
+    """
+    tasks = plan_tasks(paths, task_bytes)
+    totals = {"files": len(paths), "tasks": len(tasks), "chunks": 0, "bytes": 0,
+              "corrupt_blocks": 0, "truncated": []}
+    totals.update(dict.fromkeys(DECODER_STATS, 0))
+    writer = ColumnWriter(out)
+    bridge = _Bridge()
+
+    pool = None
+    if workers != 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(_decode_task, tasks)
+    else:
+        results = map(_decode_task, tasks)
+
+    try:
+        previous = None
+        for done, (task, result) in enumerate(zip(tasks, results), 1):
+            if task[0] != previous:
+                bridge.reset()
+                previous = task[0]
+            writer.write(bridge.join(result), result.columns)
+            for name in ("chunks", "bytes", "corrupt_blocks", *DECODER_STATS):
+                totals[name] += result.stats.get(name, 0)
+            if result.stats.get("truncated"):
+                totals["truncated"].append(task[0])
+            if progress is not None:
+                progress(done, len(tasks))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    for name in DECODER_STATS:
+        totals[name] += bridge.stats[name]
+    totals["rows"] = writer.rows
+    totals["devices"] = list(writer.devices)
+    writer.close(paths, totals)
+    return totals
+
+
+# ================= PEMBACA =================
+
+def load_meta(path: str) -> dict:
+    try:
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise ArchiveError(f"{path}: bukan direktori hasil archive.py ({e})")
+
+
+def load_devices(path: str) -> list:
+    with open(os.path.join(path, DEVICES_FILE), "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f]
+
+
+def load_columns(path: str, columns=None) -> dict:
+    """
+    {nama_kolom: numpy.memmap} (read-only, tidak dimuat ke RAM). `columns`
+    membatasi kolom yang dibuka.
+    """
+    import numpy as np
+
+    meta = load_meta(path)
+    rows = meta["rows"]
+    data = {}
+    for name, dtype in meta["columns"].items():
+        if columns is not None and name not in columns:
+            continue
+        if rows == 0:
+            data[name] = np.empty(0, dtype=dtype)
+        else:
+            data[name] = np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode="r",
+                                   shape=(rows,))
+    return data
+
+
+# ================= CLI =================
+
+def _print_stats(stats: dict, elapsed: float = None):
+    print(f"File       : {stats['files']} ({stats['tasks']} tugas)")
+    print(f"Alat       : {', '.join(stats['devices']) or '-'}")
+    print(f"Potongan   : {stats['chunks']:,} ({stats['bytes']:,} byte RX)")
+    print(f"Frame      : {stats['frames_ok']:,} "
+          f"(CRC salah {stats['crc_errors']}, panjang salah {stats['length_errors']}, "
+          f"byte dibuang {stats['dropped_bytes']})")
+    print(f"Baris      : {stats['rows']:,}")
+    if elapsed:
+        print(f"Waktu      : {elapsed:.2f} s, {stats['bytes'] / elapsed / 1e6:.2f} MB/s")
+    if stats["corrupt_blocks"] or stats["truncated"]:
+        print(f"⚠️ {stats['corrupt_blocks']} blok rusak dilewati"
+              + (f", ekor terpotong: {', '.join(stats['truncated'])}" if stats["truncated"] else ""))
+
+
+def _print_info(path: str):
+    import numpy as np
+
+    meta = load_meta(path)
+    devices = load_devices(path)
+    data = load_columns(path, ("device", "kind", "timestamp"))
+    print(f"📦 {path}: {meta['rows']:,} baris dari {len(meta['sources'])} file")
+    if meta["rows"]:
+        from datetime import datetime
+
+        ts = data["timestamp"]
+        first = datetime.fromtimestamp(float(ts.min())).strftime("%Y-%m-%d %H:%M:%S")
+        last = datetime.fromtimestamp(float(ts.max())).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"   {first} s/d {last}")
+    kinds = meta["kinds"]
+    for index, tag in enumerate(devices):
+        counts = np.bincount(data["kind"][data["device"] == index], minlength=len(kinds))
+        text = ", ".join(f"{kinds[k]} {n:,}" for k, n in enumerate(counts) if n)
+        print(f"   {tag}: {text or '-'}")
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Decode paralel arsip rekaman BPMPRO 2")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    dec = sub.add_parser("decode", help="decode file .bpmcap ke kolom biner")
+    dec.add_argument("out", help="direktori hasil")
+    dec.add_argument("inputs", nargs="+", help="file .bpmcap atau direktori")
+    dec.add_argument("--workers", type=int, default=None,
+                     help="jumlah proses (default jumlah core, 1 = tanpa pool)")
+    dec.add_argument("--task-mb", type=float, default=TASK_BYTES / 1024 / 1024,
+                     help="ukuran data terkompresi per tugas (MB)")
+
+    info = sub.add_parser("info", help="ringkasan direktori hasil")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "info":
+            _print_info(args.path)
+            return 0
+
+        paths = expand_inputs(args.inputs)
+        if not paths:
+            print("❌ Tidak ada file rekaman")
+            return 1
+
+        def progress(done, total):
+            print(f"\r⏳ {done}/{total} tugas", end="", flush=True)
+
+        start = time.perf_counter()
+        stats = decode_archive(paths, args.out, args.workers, int(args.task_mb * 1024 * 1024),
+                               progress)
+        print()
+        print(f"\n=== DECODE {args.out} ===")
+        _print_stats(stats, time.perf_counter() - start)
+    except (OSError, ArchiveError, CaptureError) as e:
+        print(f"❌ {e}")
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
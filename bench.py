@@ -0,0 +1,495 @@
+# ==========================================
+# BENCHMARK JALUR PANAS (CRC, FRAMING, PARSING, ENCODING)
+# ==========================================
+#
+# Pemakaian:
+#   python bench.py                          -> tabel hasil
+#   python bench.py --json hasil.json        -> simpan hasil (JSON)
+#   python bench.py --baseline bench_baseline.json
+#                                            -> bandingkan, exit 1 bila regresi
+#   python bench.py --save-baseline bench_baseline.json
+#   python bench.py --filter framing         -> hanya kasus yang namanya cocok
+#   python bench.py --capture lapangan.bpmcap
+#                                            -> tambah kasus dari rekaman asli
+#
+# Semua input dibuat dari seed tetap (simulator.py), jadi angka antar
+# jalankan bisa dibandingkan. Laju selalu "lebih besar = lebih baik".
+#
+# Semua kasus diukur bergiliran dalam `--repeat` putaran (bukan satu kasus
+# sampai selesai), jadi perubahan beban host selama jalankan mengenai semua
+# kasus. Laju = median semua putaran; laju relatif = median kasus / median
+# kasus acuan `ref.interpreter` (loop Python murni tanpa kode repo). Galat
+# standar laju relatif, diturunkan dari sebaran antar putaran, ikut disimpan.
+#
+# --baseline membandingkan laju relatif, bukan laju mutlak, sehingga
+# bench_baseline.json bisa dipakai di host lain. Ambang regresi per kasus =
+# max(--tolerance, SPREAD_FACTOR x galat gabungan jalankan ini dan baseline):
+# di host yang berisik ambang melebar, jadi tree yang tidak berubah tetap lulus.
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+from crc16 import calc_crc, check_frame, crc16_modbus
+from framing import FrameDecoder
+from packets import (
+    PACKET_ID_GET_DEVICE_ID,
+    PACKET_ID_SET_LANGUAGE,
+    PACKET_ID_START,
+    PACKET_ID_STORAGE_COUNT,
+    decode_packet,
+    encode_frame,
+)
+from simulator import LoopbackSerial, SimulatedBpm
+
+SEED = 20240101
+MIN_RUN_TIME = 0.1
+DEFAULT_REPEAT = 9
+DEFAULT_TOLERANCE = 0.15
+# Kelipatan galat standar gabungan yang masih dianggap derau
+SPREAD_FACTOR = 3.0
+CHUNK_SIZE = 4096
+
+CASES = {}
+
+# Kasus acuan untuk normalisasi laju antar host (selalu dijalankan)
+REFERENCE_CASE = "ref.interpreter"
+
+
+def bench(name: str, unit: str):
+    """Mendaftarkan kasus. Fungsi menerima `n` dan mengembalikan jumlah unit yang diproses."""
+    def register(fn):
+        CASES[name] = (fn, unit)
+        return fn
+    return register
+
+
+class NullSerial:
+    """Tujuan tulis untuk fungsi send_*: hanya menghitung byte."""
+
+    def __init__(self):
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return len(data)
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Print dari new.py dibuang supaya yang diukur bukan kecepatan terminal."""
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+# ================= DATA UJI =================
+
+_streams = {}
+
+
+def recorded_stream(noisy: bool) -> bytes:
+    """Rekaman byte 20 pengukuran simulator (dengan atau tanpa gangguan)."""
+    if noisy not in _streams:
+        options = dict(noise=0.05, bad_crc=0.02, truncate=0.02) if noisy else {}
+        sim = SimulatedBpm(seed=SEED, auto_interval=1.0, **options)
+        sim.advance(20 * 45.0)
+        _streams[noisy] = sim.read_output()
+    return _streams[noisy]
+
+
+SAMPLE_FRAMES = {
+    "realtime": encode_frame(0x28, (123).to_bytes(2, "big")),
+    "result": encode_frame(0x22, bytes.fromhex("0078 0050 005d 0048 07ea 0a 12 0e 11")),
+    "exec_status": encode_frame(PACKET_ID_SET_LANGUAGE, b"\x00"),
+    "device_id": encode_frame(PACKET_ID_GET_DEVICE_ID, b"bpm_10c4ea60"),
+    "error": encode_frame(0x25, b"\x02"),
+    "storage_count": encode_frame(PACKET_ID_STORAGE_COUNT, b"\x00\x10"),
+}
+
+
+# ================= KASUS: ACUAN =================
+
+_CRC_BLOCK = random.Random(SEED).randbytes(4096)
+_REFERENCE_TABLE = tuple((i * 0x9E37) & 0xFFFF for i in range(256))
+
+
+@bench(REFERENCE_CASE, "MB/s")
+def _reference(n):
+    """Loop byte + lookup tabel yang bentuknya mirip jalur panas, tanpa kode repo."""
+    data = _CRC_BLOCK
+    table = _REFERENCE_TABLE
+    acc = 0
+    for _ in range(n):
+        for byte in data:
+            acc = (acc >> 8) ^ table[(acc ^ byte) & 0xFF]
+    return n * len(data) / 1e6
+
+
+# ================= KASUS: CRC =================
+
+
+@bench("crc.crc16_modbus_4k", "MB/s")
+def _crc_block(n):
+    data = _CRC_BLOCK
+    for _ in range(n):
+        crc16_modbus(data)
+    return n * len(data) / 1e6
+
+
+@bench("crc.calc_crc_command", "frame/s")
+def _crc_command(n):
+    header = bytes((0x5A, 0x06, 0x21, 0xF2))
+    for _ in range(n):
+        calc_crc(header)
+    return n
+
+
+@bench("crc.check_frame_result", "frame/s")
+def _crc_check(n):
+    frame = SAMPLE_FRAMES["result"]
+    for _ in range(n):
+        check_frame(frame)
+    return n
+
+
+# ================= KASUS: FRAMING =================
+
+def _extract_frames(stream: bytes) -> int:
+    decoder = FrameDecoder()
+    view = memoryview(stream)
+    frames = 0
+    for start in range(0, len(view), CHUNK_SIZE):
+        decoder.feed(view[start:start + CHUNK_SIZE])
+        for _ in decoder.frames():
+            frames += 1
+    return frames
+
+
+@bench("framing.clean_stream", "frame/s")
+def _framing_clean(n):
+    stream = recorded_stream(False)
+    return sum(_extract_frames(stream) for _ in range(n))
+
+
+@bench("framing.noisy_stream", "frame/s")
+def _framing_noisy(n):
+    stream = recorded_stream(True)
+    return sum(_extract_frames(stream) for _ in range(n))
+
+
+# ================= KASUS: DECODE / PARSE =================
+
+def _decode_case(kind):
+    frame = memoryview(SAMPLE_FRAMES[kind])
+
+    def run(n):
+        for _ in range(n):
+            decode_packet(frame)
+        return n
+    return run
+
+
+for _kind in SAMPLE_FRAMES:
+    bench(f"decode.{_kind}", "frame/s")(_decode_case(_kind))
+
+
+def _load_new():
+    """new.py butuh pyserial; kasus yang memakainya dilewati bila tidak ada."""
+    try:
+        import new
+    except ImportError:
+        return None
+    return new
+
+
+def _parse_case(kind):
+    frame = memoryview(SAMPLE_FRAMES[kind])
+
+    def run(n):
+        new = _load_new()
+        if new is None:
+            return None
+        parse = new.parse_packet
+        with _quiet():
+            for _ in range(n):
+                parse(frame)
+        return n
+    return run
+
+
+for _kind in SAMPLE_FRAMES:
+    bench(f"parse_packet.{_kind}", "frame/s")(_parse_case(_kind))
+
+
+# ================= KASUS: ENCODING PERINTAH =================
+
+SEND_CALLS = {
+    "start": lambda new, ser: new.send_start_command(ser),
+    "stop": lambda new, ser: new.send_stop_command(ser),
+    "get_device_id": lambda new, ser: new.send_get_device_id_command(ser),
+    "set_device_id": lambda new, ser: new.send_set_device_id_command(ser, "bpm_10c4ea60"),
+    "start_calibration": lambda new, ser: new.send_start_calibration_command(ser, 200),
+    "set_calibration_pressure": lambda new, ser: new.send_set_calibration_pressure_command(ser, 199),
+    "cancel_calibration": lambda new, ser: new.send_cancel_calibration_command(ser),
+    "toggle_button": lambda new, ser: new.send_toggle_button_command(ser, True),
+    "set_language": lambda new, ser: new.send_set_language_command(ser, 0x01),
+}
+
+
+def _send_case(call):
+    def run(n):
+        new = _load_new()
+        if new is None:
+            return None
+        ser = NullSerial()
+        with _quiet():
+            for _ in range(n):
+                call(new, ser)
+        return n
+    return run
+
+
+for _name, _call in SEND_CALLS.items():
+    bench(f"send.{_name}", "frame/s")(_send_case(_call))
+
+
+@bench("encode.encode_frame_2byte", "frame/s")
+def _encode_frame(n):
+    data = (200).to_bytes(2, "big")
+    for _ in range(n):
+        encode_frame(0x35, data)
+    return n
+
+
+@bench("encode.command_frame_constant", "frame/s")
+def _command_constant(n):
+    from commands import command_frame
+
+    for _ in range(n):
+        command_frame("get_date")
+    return n
+
+
+@bench("encode.command_frame_param", "frame/s")
+def _command_param(n):
+    from commands import command_frame
+
+    for i in range(n):
+        command_frame("print_out_paper", i)
+    return n
+
+
+# ================= KASUS: END-TO-END SIMULATOR =================
+
+@bench("e2e.loopback_measurement", "frame/s")
+def _e2e_loopback(n):
+    frames = 0
+    for _ in range(n):
+        ser = LoopbackSerial(SimulatedBpm(seed=SEED), speed=None)
+        ser.write(encode_frame(PACKET_ID_START))
+        decoder = FrameDecoder()
+        done = False
+        while not done:
+            for frame in decoder.read_frames(ser):
+                frames += 1
+                if frame[2] == 0x22:
+                    done = True
+    return frames
+
+
+@bench("e2e.session_get_device_id", "request/s")
+def _e2e_session(n):
+    from session import BpmSession
+    from simulator import open_sim_streams
+
+    async def run():
+        reader, writer = await open_sim_streams(SimulatedBpm(seed=SEED), speed=None)
+        async with BpmSession(reader, writer, "bench").start() as session:
+            for _ in range(n):
+                await session.get_device_id()
+        return n
+
+    return asyncio.run(run())
+
+
+# ================= KASUS: REKAMAN LAPANGAN =================
+
+def add_capture_case(path: str):
+    """
+    Kasus `capture.<file>`: byte RX rekaman capture.py (dimuat ke memori
+    dulu) lewat FrameDecoder + decode_packet, satu decoder per alat.
+    """
+    from capture import RX, read_capture
+
+    chunks = [(c.device, bytes(c.data)) for c in read_capture(path) if c.direction == RX]
+    total = sum(len(data) for _, data in chunks)
+
+    def run(n):
+        for _ in range(n):
+            decoders = {}
+            for device, data in chunks:
+                decoder = decoders.get(device)
+                if decoder is None:
+                    decoder = decoders[device] = FrameDecoder()
+                decoder.feed(data)
+                for frame in decoder.frames():
+                    decode_packet(frame)
+        return n * total / 1e6
+
+    bench(f"capture.{os.path.basename(path)}", "MB/s")(run)
+
+
+# ================= RUNNER =================
+
+def calibrate(fn):
+    """Jumlah iterasi `n` supaya satu jalan >= MIN_RUN_TIME, atau None bila dilewati."""
+    n = 1
+    while True:
+        start = time.perf_counter()
+        units = fn(n)
+        elapsed = time.perf_counter() - start
+        if units is None:
+            return None
+        if elapsed >= MIN_RUN_TIME:
+            return n
+        n *= 2 if elapsed == 0 else max(2, min(10, int(MIN_RUN_TIME / elapsed) + 1))
+
+
+def time_case(fn, n: int) -> float:
+    start = time.perf_counter()
+    units = fn(n)
+    return units / (time.perf_counter() - start)
+
+
+def _median_error(values):
+    """
+    Median dan galat standar relatifnya. Deviasi median absolut x 1,4826 ~
+    sigma; galat median ~ 1,2533 x sigma / akar(n).
+    """
+    median = statistics.median(values)
+    mad = statistics.median(abs(v - median) for v in values) / median
+    return median, 1.4826 * 1.2533 * mad / math.sqrt(len(values))
+
+
+def run_all(pattern: str = "", repeat: int = DEFAULT_REPEAT) -> dict:
+    cases = {}
+    for name, (fn, unit) in CASES.items():
+        if pattern and pattern not in name and name != REFERENCE_CASE:
+            continue
+        n = calibrate(fn)
+        if n is None:
+            print(f"⚠️ {name} dilewati (pyserial tidak terpasang)")
+            continue
+        cases[name] = (fn, unit, n)
+
+    rates = {name: [] for name in cases}
+    for _ in range(repeat):
+        for name, (fn, _, n) in cases.items():
+            rates[name].append(time_case(fn, n))
+
+    reference, reference_error = _median_error(rates[REFERENCE_CASE])
+    results = {}
+    for name, (_, unit, _) in cases.items():
+        rate, error = _median_error(rates[name])
+        if name != REFERENCE_CASE:
+            error = math.hypot(error, reference_error)
+        results[name] = {
+            "rate": rate,
+            "relative": rate / reference,
+            "error": error,
+            "unit": unit,
+        }
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "reference": REFERENCE_CASE,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    Nama kasus yang laju relatifnya (terhadap REFERENCE_CASE) turun lebih
+    dari ambang: `tolerance`, atau SPREAD_FACTOR x galat gabungan jalankan
+    ini dan baseline bila lebih besar.
+    """
+    regressions = []
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None or name == REFERENCE_CASE:
+            continue
+        if "relative" in base:
+            ratio = result["relative"] / base["relative"]
+        else:
+            # Baseline lama tanpa normalisasi: hanya sebanding di host yang sama
+            ratio = result["rate"] / base["rate"]
+        threshold = max(tolerance, SPREAD_FACTOR * math.hypot(result["error"], base.get("error", 0.0)))
+        result["baseline"] = base["rate"]
+        result["ratio"] = ratio
+        result["threshold"] = threshold
+        if ratio < 1.0 - threshold:
+            regressions.append(name)
+    return regressions
+
+
+def print_report(report: dict, regressions=()):
+    print(f"\n=== BENCHMARK (Python {report['python']}, {report['machine']}) ===")
+    for name, result in report["results"].items():
+        line = f"{name:40} {result['rate']:>14,.1f} {result['unit']:10} ±{result['error']:.0%}"
+        if "ratio" in result:
+            line += f"   x{result['ratio']:.2f} (ambang -{result['threshold']:.0%})"
+            if name in regressions:
+                line += "  ⚠️ REGRESI"
+        print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark stack serial BPMPRO 2")
+    parser.add_argument("--json", help="simpan hasil ke file JSON")
+    parser.add_argument("--baseline", help="file JSON baseline untuk dibandingkan")
+    parser.add_argument("--save-baseline", help="simpan hasil sebagai baseline baru")
+    parser.add_argument("--filter", default="", help="hanya kasus yang namanya mengandung teks ini")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="penurunan laju yang masih diterima (0.15 = 15%%)")
+    parser.add_argument("--capture", action="append", default=[],
+                        help="rekaman .bpmcap sebagai kasus tambahan (boleh berulang)")
+    args = parser.parse_args(argv)
+
+    for path in args.capture:
+        add_capture_case(path)
+
+    report = run_all(args.filter, args.repeat)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+
+    print_report(report, regressions)
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            print(f"✔ Hasil disimpan ke {path}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} kasus lebih lambat dari baseline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
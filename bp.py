@@ -1,210 +1,111 @@
 import serial
 import time
-from datetime import datetime
-import serial.tools.list_ports
-import threading
-import queue
+
+from discovery import SCAN_INTERVAL, DeviceDiscovery
+from framing import FrameDecoder
+from measurement import MeasurementCycle
+from packets import RealtimePressure, MeasurementResult, decode_packet
+from render import RealtimeThrottle, render_packet
+from transport import open_serial
 
 # ================= KONFIGURASI =================
 
-START_BYTE = 0x5A
-PARAM_TYPE_BP = 0xF2
-PACKET_ID_REALTIME = 0x28
-PACKET_ID_RESULT = 0x22
 BAUD_RATE = 19200
 REALTIME_TIMEOUT = 5
-
-# ================= VARIABEL GLOBAL =================
-
-port_queue = queue.Queue()
-restart_detection = threading.Event()
-in_realtime_mode = False
-last_realtime_data = 0
+READ_TIMEOUT = 1
 
 # ================= DETEKSI PORT =================
 
-def detect_port(port_name, result_queue, stop_event):
-    try:
-        ser = serial.Serial(port_name, BAUD_RATE, timeout=1)
-        print(f"Mencoba port: {port_name}")
-        start_time = time.time()
-
-        while time.time() - start_time < 2 and not stop_event.is_set():
-            data = ser.read(1)
-            if data and data[0] == START_BYTE:
-                print(f"✔ Port valid ditemukan: {port_name}")
-                result_queue.put(ser)
-                stop_event.set()
-                return
-
-        ser.close()
-    except serial.SerialException:
-        pass
-
-
-def select_serial_port():
+def select_serial_port(discovery):
+    """
+    Port BPMPRO 2 pertama yang bisa dibuka. Hasil probe disimpan di
+    `discovery`, jadi koneksi ulang ke port yang sama tidak memprobe lagi
+    selama daftar port USB tidak berubah.
+    """
     while True:
-        ports = list(serial.tools.list_ports.comports())
-
-        if not ports:
-            print("Tidak ada port ditemukan. Coba lagi 1 detik...")
-            time.sleep(1)
-            continue
-
-        stop_event = threading.Event()
-
-        while not port_queue.empty():
-            port_queue.get_nowait()
-
-        threads = []
-        for port in ports:
-            t = threading.Thread(
-                target=detect_port,
-                args=(port.device, port_queue, stop_event),
-                daemon=True
-            )
-            threads.append(t)
-            t.start()
+        devices = discovery.scan()
 
-        start_time = time.time()
-        while time.time() - start_time < 3 and not stop_event.is_set():
-            time.sleep(0.1)
-
-        stop_event.set()
-
-        try:
-            return port_queue.get_nowait()
-        except queue.Empty:
+        for device in devices:
+            try:
+                ser = open_serial(device.port, BAUD_RATE, timeout=READ_TIMEOUT)
+            except serial.SerialException:
+                discovery.invalidate(device.port)
+                continue
+            label = device.device_id or "ID belum terbaca"
+            print(f"✔ Port valid ditemukan: {device.port} ({label})")
+            return ser
+
+        if not discovery.candidates():
+            print(f"Tidak ada port ditemukan. Coba lagi {SCAN_INTERVAL:.0f} detik...")
+        else:
             print("Tidak ada port valid. Ulangi deteksi...")
-            time.sleep(1)
+        time.sleep(SCAN_INTERVAL)
 
 # ================= PARSE PAKET =================
 
-def parse_packet(data_bytes):
-    global in_realtime_mode, last_realtime_data
-
-    try:
-        if data_bytes[0] != START_BYTE:
-            return None
-
-        length = data_bytes[1]
-        packet_id = data_bytes[2]
-        param_type = data_bytes[3]
-
-        if param_type != PARAM_TYPE_BP:
-            return None
-
-        # ===== REALTIME =====
-        if packet_id == PACKET_ID_REALTIME and length >= 0x08:
-            in_realtime_mode = True
-
-            pressure = int.from_bytes(data_bytes[4:6], 'big')
-
-            now = time.time()
-            if now - last_realtime_data >= 0.5:
-                last_realtime_data = now
-                return f"Realtime Pressure: {pressure} mmHg"
-
-        # ===== RESULT =====
-        elif packet_id == PACKET_ID_RESULT and length >= 0x14:
-            in_realtime_mode = False
-
-            systolic = int.from_bytes(data_bytes[4:6], 'big')
-            diastolic = int.from_bytes(data_bytes[6:8], 'big')
-            mean = int.from_bytes(data_bytes[8:10], 'big')
-            heart_rate = int.from_bytes(data_bytes[10:12], 'big')
-
-            year = int.from_bytes(data_bytes[12:14], 'big')
-            month = data_bytes[14]
-            day = data_bytes[15]
-            hour = data_bytes[16]
-            minute = data_bytes[17]
-
-            try:
-                measurement_time = datetime(year, month, day, hour, minute)
-            except:
-                measurement_time = datetime.now()
-
-            restart_detection.set()
-
-            return (
-                "\n=== HASIL PENGUKURAN ===\n"
-                f"Sistolik     : {systolic} mmHg\n"
-                f"Diastolik    : {diastolic} mmHg\n"
-                f"Mean         : {mean} mmHg\n"
-                f"Heart Rate   : {heart_rate} bpm\n"
-                f"Waktu        : {measurement_time}\n"
-                "=========================\n"
-            )
-
-    except Exception as e:
-        print("Error parsing:", e)
+def parse_packet(data_bytes, cycle=None, throttle=None):
+    """
+    Hanya data realtime (0x28) dan hasil pengukuran (0x22) yang dipakai mode
+    monitor ini. Mengembalikan record terstruktur atau None. `cycle`
+    (MeasurementCycle) menerima semua record, termasuk sampel yang tidak
+    ditampilkan; `throttle` (RealtimeThrottle) membatasi sampel realtime
+    yang dikembalikan. Semua status ada di objek milik koneksi pemanggil.
+    """
+    packet = decode_packet(data_bytes)
+    if packet is not None and cycle is not None:
+        cycle.on_packet(packet)
+
+    # ===== REALTIME =====
+    if type(packet) is RealtimePressure:
+        if throttle is None or throttle.due():
+            return packet
+
+    # ===== RESULT =====
+    elif type(packet) is MeasurementResult:
+        return packet
 
     return None
 
 # ================= SERIAL READER =================
 
-def find_start_byte(ser):
-    while True:
-        try:
-            b = ser.read(1)
-            if not b:
-                return None
-            if b[0] == START_BYTE:
-                return b
-        except:
-            return None
-
-
-def check_realtime_timeout():
-    global in_realtime_mode
-
-    if in_realtime_mode and (time.time() - last_realtime_data > REALTIME_TIMEOUT):
-        print("❌ EMERGENCY STOP (5 detik tanpa data)")
-        in_realtime_mode = False
-        restart_detection.set()
-        return True
-    return False
-
-
-def read_serial_data(ser):
-    global last_realtime_data
-
+def read_serial_data(ser) -> bool:
+    """
+    Membaca satu port sampai watchdog realtime habis (mengembalikan True:
+    deteksi ulang) atau port error (False). Decoder, watchdog dan throttle
+    tampilan dibuat per koneksi, jadi fungsi ini aman dijalankan di beberapa
+    thread untuk beberapa alat sekaligus.
+    """
     print(f"\nTerhubung ke {ser.port} ({BAUD_RATE} bps)")
-    restart_detection.clear()
-    last_realtime_data = time.time()
-
-    while not restart_detection.is_set():
-
-        if check_realtime_timeout():
-            break
-
-        start = find_start_byte(ser)
-        if not start:
-            continue
 
-        length_byte = ser.read(1)
-        if not length_byte:
-            continue
+    decoder = FrameDecoder()
+    # Watchdog realtime berbasis deadline: timeout baca dipendekkan menjelang
+    # batas waktu, jadi emergency stop tidak menunggu pembacaan yang tertahan
+    cycle = MeasurementCycle(REALTIME_TIMEOUT)
+    throttle = RealtimeThrottle()
 
-        length = length_byte[0]
-        remaining = ser.read(length - 2)
+    while True:
+        timeout = cycle.time_until_deadline(READ_TIMEOUT)
+        if ser.timeout != timeout:
+            ser.timeout = timeout
 
-        if len(remaining) != length - 2:
-            continue
+        try:
+            frames = decoder.read_frames(ser)
+        except serial.SerialException:
+            return False
 
-        full_packet = start + length_byte + remaining
-        result = parse_packet(full_packet)
+        for full_packet in frames:
+            packet = parse_packet(full_packet, cycle, throttle)
 
-        if result:
-            print(result)
+            if packet:
+                print(render_packet(packet))
 
-            if restart_detection.is_set():
-                print("Menunggu 5 detik sebelum restart...\n")
-                time.sleep(5)
-                break
+                # Port tetap dibaca selama masa istirahat, tidak ada sleep
+                if type(packet) is MeasurementResult:
+                    print(f"Masa istirahat {cycle.result_cooldown:.0f} detik sebelum pengukuran berikutnya.\n")
 
-    return True
+        if cycle.poll():
+            print("❌ EMERGENCY STOP (5 detik tanpa data)")
+            return True
 
 # ================= LOOP UTAMA =================
 
@@ -212,15 +113,21 @@ def main():
     print("=== BP USB MONITOR MODE ===")
     print("Emergency stop jika 5 detik tanpa data realtime\n")
 
+    discovery = DeviceDiscovery(baudrate=BAUD_RATE)
+
     while True:
         print("\n--- Deteksi Port Serial ---")
-        ser = select_serial_port()
+        ser = select_serial_port(discovery)
 
         if not ser:
             time.sleep(2)
             continue
 
-        read_serial_data(ser)
+        restart = read_serial_data(ser)
+
+        # Putus karena error port (bukan watchdog): probe ulang sebelum dipakai lagi
+        if not restart:
+            discovery.invalidate(ser.port)
 
         if ser.is_open:
             ser.close()
@@ -0,0 +1,601 @@
+# ==========================================
+# CLI HEADLESS BPMPRO 2 (DAEMON / BATCH)
+# ==========================================
+#
+# Titik masuk non-interaktif (tanpa select_port() dan menu input()) untuk
+# systemd dan orkestrator:
+#
+#   python -m bpmpro serve --all-devices
+#   python -m bpmpro serve --device /dev/ttyUSB0 --output tcp://127.0.0.1:9000
+#   python -m bpmpro gateway --all-devices --listen 0.0.0.0:8765 --store bpm_data
+#   python -m bpmpro run --device /dev/ttyUSB0 start,wait-result,get-id
+#   python -m bpmpro serve --all-devices --capture lapangan.bpmcap
+#   python -m bpmpro serve --all-devices --export ekspor/
+#   python -m bpmpro list
+#
+# Output berupa JSON lines (satu event per baris) ke stdout, file, atau
+# socket (`tcp://host:port`, `unix:///path`). Konfigurasi dibaca dari file
+# JSON / TOML (`--config`); flag baris perintah menimpa isi file.
+#
+# Modul berat (asyncio, pyserial, session, manager, storage) baru diimpor di
+# dalam subcommand supaya proses cepat siap walau sering di-restart.
+
+import argparse
+import json
+import sys
+import time
+
+DEFAULT_CONFIG = {
+    "devices": [],
+    "all_devices": False,
+    "baudrate": 19200,
+    "output": "-",
+    "realtime": True,
+    "store_dir": None,
+    "export_dir": None,
+    "export_format": "auto",
+    "health_interval": 0,
+    "timeout": 120.0,
+    "id_scheme": "serial",
+    "id_cache": "bpm_ids.json",
+    "listen": "127.0.0.1:8765",
+    "allowed_origins": [],
+    "capture": None,
+    "log_level": "warning",
+    "metrics_file": None,
+}
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+# ================= KONFIGURASI =================
+
+def load_config(path: str = None) -> dict:
+    config = dict(DEFAULT_CONFIG)
+    if not path:
+        return config
+    if path.endswith(".toml"):
+        import tomllib
+
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    unknown = set(data) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError(f"Kunci konfigurasi tidak dikenal: {', '.join(sorted(unknown))}")
+    config.update(data)
+    return config
+
+
+def apply_flags(config: dict, args) -> dict:
+    """Flag yang diisi (bukan None) menimpa nilai dari file konfigurasi."""
+    for key in DEFAULT_CONFIG:
+        value = getattr(args, key, None)
+        if value is not None:
+            config[key] = value
+    return config
+
+
+# ================= OUTPUT JSON LINES =================
+
+class JsonLinesOutput:
+    """Satu event JSON per baris ke stdout (`-`), file, tcp://, atau unix://."""
+
+    def __init__(self, target: str = "-"):
+        self._sock = None
+        if target == "-":
+            self._file = sys.stdout
+        elif target.startswith(("tcp://", "unix://")):
+            import socket
+
+            if target.startswith("tcp://"):
+                host, _, port = target[len("tcp://"):].rpartition(":")
+                if not host or not port.isdigit():
+                    raise ValueError("format tcp://HOST:PORT")
+                self._sock = socket.create_connection((host, int(port)))
+            else:
+                self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._sock.connect(target[len("unix://"):])
+            self._file = self._sock.makefile("w", encoding="utf-8")
+        else:
+            self._file = open(target, "a", encoding="utf-8")
+
+    def emit(self, event: str, **fields):
+        fields.setdefault("ts", time.time())
+        line = json.dumps({"event": event, **fields}, separators=(",", ":"), default=str)
+        self._file.write(line + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+        if self._sock is not None:
+            self._sock.close()
+
+
+# ================= PERANGKAT =================
+
+def resolve_devices(config: dict) -> list:
+    """
+    DevicePort untuk setiap entri `devices` (nama port, URL sim://, atau
+    nomor seri USB) ditambah semua port BPMPRO 2 bila `all_devices`.
+    """
+    from manager import DevicePort, list_bpm_ports
+    from transport import SIM_URL_PREFIX
+
+    # Enumerasi USB hanya bila perlu (bukan untuk daftar yang isinya sim:// saja)
+    needs_usb = config["all_devices"] or any(not d.startswith(SIM_URL_PREFIX) for d in config["devices"])
+    found = list_bpm_ports() if needs_usb else []
+    by_serial = {p.serial_number: p for p in found if p.serial_number}
+    by_port = {p.port: p for p in found}
+
+    ports = []
+    for name in config["devices"]:
+        port = by_serial.get(name) or by_port.get(name) or DevicePort(name, name, "")
+        if port not in ports:
+            ports.append(port)
+    if config["all_devices"]:
+        ports += [p for p in found if p not in ports]
+    return ports
+
+
+# ================= SERVE / GATEWAY =================
+
+async def open_manager(config: dict, out: JsonLinesOutput, capture=None):
+    """DeviceManager yang sudah terhubung, atau None bila tidak ada perangkat yang terbuka."""
+    from manager import DeviceManager
+
+    ports = resolve_devices(config)
+    if not ports:
+        out.emit("error", message="Tidak ada perangkat (pakai --device atau --all-devices)")
+        return None
+
+    from telemetry import MetricsRegistry
+
+    manager = DeviceManager(ports, config["baudrate"], capture=capture, metrics=MetricsRegistry())
+    await manager.start()
+    for port in ports:
+        health = manager.health[port.tag]
+        if port.tag in manager.sessions:
+            out.emit("connected", device=port.tag, port=port.port)
+        else:
+            out.emit("connect_failed", device=port.tag, port=port.port, error=health.last_error)
+    if not manager.sessions:
+        await manager.close()
+        return None
+    return manager
+
+
+def open_capture(config: dict):
+    """CaptureWriter untuk rekaman byte mentah (capture.py), atau None."""
+    if not config["capture"]:
+        return None
+    from capture import CaptureWriter
+
+    return CaptureWriter(config["capture"])
+
+
+def open_store(config: dict):
+    if not config["store_dir"]:
+        return None
+    from storage import MeasurementStore
+
+    return MeasurementStore(config["store_dir"])
+
+
+def open_exporter(config: dict):
+    if not config["export_dir"]:
+        return None
+    from export import FLUSH_INTERVAL, Exporter
+
+    return Exporter(config["export_dir"], config["export_format"], flush_interval=FLUSH_INTERVAL)
+
+
+def stop_event():
+    """asyncio.Event yang diset oleh SIGTERM / SIGINT (systemd stop, Ctrl+C)."""
+    import asyncio
+    import signal
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C tetap lewat KeyboardInterrupt
+    return stop
+
+
+async def serve(config: dict, out: JsonLinesOutput) -> int:
+    """Mengalirkan semua record dari semua perangkat sampai SIGTERM / SIGINT."""
+    import asyncio
+
+    from packets import RealtimePressure
+    from render import packet_to_dict
+
+    capture = open_capture(config)
+    manager = await open_manager(config, out, capture)
+    if manager is None:
+        if capture is not None:
+            capture.close()
+        return EXIT_FAILED
+    store = open_store(config)
+    exporter = open_exporter(config)
+    stop = stop_event()
+    loop = asyncio.get_running_loop()
+    realtime = config["realtime"]
+
+    async def pump():
+        async for item in manager.stream():
+            if realtime or type(item.packet) is not RealtimePressure:
+                out.emit("packet", device=item.device, ts=item.timestamp, **packet_to_dict(item.packet))
+            if store is not None and store.record(item):
+                store.flush()
+            if exporter is not None:
+                exporter.record(item)
+
+    async def report_health(interval):
+        while True:
+            await asyncio.sleep(interval)
+            out.emit("health", devices=manager.health_report(), metrics=manager.metrics.snapshot())
+            if config["metrics_file"]:
+                manager.metrics.write(config["metrics_file"])
+
+    async def flush_export(interval):
+        # record() hanya berjalan bila ada data; saat semua alat diam timer ini
+        # yang menutup partisi menganggur
+        while True:
+            await asyncio.sleep(interval)
+            exporter.poll()
+
+    tasks = [loop.create_task(pump())]
+    if exporter is not None:
+        tasks.append(loop.create_task(flush_export(exporter.flush_interval)))
+    if config["health_interval"]:
+        tasks.append(loop.create_task(report_health(config["health_interval"])))
+    try:
+        await stop.wait()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if config["metrics_file"]:
+            manager.metrics.write(config["metrics_file"])
+        await manager.close()
+        if store is not None:
+            store.close()
+        if exporter is not None:
+            exporter.close()
+            out.emit("exported", **exporter.summary())
+        if capture is not None:
+            capture.close()
+        out.emit("stopped")
+    return EXIT_OK
+
+
+async def gateway(config: dict, listen: tuple, out: JsonLinesOutput) -> int:
+    """Gateway HTTP / SSE / WebSocket (gateway.py) sampai SIGTERM / SIGINT."""
+    from gateway import Gateway
+
+    host, port = listen
+    capture = open_capture(config)
+    manager = await open_manager(config, out, capture)
+    if manager is None:
+        if capture is not None:
+            capture.close()
+        return EXIT_FAILED
+    store = open_store(config)
+    stop = stop_event()
+
+    server = Gateway(manager, store, host, port, allowed_origins=config["allowed_origins"])
+    try:
+        try:
+            await server.start()
+        except OSError as e:
+            # Port sudah dipakai / alamat tidak bisa di-bind
+            out.emit("error", message=f"Gateway tidak bisa listen di {host}:{port}: {e}")
+            return EXIT_FAILED
+        out.emit("listening", host=server.host, port=server.port)
+        await stop.wait()
+    finally:
+        await server.close()
+        await manager.close()
+        if store is not None:
+            store.close()
+        if capture is not None:
+            capture.close()
+        out.emit("stopped")
+    return EXIT_OK
+
+
+def parse_listen(text: str) -> tuple:
+    """`0.0.0.0:8765` / `:8765` -> (host, port); host kosong -> 127.0.0.1."""
+    host, _, port = text.rpartition(":")
+    try:
+        port = int(port)
+    except ValueError:
+        raise ValueError(f"--listen harus host:port, bukan {text!r}") from None
+    if not 0 <= port <= 65535:
+        raise ValueError(f"Port --listen di luar 0-65535: {port}")
+    return host or "127.0.0.1", port
+
+
+# ================= RUN (BATCH PERINTAH) =================
+
+def parse_steps(text: str) -> list:
+    """`start,wait-result=90,get-id` -> [("start", None), ("wait-result", "90"), ...]."""
+    steps = []
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, arg = item.partition("=")
+        if name not in STEPS:
+            raise ValueError(f"Langkah tidak dikenal: {name!r} (pilih {', '.join(STEPS)})")
+        steps.append((name, arg or None))
+    if not steps:
+        raise ValueError("Daftar langkah kosong")
+    return steps
+
+
+async def _wait_result(ctx, arg):
+    import asyncio
+
+    timeout = float(arg) if arg else ctx["config"]["timeout"]
+    try:
+        return await asyncio.wait_for(ctx["results"].__anext__(), timeout)
+    except StopAsyncIteration:
+        from session import SessionClosed
+
+        raise SessionClosed(ctx["session"].name) from None
+
+
+async def _sleep(ctx, arg):
+    import asyncio
+
+    await asyncio.sleep(float(arg or 1))
+
+
+async def _provision(ctx, arg):
+    from provisioning import Provisioner, provision_session
+
+    config = ctx["config"]
+    provisioner = Provisioner(arg or config["id_scheme"], config["id_cache"])
+    port = ctx["port"]
+    old, new, written = await provision_session(ctx["session"], provisioner, port.serial_number or None, port.port)
+    return {"old_id": old, "device_id": new, "written": written}
+
+
+def _call(method, convert=None):
+    async def step(ctx, arg):
+        args = () if convert is None else (convert(arg),)
+        return await getattr(ctx["session"], method)(*args)
+
+    return step
+
+
+def _required_int(arg):
+    if arg is None:
+        raise ValueError("langkah ini butuh nilai, mis. calibrate=170")
+    return int(arg)
+
+
+def _required_str(arg):
+    if not arg:
+        raise ValueError("langkah ini butuh nilai, mis. set-id=bpm_0001")
+    return arg
+
+
+STEPS = {
+    "start": _call("start_measurement"),
+    "stop": _call("stop_measurement"),
+    "get-id": _call("get_device_id"),
+    "set-id": _call("set_device_id", _required_str),
+    "wait-result": _wait_result,
+    "calibrate": _call("start_calibration", _required_int),
+    "calibrate-set": _call("set_calibration_pressure", _required_int),
+    "calibrate-cancel": _call("cancel_calibration"),
+    "lock": _call("set_button_lock", lambda arg: True),
+    "unlock": _call("set_button_lock", lambda arg: False),
+    "language": _call("set_language", _required_int),
+    "provision": _provision,
+    "sleep": _sleep,
+}
+
+
+def _step_ok(reply) -> bool:
+    from packets import EXEC_OK, ErrorReport, ExecStatus
+
+    if type(reply) is ExecStatus:
+        return reply.status == EXEC_OK
+    return type(reply) is not ErrorReport
+
+
+async def run_device(port, steps, config: dict, out: JsonLinesOutput, capture=None) -> bool:
+    from packets import ErrorReport, MeasurementResult, RealtimePressure
+    from render import packet_to_dict
+    from session import open_session
+
+    try:
+        session = await open_session(port.port, config["baudrate"], port.tag)
+    except OSError as e:
+        out.emit("connect_failed", device=port.tag, port=port.port, error=str(e))
+        return False
+    out.emit("connected", device=port.tag, port=port.port)
+    session.capture = capture
+
+    if config["realtime"]:
+        def on_packet(packet):
+            if type(packet) is RealtimePressure:
+                out.emit("packet", device=port.tag, **packet_to_dict(packet))
+
+        session.add_listener(on_packet)
+    # Berlangganan hasil sejak awal, jadi hasil yang datang sebelum langkah
+    # wait-result (mis. setelah sleep) tidak terlewat
+    ctx = {
+        "session": session, "port": port, "config": config,
+        "results": session.subscribe(MeasurementResult, ErrorReport),
+    }
+
+    ok = True
+    try:
+        for name, arg in steps:
+            started = time.monotonic()
+            try:
+                reply = await STEPS[name](ctx, arg)
+            except Exception as e:  # timeout, port putus, argumen langkah salah
+                out.emit("step", device=port.tag, step=name, ok=False,
+                         error=str(e) or type(e).__name__, elapsed=time.monotonic() - started)
+                ok = False
+                break
+            fields = {}
+            if isinstance(reply, tuple):
+                fields["reply"] = packet_to_dict(reply)
+                step_ok = _step_ok(reply)
+            else:
+                fields["reply"] = reply
+                step_ok = True
+            out.emit("step", device=port.tag, step=name, ok=step_ok,
+                     elapsed=time.monotonic() - started, **fields)
+            if not step_ok:
+                ok = False
+                break
+    finally:
+        ctx["results"].close()
+        await session.close()
+    return ok
+
+
+async def run(config: dict, steps, out: JsonLinesOutput) -> int:
+    """Menjalankan langkah yang sama di setiap perangkat secara paralel."""
+    import asyncio
+
+    ports = resolve_devices(config)
+    if not ports:
+        out.emit("error", message="Tidak ada perangkat (pakai --device atau --all-devices)")
+        return EXIT_FAILED
+    capture = open_capture(config)
+    try:
+        results = await asyncio.gather(*(run_device(p, steps, config, out, capture) for p in ports))
+    finally:
+        if capture is not None:
+            capture.close()
+    return EXIT_OK if all(results) else EXIT_FAILED
+
+
+# ================= LIST =================
+
+def list_devices(config: dict, out: JsonLinesOutput) -> int:
+    from discovery import DeviceDiscovery
+
+    discovery = DeviceDiscovery(baudrate=config["baudrate"])
+    discovery.scan()
+    for port_info in discovery.candidates():
+        device = discovery.find(port=port_info.device)
+        out.emit(
+            "device", port=port_info.device, serial_number=port_info.serial_number,
+            device_id=device.device_id if device else None, responding=device is not None,
+        )
+    return EXIT_OK
+
+
+# ================= MAIN =================
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--config", help="file konfigurasi JSON / TOML")
+    common.add_argument("--output", help="-, path file, tcp://host:port, atau unix:///path")
+    common.add_argument("--baudrate", type=int)
+    common.add_argument("--log-level", help="debug, info, warning (default), error; log JSON ke stderr")
+
+    devices = argparse.ArgumentParser(add_help=False)
+    devices.add_argument("--device", dest="devices", action="append",
+                         help="port, URL sim://, atau nomor seri USB (boleh berulang)")
+    devices.add_argument("--all-devices", action="store_const", const=True,
+                         help="semua port BPMPRO 2 (CP210x) yang terhubung")
+    devices.add_argument("--capture", help="rekam byte mentah RX/TX ke file .bpmcap (capture.py)")
+
+    parser = argparse.ArgumentParser(prog="bpmpro", description="CLI headless BPMPRO 2 (output JSON lines)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", parents=[common, devices], help="alirkan data semua perangkat")
+    p_serve.add_argument("--no-realtime", dest="realtime", action="store_const", const=False,
+                         help="jangan keluarkan sampel realtime 0x28")
+    p_serve.add_argument("--store", dest="store_dir", help="simpan hasil ke direktori MeasurementStore")
+    p_serve.add_argument("--export", dest="export_dir",
+                         help="ekspor hasil 0x22 dan tekanan 0x28 per alat/hari ke direktori ini")
+    p_serve.add_argument("--export-format", choices=("auto", "parquet", "arrow", "csv"),
+                         help="format ekspor (default auto: parquet bila pyarrow ada, selain itu csv)")
+    p_serve.add_argument("--health-interval", type=float, help="detik antar event health (0 = mati)")
+    p_serve.add_argument("--metrics-file", help="tulis metrik Prometheus ke file tiap --health-interval")
+
+    p_gateway = sub.add_parser("gateway", parents=[common, devices], help="server HTTP / SSE / WebSocket")
+    p_gateway.add_argument("--listen", help="host:port (default 127.0.0.1:8765)")
+    p_gateway.add_argument("--store", dest="store_dir", help="simpan hasil dan aktifkan /devices/<tag>/records")
+    p_gateway.add_argument("--allow-origin", dest="allowed_origins", action="append",
+                           help="origin dashboard yang boleh mengirim perintah, mis. http://localhost:3000 "
+                                "(boleh berulang)")
+
+    p_run = sub.add_parser("run", parents=[common, devices], help="jalankan daftar langkah lalu keluar")
+    p_run.add_argument("steps", help=f"langkah dipisah koma: {', '.join(STEPS)}")
+    p_run.add_argument("--realtime", dest="realtime", action="store_const", const=True,
+                       help="ikut keluarkan sampel realtime 0x28")
+    p_run.add_argument("--timeout", type=float, help="batas waktu wait-result (detik)")
+    p_run.add_argument("--id-scheme", choices=("vidpid", "serial", "fleet"), help="skema untuk langkah provision")
+    p_run.add_argument("--id-cache", help="file cache ID untuk langkah provision")
+
+    sub.add_parser("list", parents=[common], help="daftar port BPMPRO 2 beserta Device ID")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        config = apply_flags(load_config(args.config), args)
+        steps = parse_steps(args.steps) if args.command == "run" else None
+        listen = parse_listen(config["listen"]) if args.command == "gateway" else None
+        if args.command == "serve" and config["export_dir"]:
+            from export import resolve_format
+
+            config["export_format"] = resolve_format(config["export_format"])
+    except (OSError, ValueError) as e:
+        print(f"bpmpro: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    from telemetry import setup_logging
+
+    setup_logging(config["log_level"], json_format=True, stream=sys.stderr)
+    if args.command == "run" and args.realtime is None:
+        # Mode batch: realtime hanya bila diminta
+        config["realtime"] = False
+
+    try:
+        out = JsonLinesOutput(config["output"])
+    except ValueError as e:
+        print(f"bpmpro: output tidak valid {config['output']!r}: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    except OSError as e:
+        print(f"bpmpro: output {config['output']!r} tidak bisa dibuka: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    try:
+        if args.command == "list":
+            return list_devices(config, out)
+
+        import asyncio
+
+        if args.command == "serve":
+            return asyncio.run(serve(config, out))
+        if args.command == "gateway":
+            return asyncio.run(gateway(config, listen, out))
+        return asyncio.run(run(config, steps, out))
+    except KeyboardInterrupt:
+        return EXIT_OK
+    finally:
+        out.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
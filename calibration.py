@@ -0,0 +1,374 @@
+# ==========================================
+# KALIBRASI MULTI-TITIK OTOMATIS
+# ==========================================
+#
+# Otomasi prosedur kalibrasi.md untuk banyak alat sekaligus. Per titik:
+#
+#   0x35 pre-fill target -> tunggu tekanan realtime 0x28 stabil
+#   -> ambil tekanan aktual dari referensi -> 0x36 tekanan aktual
+#
+# lalu 0x37 setelah titik terakhir (juga bila gagal di tengah jalan, supaya
+# katup buang selalu terbuka). Tekanan dianggap stabil bila selama
+# SETTLE_WINDOW detik selisih maks-min <= SETTLE_TOLERANCE dan rata-ratanya
+# sudah dekat target, bukan setelah jeda tetap.
+#
+# Sumber tekanan aktual (--reference):
+#   stdin      teknisi mengetik angka manometer (prompt per alat, bergiliran)
+#   gauge      pengganti manometer lokal: tekanan alat + offset/gain/noise
+#   FILE.csv   baris `target,aktual` atau `alat,target,aktual`
+#
+#   python calibration.py --device /dev/ttyUSB0 --device /dev/ttyUSB1
+#   python calibration.py --all-devices --points 50,100,150 --reference ref.csv
+#   python calibration.py --device "sim://a?speed=10" --reference gauge --gauge-offset -3
+#
+# Laporan JSON per alat disimpan di --report-dir.
+
+import asyncio
+import csv
+import json
+import os
+import random
+import time
+from collections import deque
+from typing import NamedTuple
+
+CALIBRATION_POINTS = (50, 100, 150, 200, 250)
+
+# Tekanan stabil: rentang maks-min dalam jendela waktu, minimal sekian sampel
+SETTLE_WINDOW = 1.5
+SETTLE_TOLERANCE = 1
+SETTLE_MIN_SAMPLES = 10
+# Rata-rata tekanan stabil harus sedekat ini ke target pre-fill (pompa belum
+# jalan / bocor tidak dianggap stabil)
+TARGET_TOLERANCE = 15
+SETTLE_TIMEOUT = 60.0
+
+REPORT_DIR = "kalibrasi_report"
+
+
+class CalibrationError(Exception):
+    """Satu titik kalibrasi gagal (tidak stabil, tanpa referensi, ditolak alat)."""
+
+
+class CalibrationPoint(NamedTuple):
+    target: int
+    device_pressure: float
+    reference: int
+    error: float
+    settle_time: float
+    samples: int
+    spread: int
+
+
+# ================= DETEKSI STABIL =================
+
+class SettlingDetector:
+    """
+    Jendela geser sampel (waktu, tekanan). `feed()` mengembalikan True bila
+    tekanan sudah stabil di sekitar target.
+    """
+
+    __slots__ = ("target", "window", "tolerance", "target_tolerance", "min_samples", "samples", "count")
+
+    def __init__(self, target: int, window: float = SETTLE_WINDOW, tolerance: int = SETTLE_TOLERANCE,
+                 target_tolerance: int = TARGET_TOLERANCE, min_samples: int = SETTLE_MIN_SAMPLES):
+        self.target = target
+        self.window = window
+        self.tolerance = tolerance
+        self.target_tolerance = target_tolerance
+        self.min_samples = min_samples
+        self.samples = deque()
+        self.count = 0
+
+    def feed(self, timestamp: float, pressure: int) -> bool:
+        samples = self.samples
+        samples.append((timestamp, pressure))
+        self.count += 1
+        while timestamp - samples[0][0] > self.window:
+            samples.popleft()
+        if len(samples) < self.min_samples or timestamp - samples[0][0] < self.window * 0.9:
+            return False
+        if self.spread > self.tolerance:
+            return False
+        return abs(self.value - self.target) <= self.target_tolerance
+
+    @property
+    def value(self) -> float:
+        return sum(p for _, p in self.samples) / len(self.samples)
+
+    @property
+    def spread(self) -> int:
+        pressures = [p for _, p in self.samples]
+        return max(pressures) - min(pressures)
+
+
+# ================= SUMBER TEKANAN AKTUAL =================
+
+class StdinReference:
+    """
+    Teknisi membaca manometer. Prompt dari beberapa alat diantre satu per satu.
+
+    Semua sumber punya `reading(device, target, device_pressure)` dengan
+    `device` berupa DevicePort (manager.py).
+    """
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+
+    async def reading(self, device, target: int, device_pressure: float) -> int:
+        async with self._lock:
+            while True:
+                try:
+                    text = await asyncio.to_thread(
+                        input, f"[{device.tag}] titik {target} mmHg (alat {device_pressure:.1f}) - tekanan manometer: "
+                    )
+                except EOFError:
+                    # Titik gagal biasa: 0x37 tetap dikirim dan laporan tetap disimpan
+                    raise CalibrationError("stdin ditutup") from None
+                try:
+                    return int(text.strip())
+                except ValueError:
+                    print("❌ Masukkan angka mmHg")
+
+
+class GaugeStandIn:
+    """Pengganti manometer untuk uji tanpa rig: tekanan alat * gain + offset (+ noise)."""
+
+    def __init__(self, offset: float = 0.0, gain: float = 1.0, noise: float = 0.0, seed=None):
+        self.offset = offset
+        self.gain = gain
+        self.noise = noise
+        self.random = random.Random(seed)
+
+    async def reading(self, device, target: int, device_pressure: float) -> int:
+        value = device_pressure * self.gain + self.offset
+        if self.noise:
+            value += self.random.gauss(0.0, self.noise)
+        return int(round(value))
+
+
+class FileReference:
+    """
+    Tekanan aktual dari CSV: `target,aktual` (berlaku untuk semua alat) atau
+    `alat,target,aktual` (alat = tag / port / nomor seri). Baris `#` diabaikan.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.readings = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                row = [cell.strip() for cell in row]
+                if not row or not row[0] or row[0].startswith("#"):
+                    continue
+                device, target, actual = row if len(row) >= 3 else ("*", *row[:2])
+                try:
+                    self.readings[(device, int(target))] = int(actual)
+                except ValueError:
+                    continue   # baris judul
+
+    async def reading(self, device, target: int, device_pressure: float) -> int:
+        # Kolom `alat` dicocokkan ke tag, lalu port, lalu nomor seri USB
+        for key in (device.tag, device.port, device.serial_number, "*"):
+            if key and (key, target) in self.readings:
+                return self.readings[(key, target)]
+        raise CalibrationError(f"tidak ada tekanan aktual {target} mmHg untuk {device.tag} di {self.path}")
+
+
+def make_reference(spec: str, offset: float = 0.0, gain: float = 1.0, noise: float = 0.0):
+    if spec == "stdin":
+        return StdinReference()
+    if spec == "gauge":
+        return GaugeStandIn(offset, gain, noise)
+    return FileReference(spec)
+
+
+# ================= RUNNER =================
+
+async def wait_settled(subscription, detector: SettlingDetector, timeout: float = SETTLE_TIMEOUT):
+    """Membaca sampel realtime sampai detektor menyatakan stabil."""
+    clock = asyncio.get_running_loop().time
+
+    async def run():
+        async for sample in subscription:
+            if detector.feed(clock(), sample.pressure):
+                return
+        raise CalibrationError("sesi tertutup saat menunggu tekanan stabil")
+
+    try:
+        await asyncio.wait_for(run(), timeout)
+    except asyncio.TimeoutError:
+        last = detector.samples[-1][1] if detector.samples else None
+        raise CalibrationError(
+            f"tekanan tidak stabil di {detector.target} mmHg dalam {timeout:.0f} detik (terakhir {last})"
+        ) from None
+
+
+def _check_status(reply, step: str):
+    from packets import EXEC_OK, ExecStatus
+
+    if type(reply) is ExecStatus and reply.status != EXEC_OK:
+        raise CalibrationError(f"{step} ditolak alat (status 0x{reply.status:02X})")
+
+
+async def calibrate_session(session, points, reference, device=None,
+                            settle=None, timeout: float = SETTLE_TIMEOUT) -> dict:
+    """
+    Kalibrasi semua titik pada satu BpmSession. `device` berupa DevicePort
+    (atau tag saja). Mengembalikan laporan (dict); kegagalan dicatat di
+    laporan, bukan dilempar.
+    """
+    from manager import DevicePort
+    from packets import DeviceId, RealtimePressure
+    from session import SessionClosed
+
+    if not isinstance(device, DevicePort):
+        device = DevicePort(device or session.name, session.name, "")
+    settle = settle or {}
+    report = {
+        "device": device.tag,
+        "device_id": None,
+        "started_at": time.time(),
+        "finished_at": None,
+        "points": [],
+        "ok": False,
+        "error": None,
+    }
+    try:
+        reply = await session.get_device_id()
+        if type(reply) is DeviceId:
+            report["device_id"] = reply.text
+    except (asyncio.TimeoutError, OSError, SessionClosed) as e:
+        report["error"] = f"alat tidak menjawab: {e}"
+        report["finished_at"] = time.time()
+        return report
+
+    started = False
+    try:
+        for target in points:
+            # Langganan dibuat sebelum 0x35 supaya sampel awal tidak terlewat
+            subscription = session.subscribe(RealtimePressure)
+            try:
+                begin = asyncio.get_running_loop().time()
+                _check_status(await session.start_calibration(target), f"pre-fill {target} mmHg (0x35)")
+                started = True
+                detector = SettlingDetector(target, **settle)
+                await wait_settled(subscription, detector, timeout)
+            finally:
+                subscription.close()
+
+            settle_time = asyncio.get_running_loop().time() - begin
+            pressure = detector.value
+            actual = await reference.reading(device, target, pressure)
+            _check_status(await session.set_calibration_pressure(actual), f"tekanan aktual {actual} (0x36)")
+            report["points"].append(CalibrationPoint(
+                target, round(pressure, 2), actual, round(pressure - actual, 2),
+                round(settle_time, 2), detector.count, detector.spread,
+            )._asdict())
+        report["ok"] = True
+    except (CalibrationError, asyncio.TimeoutError, OSError, SessionClosed) as e:
+        report["error"] = str(e) or type(e).__name__
+    finally:
+        if started:
+            try:
+                await session.cancel_calibration()
+            except (asyncio.TimeoutError, OSError, SessionClosed) as e:
+                report["error"] = report["error"] or f"0x37 gagal: {e}"
+                report["ok"] = False
+        report["finished_at"] = time.time()
+    return report
+
+
+def save_report(report: dict, report_dir: str = REPORT_DIR) -> str:
+    os.makedirs(report_dir, exist_ok=True)
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in report["device"])
+    stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(report["started_at"]))
+    path = os.path.join(report_dir, f"kalibrasi_{safe}_{stamp}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+async def calibrate_all(ports, points, reference, baudrate: int = 19200,
+                        settle=None, timeout: float = SETTLE_TIMEOUT) -> list:
+    """Kalibrasi semua DevicePort secara paralel. Mengembalikan daftar laporan."""
+    from session import open_session
+
+    async def one(port):
+        try:
+            session = await open_session(port.port, baudrate, port.tag)
+        except OSError as e:
+            return {"device": port.tag, "ok": False, "error": f"gagal membuka port: {e}", "points": []}
+        try:
+            return await calibrate_session(session, points, reference, port, settle, timeout)
+        finally:
+            await session.close()
+
+    return await asyncio.gather(*(one(p) for p in ports))
+
+
+def print_report(report: dict):
+    status = "✔" if report["ok"] else "❌"
+    print(f"\n{status} {report['device']} (ID {report.get('device_id') or '-'})")
+    if report["points"]:
+        print(f"   {'target':>6} {'alat':>8} {'aktual':>7} {'selisih':>8} {'stabil':>7}")
+        for p in report["points"]:
+            print(f"   {p['target']:>6} {p['device_pressure']:>8.1f} {p['reference']:>7} "
+                  f"{p['error']:>+8.1f} {p['settle_time']:>6.1f}s")
+    if report.get("error"):
+        print(f"   ❌ {report['error']}")
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    from bpmpro import resolve_devices
+
+    parser = argparse.ArgumentParser(description="Kalibrasi multi-titik otomatis BPMPRO 2")
+    parser.add_argument("--device", dest="devices", action="append", default=[],
+                        help="port, URL sim://, atau nomor seri USB (boleh berulang)")
+    parser.add_argument("--all-devices", action="store_true", help="semua port BPMPRO 2 yang terhubung")
+    parser.add_argument("--baudrate", type=int, default=19200)
+    parser.add_argument("--points", default=",".join(map(str, CALIBRATION_POINTS)),
+                        help="titik tekanan mmHg dipisah koma (default 50,100,150,200,250)")
+    parser.add_argument("--reference", default="stdin", help="stdin, gauge, atau file CSV")
+    parser.add_argument("--gauge-offset", type=float, default=0.0)
+    parser.add_argument("--gauge-gain", type=float, default=1.0)
+    parser.add_argument("--gauge-noise", type=float, default=0.0)
+    parser.add_argument("--settle-window", type=float, default=SETTLE_WINDOW, help="detik")
+    parser.add_argument("--settle-tolerance", type=int, default=SETTLE_TOLERANCE, help="mmHg maks-min")
+    parser.add_argument("--timeout", type=float, default=SETTLE_TIMEOUT, help="batas tunggu stabil per titik")
+    parser.add_argument("--report-dir", default=REPORT_DIR)
+    args = parser.parse_args(argv)
+
+    try:
+        points = [int(p) for p in args.points.split(",") if p.strip()]
+        reference = make_reference(args.reference, args.gauge_offset, args.gauge_gain, args.gauge_noise)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 2
+
+    ports = resolve_devices({"devices": args.devices, "all_devices": args.all_devices})
+    if not ports:
+        print("❌ Tidak ada perangkat (pakai --device atau --all-devices)")
+        return 2
+
+    settle = {"window": args.settle_window, "tolerance": args.settle_tolerance}
+    print(f"=== KALIBRASI {len(ports)} ALAT: {', '.join(map(str, points))} mmHg ===")
+    try:
+        reports = asyncio.run(calibrate_all(ports, points, reference, args.baudrate, settle, args.timeout))
+    except KeyboardInterrupt:
+        print("\nKalibrasi dihentikan oleh user.")
+        return 1
+
+    for report in reports:
+        print_report(report)
+        if report.get("started_at"):
+            print(f"   📄 {save_report(report, args.report_dir)}")
+    return 0 if all(r["ok"] for r in reports) else 1
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(main())
@@ -0,0 +1,460 @@
+# ==========================================
+# REKAMAN BYTE MENTAH + REPLAY
+# ==========================================
+#
+# Format file `.bpmcap` (append-only, bisa disambung antar sesi):
+#
+#   "BPMCAP1\n"                                  sekali di awal file
+#   blok*:
+#     "BLK1" | panjang_zlib u32 | panjang_asli u32 | crc32_asli u32
+#     payload zlib berisi record:
+#       timestamp f64 | indeks_alat u16 | arah u8 | panjang u32 | data
+#
+# Arah: 0 = RX (dari alat), 1 = TX (perintah ke alat), 2 = DEFINE (data =
+# nama/tag alat untuk indeks tersebut). Setiap blok mendefinisikan ulang
+# tag yang dipakainya, jadi satu blok bisa dibaca tanpa blok sebelumnya.
+# Blok terakhir yang terpotong (listrik mati, kill -9) atau blok rusak
+# dilewati; pembaca mencari "BLK1" berikutnya.
+#
+# Pemakaian:
+#   python capture.py info rekaman.bpmcap
+#   python capture.py replay rekaman.bpmcap              -> waktu asli
+#   python capture.py replay rekaman.bpmcap --speed 10   -> 10x lebih cepat
+#   python capture.py replay rekaman.bpmcap --max        -> secepat mungkin
+#   python capture.py replay rekaman.bpmcap --print --device /dev/ttyUSB0
+
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from typing import NamedTuple
+
+from framing import FrameDecoder
+from packets import decode_packet
+
+FILE_MAGIC = b"BPMCAP1\n"
+BLOCK_MAGIC = b"BLK1"
+BLOCK_HEADER = struct.Struct("<4sIII")
+RECORD_HEADER = struct.Struct("<dHBI")
+
+RX = 0
+TX = 1
+DEFINE = 2
+DIRECTION_NAMES = {RX: "rx", TX: "tx"}
+
+# Blok ditulis saat buffer mencapai ukuran ini atau sudah selama FLUSH_INTERVAL
+BLOCK_SIZE = 64 * 1024
+FLUSH_INTERVAL = 1.0
+COMPRESS_LEVEL = 6
+
+BAUD_RATE = 19200
+
+
+class CaptureChunk(NamedTuple):
+    timestamp: float
+    device: str
+    direction: int
+    data: memoryview
+
+
+# ================= PENULIS =================
+
+class CaptureWriter:
+    """
+    Penulis rekaman. `write()` hanya menyalin ke buffer; kompresi dan tulis
+    ke disk terjadi per blok, jadi aman dipanggil dari loop baca port.
+
+        with CaptureWriter("lapangan.bpmcap") as capture:
+            capture.write("/dev/ttyUSB0", data)
+    """
+
+    def __init__(self, path: str, block_size: int = BLOCK_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL, level: int = COMPRESS_LEVEL,
+                 clock=time.time):
+        self.path = path
+        self.block_size = block_size
+        self.flush_interval = flush_interval
+        self.level = level
+        self.clock = clock
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(FILE_MAGIC)
+        self._devices = {}
+        self._defined = set()
+        self._buf = bytearray()
+        self._last_flush = time.monotonic()
+        self.chunks = 0
+        self.bytes = 0
+        self.blocks = 0
+
+    def write(self, device: str, data, direction: int = RX, timestamp: float = None):
+        if not data or self._file is None:
+            return
+        index = self._devices.get(device)
+        if index is None:
+            index = self._devices[device] = len(self._devices)
+        buf = self._buf
+        if index not in self._defined:
+            name = device.encode("utf-8")
+            buf += RECORD_HEADER.pack(0.0, index, DEFINE, len(name))
+            buf += name
+            self._defined.add(index)
+        buf += RECORD_HEADER.pack(timestamp or self.clock(), index, direction, len(data))
+        buf += data
+        self.chunks += 1
+        self.bytes += len(data)
+
+        if len(buf) >= self.block_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def poll(self):
+        """
+        Flush berbasis waktu saat port diam: write() hanya memeriksa
+        flush_interval ketika ada data baru, jadi blok terakhir bisa tertahan.
+        Mengembalikan detik sampai buffer jatuh tempo, atau None bila kosong.
+        """
+        if not self._buf or self._file is None:
+            return None
+        remaining = self._last_flush + self.flush_interval - time.monotonic()
+        if remaining > 0:
+            return remaining
+        self.flush()
+        return None
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buf or self._file is None:
+            return
+        raw = bytes(self._buf)
+        payload = zlib.compress(raw, self.level)
+        self._file.write(BLOCK_HEADER.pack(BLOCK_MAGIC, len(payload), len(raw), zlib.crc32(raw)))
+        self._file.write(payload)
+        self._file.flush()
+        self._buf.clear()
+        self._defined.clear()
+        self.blocks += 1
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordingSerial:
+    """
+    Pembungkus objek pyserial: semua byte `read()` dicatat sebagai RX dan
+    `write()` sebagai TX. Atribut lain diteruskan ke port asli.
+    """
+
+    def __init__(self, ser, capture: CaptureWriter, device: str = None):
+        self._ser = ser
+        self._capture = capture
+        self._device = device or getattr(ser, "port", None) or "serial"
+
+    def read(self, size: int = 1):
+        data = self._ser.read(size)
+        if data:
+            self._capture.write(self._device, data, RX)
+        else:
+            # Timeout baca = port diam: tulis blok yang sudah jatuh tempo
+            self._capture.poll()
+        return data
+
+    def write(self, data):
+        self._capture.write(self._device, data, TX)
+        return self._ser.write(data)
+
+    def close(self):
+        self._capture.flush()
+        self._ser.close()
+
+    def __getattr__(self, name):
+        return getattr(self._ser, name)
+
+    def __setattr__(self, name, value):
+        # `ser.timeout = ...` dsb. harus sampai ke port asli
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._ser, name, value)
+
+
+# ================= PEMBACA =================
+
+class CaptureError(Exception):
+    """File bukan rekaman BPMCAP."""
+
+
+def iter_blocks(path: str, stats: dict = None, start: int = None, stop: int = None):
+    """
+    Generator payload blok (bytes, sudah didekompresi). Blok rusak dihitung
+    di `stats["corrupt_blocks"]`, ekor yang terpotong di `stats["truncated"]`.
+    `start`/`stop` (offset dari `block_index()`) membatasi ke blok yang
+    header-nya berada di [start, stop), untuk decode paralel (archive.py).
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("corrupt_blocks", 0)
+    stats.setdefault("truncated", False)
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= len(FILE_MAGIC):
+            if f.read(len(FILE_MAGIC)) not in (FILE_MAGIC, b""):
+                raise CaptureError(f"{path}: bukan file rekaman BPMCAP")
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(FILE_MAGIC)] != FILE_MAGIC:
+                raise CaptureError(f"{path}: bukan file rekaman BPMCAP")
+            pos = len(FILE_MAGIC) if start is None else start
+            end = len(mm)
+            limit = end if stop is None else min(stop, end)
+            while pos < limit:
+                if end - pos < BLOCK_HEADER.size:
+                    stats["truncated"] = True
+                    return
+                magic, zlen, rawlen, crc = BLOCK_HEADER.unpack_from(mm, pos)
+                if magic != BLOCK_MAGIC:
+                    stats["corrupt_blocks"] += 1
+                    pos = mm.find(BLOCK_MAGIC, pos + 1)
+                    if pos < 0:
+                        return
+                    continue
+                body = pos + BLOCK_HEADER.size
+                if body + zlen > end:
+                    stats["truncated"] = True
+                    return
+                try:
+                    raw = zlib.decompress(mm[body:body + zlen])
+                except zlib.error:
+                    raw = None
+                if raw is None or len(raw) != rawlen or zlib.crc32(raw) != crc:
+                    stats["corrupt_blocks"] += 1
+                    pos = mm.find(BLOCK_MAGIC, pos + 1)
+                    if pos < 0:
+                        return
+                    continue
+                pos = body + zlen
+                yield raw
+
+
+def block_index(path: str) -> list:
+    """
+    Offset header setiap blok, hanya dari membaca header (tanpa dekompresi).
+    Dipakai untuk membagi file menjadi rentang [start, stop) untuk
+    iter_blocks/read_capture. Lompatan pada header rusak sama dengan
+    iter_blocks (cari "BLK1" berikutnya).
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= len(FILE_MAGIC):
+            if f.read(len(FILE_MAGIC)) not in (FILE_MAGIC, b""):
+                raise CaptureError(f"{path}: bukan file rekaman BPMCAP")
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(FILE_MAGIC)] != FILE_MAGIC:
+                raise CaptureError(f"{path}: bukan file rekaman BPMCAP")
+            offsets = []
+            pos = len(FILE_MAGIC)
+            end = len(mm)
+            while end - pos >= BLOCK_HEADER.size:
+                magic, zlen, _, _ = BLOCK_HEADER.unpack_from(mm, pos)
+                if magic != BLOCK_MAGIC:
+                    pos = mm.find(BLOCK_MAGIC, pos + 1)
+                    if pos < 0:
+                        break
+                    continue
+                offsets.append(pos)
+                pos += BLOCK_HEADER.size + zlen
+            return offsets
+
+
+def read_capture(path: str, devices=None, stats: dict = None,
+                 start: int = None, stop: int = None):
+    """
+    Generator CaptureChunk berurutan seperti saat direkam. `devices` (set
+    tag) membatasi alat yang dikeluarkan. Data berupa memoryview ke payload
+    blok, jadi salin dengan bytes() bila perlu disimpan.
+    """
+    unpack = RECORD_HEADER.unpack_from
+    header_size = RECORD_HEADER.size
+    for raw in iter_blocks(path, stats, start, stop):
+        view = memoryview(raw)
+        names = {}
+        pos = 0
+        end = len(raw)
+        while pos + header_size <= end:
+            timestamp, index, direction, length = unpack(raw, pos)
+            pos += header_size
+            data = view[pos:pos + length]
+            pos += length
+            if direction == DEFINE:
+                names[index] = bytes(data).decode("utf-8", "replace")
+                continue
+            device = names.get(index, f"#{index}")
+            if devices is not None and device not in devices:
+                continue
+            yield CaptureChunk(timestamp, device, direction, data)
+
+
+def replay(path: str, speed: float = 1.0, devices=None, directions=(RX,),
+           clock=time.monotonic, sleep=time.sleep, stats: dict = None):
+    """
+    Seperti read_capture, tetapi jeda antar potongan mengikuti waktu rekaman
+    dibagi `speed`. `speed=None` (atau 0) berarti secepat mungkin.
+    """
+    base_ts = base_wall = None
+    for chunk in read_capture(path, devices, stats):
+        if directions is not None and chunk.direction not in directions:
+            continue
+        if speed:
+            if base_ts is None:
+                base_ts = chunk.timestamp
+                base_wall = clock()
+            delay = base_wall + (chunk.timestamp - base_ts) / speed - clock()
+            if delay > 0:
+                sleep(delay)
+        yield chunk
+
+
+# ================= REPLAY KE DECODER =================
+
+def replay_packets(path: str, speed: float = None, devices=None, stats: dict = None):
+    """
+    Memasukkan rekaman RX ke FrameDecoder (satu per alat, seperti di
+    lapangan) lalu decode_packet. Generator (timestamp, device, packet).
+    Statistik decoder dijumlahkan ke `stats` di akhir.
+    """
+    stats = stats if stats is not None else {}
+    decoders = {}
+    try:
+        for chunk in replay(path, speed, devices, stats=stats):
+            decoder = decoders.get(chunk.device)
+            if decoder is None:
+                decoder = decoders[chunk.device] = FrameDecoder()
+            decoder.feed(chunk.data)
+            stats["chunks"] = stats.get("chunks", 0) + 1
+            stats["bytes"] = stats.get("bytes", 0) + len(chunk.data)
+            for frame in decoder.frames():
+                packet = decode_packet(frame)
+                if packet is not None:
+                    yield chunk.timestamp, chunk.device, packet
+    finally:
+        for name in ("frames_ok", "crc_errors", "length_errors", "dropped_bytes"):
+            stats[name] = sum(getattr(d, name) for d in decoders.values())
+        stats["devices"] = sorted(decoders)
+
+
+def capture_info(path: str) -> dict:
+    """Ringkasan isi rekaman per alat dan arah."""
+    stats = {}
+    devices = {}
+    first = last = None
+    for chunk in read_capture(path, stats=stats):
+        entry = devices.setdefault(chunk.device, {"rx_bytes": 0, "tx_bytes": 0, "chunks": 0})
+        entry["chunks"] += 1
+        entry[f"{DIRECTION_NAMES.get(chunk.direction, 'rx')}_bytes"] += len(chunk.data)
+        first = chunk.timestamp if first is None else min(first, chunk.timestamp)
+        last = chunk.timestamp if last is None else max(last, chunk.timestamp)
+    return {
+        "size": os.path.getsize(path),
+        "devices": devices,
+        "first": first,
+        "last": last,
+        "corrupt_blocks": stats.get("corrupt_blocks", 0),
+        "truncated": stats.get("truncated", False),
+    }
+
+
+# ================= CLI =================
+
+def _print_info(path):
+    from datetime import datetime
+
+    info = capture_info(path)
+    raw = sum(d["rx_bytes"] + d["tx_bytes"] for d in info["devices"].values())
+    print(f"📼 {path}: {info['size']:,} byte di disk, {raw:,} byte mentah")
+    if info["first"] is not None:
+        first = datetime.fromtimestamp(info["first"]).strftime("%Y-%m-%d %H:%M:%S")
+        last = datetime.fromtimestamp(info["last"]).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"   {first} s/d {last} ({info['last'] - info['first']:.1f} detik)")
+    for device, entry in sorted(info["devices"].items()):
+        print(f"   {device}: RX {entry['rx_bytes']:,} byte, TX {entry['tx_bytes']:,} byte, "
+              f"{entry['chunks']:,} potongan")
+    if info["corrupt_blocks"] or info["truncated"]:
+        print(f"⚠️ {info['corrupt_blocks']} blok rusak dilewati"
+              + (", ekor file terpotong" if info["truncated"] else ""))
+
+
+def _replay(path, speed, devices, show):
+    from render import PACKET_TYPE_NAMES, render_packet
+
+    stats = {}
+    counts = {}
+    start = time.perf_counter()
+    for timestamp, device, packet in replay_packets(path, speed, devices, stats):
+        name = PACKET_TYPE_NAMES[type(packet)]
+        counts[name] = counts.get(name, 0) + 1
+        if show:
+            print(f"[{device}] {render_packet(packet)}")
+    elapsed = time.perf_counter() - start
+
+    nbytes = stats.get("bytes", 0)
+    print(f"\n=== REPLAY {path} ===")
+    print(f"Alat       : {', '.join(stats.get('devices', [])) or '-'}")
+    print(f"Potongan   : {stats.get('chunks', 0):,} ({nbytes:,} byte RX)")
+    print(f"Frame      : {stats.get('frames_ok', 0):,} "
+          f"(CRC salah {stats.get('crc_errors', 0)}, panjang salah {stats.get('length_errors', 0)}, "
+          f"byte dibuang {stats.get('dropped_bytes', 0)})")
+    for name, count in sorted(counts.items()):
+        print(f"  {name:14} {count:,}")
+    if elapsed > 0:
+        wire_rate = BAUD_RATE / 10
+        print(f"Waktu      : {elapsed:.3f} s, {nbytes / elapsed / 1e6:.2f} MB/s "
+              f"(x{nbytes / elapsed / wire_rate:,.0f} laju {BAUD_RATE} baud)")
+    if stats.get("corrupt_blocks") or stats.get("truncated"):
+        print(f"⚠️ {stats['corrupt_blocks']} blok rusak dilewati"
+              + (", ekor file terpotong" if stats["truncated"] else ""))
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rekaman byte mentah BPMPRO 2")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    info = sub.add_parser("info", help="ringkasan isi rekaman")
+    info.add_argument("file")
+
+    play = sub.add_parser("replay", help="putar ulang rekaman ke decoder + parser")
+    play.add_argument("file")
+    play.add_argument("--speed", type=float, default=1.0, help="kelipatan waktu asli (default 1)")
+    play.add_argument("--max", action="store_true", help="secepat mungkin, tanpa jeda")
+    play.add_argument("--device", action="append", help="hanya alat/tag ini (boleh berulang)")
+    play.add_argument("--print", action="store_true", help="tampilkan setiap paket")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "info":
+            _print_info(args.file)
+        else:
+            speed = None if args.max else args.speed
+            devices = set(args.device) if args.device else None
+            _replay(args.file, speed, devices, args.print)
+    except (OSError, CaptureError) as e:
+        print(f"❌ {e}")
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
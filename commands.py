@@ -0,0 +1,166 @@
+# ==========================================
+# TABEL PERINTAH HOST -> PERANGKAT (docs.md)
+# ==========================================
+#
+# Setiap perintah dideklarasikan sekali: nama, packet ID, format segmen data
+# (struct, big-endian) dan bentuk balasannya. Dari tabel ini:
+# - frame perintah tanpa data (Start, Stop, Get ID, Get Date, ...) dihitung
+#   sekali saat import, jadi pengiriman berulang tidak menghitung CRC lagi;
+# - perintah berparameter memakai satu encoder: header + CRC header sudah
+#   disiapkan, tinggal pack data lalu lanjutkan CRC atas data saja.
+# - frame berparameter kecil (1-2 byte) disimpan di cache setelah dibuat.
+
+import struct
+from typing import NamedTuple
+
+from crc16 import crc16_modbus, crc16_update
+from packets import PARAM_TYPE_BP, START_BYTE, encode_frame
+
+# Bentuk balasan perangkat
+REPLY_STATUS = "status"      # status eksekusi umum (0x00..0x04)
+REPLY_DATA = "data"          # paket dengan ID sama berisi data
+REPLY_STAGED = "staged"      # "Execute command" (0x01) dulu, lalu status final
+REPLY_STREAM = "stream"      # status, lalu data realtime / hasil menyusul
+
+FRAME_CACHE_LIMIT = 4096
+
+
+class Command(NamedTuple):
+    name: str
+    packet_id: int
+    data_format: str  # format struct, "" = tanpa data, None = byte mentah
+    reply: str
+    description: str
+
+
+COMMANDS = (
+    # ----- Sistem -----
+    Command("handshake", 0x01, "", REPLY_STATUS, "Power-on handshake"),
+    Command("get_version", 0x95, "", REPLY_DATA, "Versi software (4 byte)"),
+    Command("set_device_id", 0x0E, "12s", REPLY_STATUS, "Set Device ID (12 byte ASCII)"),
+    Command("get_device_id", 0x0F, "", REPLY_DATA, "Get Device ID"),
+    Command("time_sync", 0x14, None, REPLY_STATUS, "Sinkronisasi waktu ethernet"),
+    Command("reset_module", 0x1A, "", REPLY_STAGED, "Reset modul"),
+    Command("sleep_module", 0x1B, "", REPLY_STATUS, "Mode tidur modul"),
+    Command("online_upgrade", 0x1F, "B", REPLY_STATUS, "Online upgrade (data 0x01)"),
+    Command("start_download", 0x61, None, REPLY_STATUS, "Mulai unduh file"),
+    Command("set_language", 0x66, "B", REPLY_STATUS, "Bahasa: 0 Mandarin, 1 Inggris, 2 Thailand"),
+    Command("switch_protocol", 0xFE, None, REPLY_STATUS, "Ganti protokol komunikasi"),
+    Command("toggle_button", 0x26, "B", REPLY_STATUS, "Tombol start: 0 buka, 1 blokir"),
+    # ----- Pengukuran -----
+    Command("start", 0x21, "", REPLY_STREAM, "Start measurement"),
+    Command("stop", 0x20, "", REPLY_STATUS, "Stop measurement"),
+    Command("pressure_output", 0x29, "B", REPLY_STATUS, "Output tekanan realtime: 0 buka, 1 tutup"),
+    Command("get_measurement_count", 0x23, "", REPLY_DATA, "Jumlah pengukuran (4 byte)"),
+    Command("clear_measurement_count", 0x24, "", REPLY_STAGED, "Hapus jumlah pengukuran"),
+    Command("get_storage_count", 0x2B, "", REPLY_DATA, "Jumlah data tersimpan (2 byte)"),
+    Command("get_stored_data", 0x2C, ">H", REPLY_DATA, "Ambil data tersimpan (nomor record)"),
+    Command("clear_records", 0x2A, "", REPLY_STAGED, "Hapus seluruh riwayat"),
+    # ----- Parameter proteksi -----
+    Command("set_cuff_protection", 0x59, ">HH", REPLY_STATUS, "Batas tekanan, batas arus"),
+    Command("get_cuff_protection", 0x5A, "", REPLY_DATA, "Parameter proteksi manset"),
+    Command("set_inflation_params", 0x5B, ">HH", REPLY_STATUS, "Timeout inflasi, timeout deflasi"),
+    Command("get_inflation_params", 0x5C, "", REPLY_DATA, "Parameter inflasi/deflasi"),
+    Command("set_motor_protection", 0x5D, ">H", REPLY_STATUS, "Timeout operasi motor"),
+    Command("get_motor_protection", 0x5E, "", REPLY_DATA, "Parameter proteksi motor"),
+    # ----- Pemeliharaan -----
+    Command("maintenance_mode", 0x31, "B", REPLY_STATUS, "Mode pemeliharaan: 0 keluar, 1 masuk"),
+    Command("pump_valve", 0x32, "B", REPLY_STATUS, "Bit 0-6 saluran, bit 7 hidup/mati"),
+    Command("motor_maintenance", 0x33, "B", REPLY_STATUS, "Motor: 0 lepas manset, 1 tarik"),
+    Command("sleeve_self_test", 0x34, "B", REPLY_STATUS, "Self-test manset: 0 batal, 1 mulai"),
+    # ----- Kalibrasi -----
+    Command("start_calibration", 0x35, ">H", REPLY_STATUS, "Mulai kalibrasi (tekanan pre-fill)"),
+    Command("set_calibration_pressure", 0x36, ">H", REPLY_STATUS, "Tekanan aktual kalibrasi"),
+    Command("cancel_calibration", 0x37, "", REPLY_STATUS, "Batalkan kalibrasi"),
+    Command("aging_control", 0x62, "B", REPLY_STATUS, "Saklar program aging"),
+    Command("get_aging_records", 0x63, "", REPLY_DATA, "Riwayat aging (4 byte)"),
+    # ----- Suara & printer -----
+    Command("voice_switch", 0x11, "B", REPLY_STATUS, "Suara: 0 mati, 1 nyala"),
+    Command("printer_power", 0x12, "B", REPLY_STATUS, "Printer: 0 mati, 1 nyala"),
+    Command("print_out_paper", 0x38, ">I", REPLY_STATUS, "Keluarkan kertas (langkah motor)"),
+    Command("print_paper_feed", 0x39, ">I", REPLY_STATUS, "Feed kertas (langkah motor)"),
+    Command("print_and_cut", 0x3A, ">I", REPLY_STATUS, "Cetak dan potong (langkah motor)"),
+    Command("get_paper_out", 0x3B, "", REPLY_DATA, "Status kertas: 0 ada, 1 habis"),
+    Command("get_head_up", 0x3C, "", REPLY_DATA, "Kepala printer: 0 tertutup, 1 terangkat"),
+    Command("test_print", 0x3D, "", REPLY_STATUS, "Tes cetak konten tetap"),
+    Command("test_print_logo", 0x3F, "", REPLY_STATUS, "Tes cetak logo"),
+    # ----- Tanggal -----
+    Command("set_date", 0x51, ">HBBBBB", REPLY_STATUS, "Tahun (2), bulan, hari, jam, menit, detik"),
+    Command("get_date", 0x52, "", REPLY_DATA, "Tanggal internal perangkat"),
+)
+
+COMMANDS_BY_NAME = {c.name: c for c in COMMANDS}
+COMMANDS_BY_ID = {c.packet_id: c for c in COMMANDS}
+
+
+# ================= FRAME KONSTAN =================
+
+CONSTANT_FRAMES = {c.name: encode_frame(c.packet_id) for c in COMMANDS if c.data_format == ""}
+_CONSTANT_BY_ID = {COMMANDS_BY_NAME[name].packet_id: frame for name, frame in CONSTANT_FRAMES.items()}
+
+
+# ================= ENCODER BERPARAMETER =================
+
+class _Encoder:
+    """Header + CRC header yang sudah dihitung untuk satu perintah berparameter."""
+
+    __slots__ = ("packer", "header", "header_crc", "cacheable")
+
+    def __init__(self, command: Command):
+        self.packer = struct.Struct(command.data_format)
+        self.header = bytes((START_BYTE, self.packer.size + 6, command.packet_id, PARAM_TYPE_BP))
+        self.header_crc = crc16_modbus(self.header)
+        self.cacheable = self.packer.size <= 2
+
+    def encode(self, args) -> bytes:
+        data = self.packer.pack(*args)
+        crc = crc16_update(self.header_crc, data)
+        return b"".join((self.header, data, crc.to_bytes(2, "big")))
+
+
+_ENCODERS = {c.name: _Encoder(c) for c in COMMANDS if c.data_format}
+_frame_cache = {}
+
+
+def command_frame(name: str, *args) -> bytes:
+    """
+    Frame lengkap untuk perintah `name` dari tabel COMMANDS.
+    Argumen mengikuti data_format; perintah byte mentah (format None)
+    menerima satu argumen bytes.
+    """
+    frame = CONSTANT_FRAMES.get(name)
+    if frame is not None:
+        return frame
+
+    encoder = _ENCODERS.get(name)
+    if encoder is None:
+        command = COMMANDS_BY_NAME.get(name)
+        if command is None:
+            raise KeyError(f"Perintah tidak dikenal: {name}")
+        return encode_frame(command.packet_id, args[0] if args else b"")
+
+    if not encoder.cacheable:
+        return encoder.encode(args)
+    key = (name, args)
+    frame = _frame_cache.get(key)
+    if frame is None:
+        if len(_frame_cache) >= FRAME_CACHE_LIMIT:
+            _frame_cache.clear()
+        frame = _frame_cache[key] = encoder.encode(args)
+    return frame
+
+
+def encode_command(packet_id: int, data=b"") -> bytes:
+    """Seperti packets.encode_frame, tapi frame tanpa data diambil dari cache."""
+    if not data:
+        frame = _CONSTANT_BY_ID.get(packet_id)
+        if frame is not None:
+            return frame
+    return encode_frame(packet_id, data)
+
+
+def send_command(ser, name: str, *args) -> bytes:
+    """Menulis satu frame perintah ke port dengan satu kali write()."""
+    frame = command_frame(name, *args)
+    ser.write(frame)
+    return frame
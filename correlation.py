@@ -0,0 +1,242 @@
+# ==========================================
+# KORELASI PERINTAH <-> BALASAN
+# ==========================================
+#
+# Melacak perintah yang belum dibalas per packet ID (FIFO, sesuai urutan
+# kirim), lalu:
+# - balasan status 0x01 (Execute command) dianggap balasan antara: perintah
+#   tetap menunggu, batas waktunya diperpanjang ke `staged_timeout`
+#   (0x1A / 0x24 / 0x2A membalas dua kali);
+# - status 0x02 (Operation busy) dikirim ulang setelah jeda yang makin lama;
+# - tanpa balasan dalam `timeout`, frame dikirim ulang (docs.md: host wajib
+#   mengirim ulang), batas waktunya dikali `backoff` tiap percobaan;
+# - balasan final menyelesaikan perintah lewat callback dan mencatat
+#   latensi per jenis perintah.
+#
+# Modul ini tidak melakukan I/O dan tidak punya thread/timer sendiri.
+# Pemakai memanggil `on_packet()` untuk setiap record yang diterima dan
+# `poll()` secara berkala (atau tepat di `next_deadline()`): new.py dari
+# loop bacanya, session.py dari timer event loop.
+
+import time
+from bisect import bisect_left
+from collections import deque
+
+from packets import EXEC_BUSY, EXEC_RUNNING, ExecStatus
+
+COMMAND_TIMEOUT = 2.0
+COMMAND_RETRIES = 2
+RETRY_BACKOFF = 1.5
+BUSY_DELAY = 0.25
+STAGED_TIMEOUT = 30.0
+
+# Batas atas bucket histogram latensi (detik); bucket terakhir = +Inf
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class CommandTimeout(Exception):
+    """Tidak ada balasan final setelah semua pengiriman ulang."""
+
+
+class PendingCommand:
+    """Satu perintah yang menunggu balasan final."""
+
+    __slots__ = (
+        "packet_id", "frame", "callback", "timeout", "retries",
+        "first_sent", "deadline", "attempts", "busy", "running",
+        "done", "reply", "error",
+    )
+
+    def __init__(self, packet_id, frame, callback, timeout, retries, now):
+        self.packet_id = packet_id
+        self.frame = frame
+        self.callback = callback
+        self.timeout = timeout
+        self.retries = retries
+        self.first_sent = now
+        self.deadline = now + timeout
+        self.attempts = 1
+        self.busy = False
+        self.running = False
+        self.done = False
+        self.reply = None
+        self.error = None
+
+
+class LatencyStats:
+    """Latensi (kirim pertama -> balasan final) untuk satu packet ID."""
+
+    __slots__ = ("count", "total", "min", "max", "retransmits", "busy", "timeouts", "buckets")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.retransmits = 0
+        self.busy = 0
+        self.timeouts = 0
+
+    def add(self, latency: float):
+        self.buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self.count += 1
+        self.total += latency
+        if self.min is None or latency < self.min:
+            self.min = latency
+        if latency > self.max:
+            self.max = latency
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+            "retransmits": self.retransmits,
+            "busy": self.busy,
+            "timeouts": self.timeouts,
+        }
+
+
+class Correlator:
+    """
+    Mesin korelasi untuk satu koneksi. `write(frame)` dipakai untuk
+    mengirim ulang; `clock` harus monotonic (default time.monotonic).
+    """
+
+    def __init__(self, write, timeout: float = COMMAND_TIMEOUT, retries: int = COMMAND_RETRIES,
+                 backoff: float = RETRY_BACKOFF, staged_timeout: float = STAGED_TIMEOUT,
+                 clock=time.monotonic):
+        self._write = write
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.staged_timeout = staged_timeout
+        self.clock = clock
+        self._pending = {}
+        self.latency = {}
+
+    # ----- kirim -----
+
+    def submit(self, packet_id: int, frame: bytes, callback=None,
+               timeout: float = None, retries: int = None) -> PendingCommand:
+        """Mengirim `frame` dan mulai melacak balasannya."""
+        pending = self.track(packet_id, frame, callback, timeout, retries)
+        self._write(frame)
+        return pending
+
+    def track(self, packet_id: int, frame: bytes, callback=None,
+              timeout: float = None, retries: int = None) -> PendingCommand:
+        """Melacak frame yang sudah dikirim sendiri oleh pemanggil."""
+        pending = PendingCommand(
+            packet_id, frame, callback,
+            self.timeout if timeout is None else timeout,
+            self.retries if retries is None else retries,
+            self.clock(),
+        )
+        self._pending.setdefault(packet_id, deque()).append(pending)
+        return pending
+
+    def _stats(self, packet_id: int) -> LatencyStats:
+        stats = self.latency.get(packet_id)
+        if stats is None:
+            stats = self.latency[packet_id] = LatencyStats()
+        return stats
+
+    # ----- terima -----
+
+    def on_packet(self, packet_id: int, packet) -> bool:
+        """
+        Mencocokkan record dengan perintah tertua ber-packet ID sama.
+        Mengembalikan True jika record dipakai sebagai balasan.
+        """
+        queue = self._pending.get(packet_id)
+        if not queue:
+            return False
+        pending = queue[0]
+        now = self.clock()
+
+        if type(packet) is ExecStatus:
+            if packet.status == EXEC_RUNNING:
+                pending.running = True
+                pending.deadline = now + self.staged_timeout
+                return True
+            if packet.status == EXEC_BUSY and pending.attempts <= pending.retries:
+                self._stats(packet_id).busy += 1
+                pending.busy = True
+                pending.deadline = now + BUSY_DELAY * self.backoff ** (pending.attempts - 1)
+                return True
+
+        queue.popleft()
+        self._stats(packet_id).add(now - pending.first_sent)
+        self._finish(pending, packet, None)
+        return True
+
+    # ----- batas waktu -----
+
+    def poll(self):
+        """Mengirim ulang / menggagalkan perintah yang lewat batas waktunya."""
+        now = self.clock()
+        for packet_id, queue in self._pending.items():
+            for pending in list(queue):
+                if pending.deadline > now:
+                    continue
+                if pending.attempts > pending.retries:
+                    queue.remove(pending)
+                    self._stats(packet_id).timeouts += 1
+                    self._finish(pending, None, CommandTimeout(
+                        f"Perintah 0x{packet_id:02X} tidak dibalas setelah {pending.attempts} kali kirim"
+                    ))
+                    continue
+                # Balasan sibuk: jeda sudah habis, coba lagi dengan batas waktu normal
+                timeout = pending.timeout * self.backoff ** (0 if pending.busy else pending.attempts)
+                pending.attempts += 1
+                pending.busy = False
+                pending.running = False
+                pending.deadline = now + timeout
+                self._stats(packet_id).retransmits += 1
+                self._write(pending.frame)
+
+    def next_deadline(self):
+        """Waktu (clock) batas terdekat, atau None bila tidak ada yang menunggu."""
+        return min((p.deadline for q in self._pending.values() for p in q), default=None)
+
+    # ----- pembatalan -----
+
+    def cancel(self, pending: PendingCommand):
+        queue = self._pending.get(pending.packet_id)
+        if queue and pending in queue:
+            queue.remove(pending)
+        pending.done = True
+
+    def fail_all(self, error: Exception):
+        for queue in self._pending.values():
+            while queue:
+                self._finish(queue.popleft(), None, error)
+
+    def _finish(self, pending: PendingCommand, reply, error):
+        pending.done = True
+        pending.reply = reply
+        pending.error = error
+        if pending.callback is not None:
+            pending.callback(reply, error)
+
+    @property
+    def outstanding(self) -> int:
+        return sum(len(q) for q in self._pending.values())
+
+    def latency_report(self) -> dict:
+        """Statistik latensi per perintah, dengan nama dari tabel commands.py."""
+        from commands import COMMANDS_BY_ID
+
+        report = {}
+        for packet_id, stats in sorted(self.latency.items()):
+            command = COMMANDS_BY_ID.get(packet_id)
+            name = command.name if command else f"0x{packet_id:02X}"
+            report[name] = stats.as_dict()
+        return report
@@ -0,0 +1,112 @@
+# ==========================================
+# CRC16 MODBUS (TABLE-DRIVEN)
+# ==========================================
+#
+# Satu-satunya implementasi CRC16 Modbus yang dipakai new.py, bp.py dan
+# validasi.py. Perhitungan memakai tabel 256 entri sehingga setiap byte
+# hanya butuh satu lookup, bukan 8 kali shift di interpreter.
+
+POLYNOMIAL = 0xA001
+CRC_INIT = 0xFFFF
+
+
+def _build_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ POLYNOMIAL
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC_TABLE = _build_table()
+
+
+# ================= API STREAMING =================
+
+def crc16_update(crc: int, data) -> int:
+    """
+    Melanjutkan perhitungan CRC dari nilai `crc` sebelumnya.
+    `data` boleh bytes, bytearray atau memoryview (tanpa perlu disalin).
+    """
+    table = CRC_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def crc16_modbus(data) -> int:
+    """
+    CRC-16 MODBUS
+    Polynomial : 0xA001
+    Init value : 0xFFFF
+    """
+    return crc16_update(CRC_INIT, data)
+
+
+def calc_crc(data_bytes) -> bytes:
+    """
+    Menghitung CRC16 Modbus dan mengembalikannya dalam byte-order
+    big-endian (High-byte, Low-byte), sesuai format paket perangkat.
+    """
+    return crc16_update(CRC_INIT, data_bytes).to_bytes(2, byteorder='big')
+
+
+# Hasil check_frame(): 0 berarti CRC salah, selain itu urutan byte yang cocok
+CRC_INVALID = 0
+CRC_BIG = 1
+CRC_LITTLE = 2
+
+
+def check_frame(frame) -> int:
+    """
+    Memverifikasi satu frame lengkap (termasuk 2 byte CRC di belakang)
+    dalam satu panggilan. Perintah ke alat selalu big-endian, tetapi respons
+    Realtime / Result bisa datang little-endian (lihat bpmpro2.md), jadi
+    keduanya diterima seperti validasi.py.
+
+    Mengembalikan CRC_BIG / CRC_LITTLE (truthy) atau CRC_INVALID (0).
+    """
+    n = len(frame)
+    if n < 3:
+        return CRC_INVALID
+    crc = crc16_update(CRC_INIT, memoryview(frame)[:n - 2])
+    hi = frame[n - 2]
+    lo = frame[n - 1]
+    if crc == (hi << 8) | lo:
+        return CRC_BIG
+    if crc == (lo << 8) | hi:
+        return CRC_LITTLE
+    return CRC_INVALID
+
+
+class Crc16:
+    """
+    Akumulator CRC inkremental, untuk data yang datang sepotong-sepotong.
+
+        crc = Crc16()
+        crc.update(header)
+        crc.update(memoryview(buf)[4:n])
+        crc.digest()  # -> b'\\x67\\x45'
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, data=None):
+        self.value = CRC_INIT
+        if data:
+            self.update(data)
+
+    def update(self, data):
+        self.value = crc16_update(self.value, data)
+        return self
+
+    def digest(self) -> bytes:
+        return self.value.to_bytes(2, byteorder='big')
+
+    def reset(self):
+        self.value = CRC_INIT
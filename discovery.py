@@ -0,0 +1,289 @@
+# ==========================================
+# DISCOVERY PERANGKAT BPMPRO 2
+# ==========================================
+#
+# Pengganti deteksi lama bp.py (satu thread per port, semua port dibuka,
+# menunggu byte 0x5A sampai 2 detik, diulang dari nol setelah setiap
+# pengukuran):
+# 1. port disaring dari deskriptor USB saja (VID/PID, nomor seri), port lain
+#    tidak pernah dibuka;
+# 2. kandidat diprobe aktif dengan Get Device ID (0x0F), fallback handshake
+#    (0x01), dengan timeout pendek;
+# 3. hasil probe disimpan per port. Scan berikutnya hanya enumerasi USB dan
+#    membandingkan sidik jari daftar port; probe diulang hanya untuk port
+#    yang baru / berubah (hotplug) atau yang sebelumnya tidak menjawab.
+#
+#   discovery = DeviceDiscovery()
+#   for device in discovery.scan():
+#       print(device.port, device.device_id)
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from commands import CONSTANT_FRAMES
+from framing import FrameDecoder
+from packets import PACKET_ID_HANDSHAKE, DeviceId, ExecStatus, decode_packet
+from transport import open_serial
+
+BAUD_RATE = 19200
+# Board BPMPRO 2 memakai jembatan USB-serial Silicon Labs CP210x
+BPM_USB_IDS = ((0x10C4, 0xEA60),)
+
+PROBE_TIMEOUT = 0.3
+PROBE_WORKERS = 8
+# Port kandidat yang tidak menjawab dicoba lagi setelah jeda ini
+PROBE_RETRY_INTERVAL = 5.0
+SCAN_INTERVAL = 1.0
+# Enumerasi USB (sysfs di Linux) cukup murah untuk dipolling secepat ini
+HOTPLUG_POLL_INTERVAL = 0.2
+
+
+class PortFilter(NamedTuple):
+    """Saringan deskriptor USB. `serial_numbers` kosong = semua nomor seri."""
+    usb_ids: tuple = BPM_USB_IDS
+    serial_numbers: frozenset = frozenset()
+
+    def matches(self, port_info) -> bool:
+        if (port_info.vid, port_info.pid) not in self.usb_ids:
+            return False
+        return not self.serial_numbers or (port_info.serial_number or "") in self.serial_numbers
+
+
+class DiscoveredDevice(NamedTuple):
+    port: str
+    serial_number: str
+    vid: int
+    pid: int
+    # "" bila perangkat menjawab tetapi Device ID tidak terbaca (mis. sedang mengukur)
+    device_id: str
+    probed_at: float
+
+
+def port_key(port_info) -> tuple:
+    """Sidik jari satu port; berubah bila kabel dicabut / dipindah / diganti alat lain."""
+    return (
+        port_info.device, port_info.vid, port_info.pid,
+        port_info.serial_number or "", getattr(port_info, "location", None) or "",
+    )
+
+
+def _comports():
+    import serial.tools.list_ports
+
+    return serial.tools.list_ports.comports()
+
+
+# ================= PROBE =================
+
+def _wait_for(ser, decoder, deadline, wanted):
+    """Membaca sampai record bertipe `wanted` datang; mengembalikan (record, ada_frame)."""
+    seen = False
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None, seen
+        ser.timeout = remaining
+        for frame in decoder.read_frames(ser):
+            seen = True
+            packet = decode_packet(frame)
+            if type(packet) is wanted:
+                return packet, seen
+
+
+def probe_port(port: str, baudrate: int = BAUD_RATE, timeout: float = PROBE_TIMEOUT):
+    """
+    Mengirim Get Device ID (0x0F) ke `port`. Mengembalikan Device ID, ""
+    bila hanya handshake (0x01) yang dijawab atau port hanya mengirim frame
+    lain yang valid (alat sedang mengukur), atau None bila bukan BPMPRO 2 /
+    port gagal dibuka.
+    """
+    try:
+        ser = open_serial(port, baudrate, timeout=timeout)
+    except OSError:
+        return None
+
+    try:
+        ser.reset_input_buffer()
+        decoder = FrameDecoder()
+
+        ser.write(CONSTANT_FRAMES["get_device_id"])
+        reply, seen = _wait_for(ser, decoder, time.monotonic() + timeout, DeviceId)
+        if reply is not None:
+            return reply.text
+
+        ser.write(CONSTANT_FRAMES["handshake"])
+        while True:
+            reply, seen_now = _wait_for(ser, decoder, time.monotonic() + timeout, ExecStatus)
+            seen = seen or seen_now
+            if reply is None or reply.packet_id == PACKET_ID_HANDSHAKE:
+                break
+        return "" if reply is not None or seen else None
+    except OSError:
+        return None
+    finally:
+        ser.close()
+
+
+# ================= DISCOVERY =================
+
+class DeviceDiscovery:
+    """
+    Peta port <-> Device ID yang diperbarui hanya saat daftar port berubah.
+    `cache_path` (opsional) menyimpan peta ke file JSON sehingga program
+    berikutnya tidak perlu probe ulang port yang sama; `scan(force=True)`
+    selalu probe ulang semua kandidat.
+    """
+
+    def __init__(self, port_filter: PortFilter = PortFilter(), baudrate: int = BAUD_RATE,
+                 probe_timeout: float = PROBE_TIMEOUT, cache_path: str = None,
+                 list_ports=_comports):
+        self.port_filter = port_filter
+        self.baudrate = baudrate
+        self.probe_timeout = probe_timeout
+        self.cache_path = cache_path
+        self._list_ports = list_ports
+
+        self._devices = {}
+        self._failed = {}
+        self._fingerprint = None
+        self.scans = 0
+        self.probes = 0
+
+        if cache_path:
+            self._load()
+
+    # ----- enumerasi -----
+
+    def candidates(self) -> list:
+        """Port yang lolos saringan USB (tanpa membuka port)."""
+        return [p for p in self._list_ports() if self.port_filter.matches(p)]
+
+    def changed(self) -> bool:
+        return frozenset(port_key(p) for p in self.candidates()) != self._fingerprint
+
+    def _due(self, key, now) -> bool:
+        failed_at = self._failed.get(key)
+        return key not in self._devices and (failed_at is None or now - failed_at >= PROBE_RETRY_INTERVAL)
+
+    def scan(self, force: bool = False) -> list:
+        """Mengembalikan DiscoveredDevice yang aktif; probe hanya bila perlu."""
+        self.scans += 1
+        now = time.monotonic()
+        ports = {port_key(p): p for p in self.candidates()}
+        fingerprint = frozenset(ports)
+
+        for key in list(self._devices):
+            if key not in ports:
+                del self._devices[key]
+        for key in list(self._failed):
+            if key not in ports:
+                del self._failed[key]
+
+        todo = [p for key, p in ports.items() if force or self._due(key, now)]
+        if todo:
+            self._probe_all(todo)
+        if todo or fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._save()
+        return self.devices
+
+    def _probe_all(self, ports):
+        self.probes += len(ports)
+        with ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(ports))) as pool:
+            results = list(pool.map(
+                lambda p: probe_port(p.device, self.baudrate, self.probe_timeout), ports
+            ))
+
+        now = time.monotonic()
+        for port_info, device_id in zip(ports, results):
+            key = port_key(port_info)
+            if device_id is None:
+                self._devices.pop(key, None)
+                self._failed[key] = now
+                continue
+            self._failed.pop(key, None)
+            self._devices[key] = DiscoveredDevice(
+                port_info.device, port_info.serial_number or "",
+                port_info.vid, port_info.pid, device_id, time.time(),
+            )
+
+    def invalidate(self, port: str):
+        """Port gagal dibuka / menjawab aneh: probe ulang pada scan berikutnya."""
+        for key in list(self._devices):
+            if key[0] == port:
+                del self._devices[key]
+
+    def update(self, port: str, device_id: str):
+        """Mencatat Device ID baru (mis. setelah Set ID 0x0E) tanpa probe ulang."""
+        for key, device in self._devices.items():
+            if device.port == port:
+                self._devices[key] = device._replace(device_id=device_id, probed_at=time.time())
+                self._save()
+
+    # ----- hotplug -----
+
+    def locate(self, serial_number: str):
+        """Nama port saat ini untuk nomor seri USB (hanya enumerasi, tanpa probe)."""
+        for port_info in self.candidates():
+            if port_info.serial_number == serial_number:
+                return port_info.device
+        return None
+
+    def wait_for_serial(self, serial_number: str, timeout: float = None,
+                        interval: float = HOTPLUG_POLL_INTERVAL):
+        """
+        Menunggu perangkat bernomor seri `serial_number` muncul (lagi) di
+        enumerasi, mis. setelah kabel / hub USB putus sesaat. Nama port boleh
+        berbeda dari sebelumnya. Mengembalikan nama port, atau None bila
+        `timeout` habis.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            port = self.locate(serial_number)
+            if port is not None:
+                return port
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                time.sleep(min(interval, remaining))
+            else:
+                time.sleep(interval)
+
+    # ----- hasil -----
+
+    @property
+    def devices(self) -> list:
+        return sorted(self._devices.values(), key=lambda d: d.port)
+
+    def find(self, serial_number: str = None, device_id: str = None, port: str = None):
+        for device in self.devices:
+            if serial_number is not None and device.serial_number != serial_number:
+                continue
+            if device_id is not None and device.device_id != device_id:
+                continue
+            if port is not None and device.port != port:
+                continue
+            return device
+        return None
+
+    # ----- file cache -----
+
+    def _load(self):
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        for entry in entries:
+            device = DiscoveredDevice(**entry["device"])
+            self._devices[tuple(entry["key"])] = device
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        entries = [{"key": list(key), "device": device._asdict()} for key, device in self._devices.items()]
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
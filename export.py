@@ -0,0 +1,603 @@
+# ==========================================
+# EKSPOR KOLOMNAR (PARQUET / ARROW / CSV)
+# ==========================================
+#
+# Hasil 0x22 (SYS/DIA/MAP/HR + waktu perangkat) dan sampel tekanan 0x28
+# ditulis ke dataset terpartisi per alat dan per hari (gaya Hive):
+#
+#     OUT/results/device=<tag>/date=2026-10-18/part-00000.parquet
+#     OUT/pressure/device=<tag>/date=2026-10-18/part-00000.parquet
+#
+# Tag alat di-escape seperti URL (`/dev/ttyUSB0` -> `%2Fdev%2FttyUSB0`);
+# pyarrow.dataset(..., partitioning="hive") mengembalikannya ke kolom
+# `device` dan `date`. Tanggal = tanggal lokal host dari kolom `timestamp`.
+#
+# Penulisan streaming: baris ditampung per partisi sebagai array numpy dan
+# ditulis satu row group setiap ROW_GROUP_ROWS baris. Jumlah partisi yang
+# terbuka dibatasi MAX_OPEN_PARTITIONS (yang paling lama tidak dipakai
+# ditutup; data berikutnya masuk file part berikutnya), jadi memori tetap
+# sekitar ROW_GROUP_ROWS x MAX_OPEN_PARTITIONS baris berapa pun besar
+# riwayatnya. Saat hari baru muncul untuk satu alat, file hari sebelumnya
+# ditutup. Tanpa pyarrow, format "auto" memakai CSV.
+#
+# Untuk data live (`bpmpro serve --export`), Exporter dengan flush_interval
+# meneruskan buffer record() paling lambat tiap FLUSH_INTERVAL detik dan
+# menutup partisi yang tidak menerima baris baru selama IDLE_CLOSE detik
+# (atau yang sudah terbuka MAX_PARTITION_AGE detik, untuk alat yang terus
+# mengirim). File Parquet / Arrow baru terbaca setelah ditutup, jadi hasil
+# pengukuran sudah ada di disk beberapa detik setelah alat diam; baris
+# berikutnya masuk file part berikutnya.
+#
+# Sumber:
+#   python export.py archive HASIL_ARCHIVE/ OUT/       (archive.py)
+#   python export.py store bpm_data/ OUT/              (storage.py)
+#   python export.py curves kurva/ OUT/                (waveform.py, .bpwf)
+#   python -m bpmpro serve --all-devices --export OUT/ (langsung dari alat)
+
+import csv
+import os
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from urllib.parse import quote
+
+import numpy as np
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from packets import MeasurementResult, RealtimePressure
+
+FORMATS = ("parquet", "arrow", "csv")
+EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+
+ROW_GROUP_ROWS = 64 * 1024
+MAX_OPEN_PARTITIONS = 64
+# Baris per potongan saat membaca sumber besar (archive)
+BATCH_ROWS = 256 * 1024
+# Baris per alat yang ditampung record() sebelum diteruskan ke penulis
+RECORD_BATCH_ROWS = 4096
+# Data live: jeda maksimum buffer record() dan batas menganggur partisi (detik)
+FLUSH_INTERVAL = 2.0
+IDLE_CLOSE = 5.0
+MAX_PARTITION_AGE = 300.0
+
+# Kolom per tabel: (nama, dtype numpy). Dtype "<f8" bernama timestamp =
+# detik epoch host; "M8[m]" = jam dinding perangkat (tanpa zona, NaT = tidak
+# valid).
+TABLES = {
+    "results": (
+        ("timestamp", "<f8"),
+        ("systolic", "<u2"),
+        ("diastolic", "<u2"),
+        ("mean", "<u2"),
+        ("heart_rate", "<u2"),
+        ("measured_at", "M8[m]"),
+    ),
+    "pressure": (
+        ("timestamp", "<f8"),
+        ("pressure", "<u2"),
+    ),
+}
+
+
+class ExportError(ValueError):
+    """Format tidak tersedia atau sumber tidak valid."""
+
+
+def resolve_format(fmt: str = "auto") -> str:
+    if fmt == "auto":
+        return "parquet" if pyarrow is not None else "csv"
+    if fmt not in FORMATS:
+        raise ExportError(f"Format tidak dikenal: {fmt} (pilih {', '.join(FORMATS)} atau auto)")
+    if fmt != "csv" and pyarrow is None:
+        raise ExportError(f"Format {fmt} butuh pyarrow (pip install pyarrow), atau pakai format csv")
+    return fmt
+
+
+def wall_time(year, month, day, hour, minute):
+    """Kolom waktu perangkat (datetime64[m]); tanggal tidak valid -> NaT."""
+    y = np.asarray(year, dtype=np.int64)
+    m = np.asarray(month, dtype=np.int64)
+    d = np.asarray(day, dtype=np.int64)
+    hh = np.asarray(hour, dtype=np.int64)
+    mm = np.asarray(minute, dtype=np.int64)
+    valid = (y >= 1) & (m >= 1) & (m <= 12) & (d >= 1) & (hh < 24) & (mm < 60)
+
+    months = np.where(valid, (y - 1970) * 12 + m - 1, 0).astype("M8[M]")
+    days_in_month = ((months + 1).astype("M8[D]") - months.astype("M8[D]")).astype(np.int64)
+    valid &= d <= days_in_month
+
+    minutes = np.where(valid, (d - 1) * 1440 + hh * 60 + mm, 0).astype("m8[m]")
+    result = months.astype("M8[m]") + minutes
+    result[~valid] = np.datetime64("NaT")
+    return result
+
+
+def _local_days(timestamps):
+    """(label tanggal, indeks label per baris) menurut tanggal lokal host."""
+    lo = float(timestamps.min())
+    hi = float(timestamps.max())
+    t = time.localtime(lo)
+    y, m, d = t.tm_year, t.tm_mon, t.tm_mday
+    bounds = []
+    labels = []
+    while True:
+        midnight = time.mktime((y, m, d, 0, 0, 0, 0, 0, -1))
+        if bounds and midnight > hi:
+            break
+        day = time.localtime(midnight)
+        bounds.append(midnight)
+        labels.append(f"{day.tm_year:04d}-{day.tm_mon:02d}-{day.tm_mday:02d}")
+        y, m, d = day.tm_year, day.tm_mon, day.tm_mday + 1
+    index = np.searchsorted(np.array(bounds), timestamps, side="right") - 1
+    return labels, np.maximum(index, 0)
+
+
+# ================= FILE PER FORMAT =================
+
+class _CsvFile:
+    def __init__(self, path: str, columns):
+        self.columns = columns
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(name for name, _ in columns)
+
+    def write(self, data: dict):
+        values = []
+        for name, dtype in self.columns:
+            column = data[name]
+            if dtype == "M8[m]":
+                text = np.datetime_as_string(column, unit="m")
+                text[np.isnat(column)] = ""
+                values.append(np.char.replace(text, "T", " ").tolist())
+            else:
+                values.append(column.tolist())
+        self._writer.writerows(zip(*values))
+
+    def close(self):
+        self._file.close()
+
+
+def _arrow_schema(columns):
+    fields = []
+    for name, dtype in columns:
+        if name == "timestamp":
+            fields.append(pyarrow.field(name, pyarrow.timestamp("us", tz="UTC")))
+        elif dtype == "M8[m]":
+            fields.append(pyarrow.field(name, pyarrow.timestamp("s")))
+        else:
+            fields.append(pyarrow.field(name, pyarrow.from_numpy_dtype(np.dtype(dtype))))
+    return pyarrow.schema(fields)
+
+
+def _arrow_arrays(columns, schema, data: dict) -> list:
+    arrays = []
+    for (name, dtype), field in zip(columns, schema):
+        column = data[name]
+        if name == "timestamp":
+            micros = np.round(column * 1e6).astype(np.int64)
+            arrays.append(pyarrow.array(micros, type=field.type))
+        elif dtype == "M8[m]":
+            arrays.append(pyarrow.array(column.astype("M8[s]").astype(np.int64), type=field.type,
+                                        mask=np.isnat(column)))
+        else:
+            arrays.append(pyarrow.array(column, type=field.type))
+    return arrays
+
+
+class _ParquetFile:
+    def __init__(self, path: str, columns):
+        self.columns = columns
+        self.schema = _arrow_schema(columns)
+        self._writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, data: dict):
+        table = pyarrow.Table.from_arrays(_arrow_arrays(self.columns, self.schema, data),
+                                          schema=self.schema)
+        self._writer.write_table(table, row_group_size=table.num_rows)
+
+    def close(self):
+        self._writer.close()
+
+
+class _ArrowFile:
+    """Arrow IPC (file format / Feather v2), satu record batch per row group."""
+
+    def __init__(self, path: str, columns):
+        self.columns = columns
+        self.schema = _arrow_schema(columns)
+        self._sink = pyarrow.OSFile(path, "wb")
+        self._writer = pyarrow.ipc.new_file(self._sink, self.schema)
+
+    def write(self, data: dict):
+        batch = pyarrow.record_batch(_arrow_arrays(self.columns, self.schema, data),
+                                     schema=self.schema)
+        self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+        self._sink.close()
+
+
+FILE_TYPES = {"parquet": _ParquetFile, "arrow": _ArrowFile, "csv": _CsvFile}
+
+
+# ================= PENULIS TERPARTISI =================
+
+class _Partition:
+    __slots__ = ("directory", "chunks", "rows", "file", "opened_at", "last_write")
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.chunks = []
+        self.rows = 0
+        self.file = None
+        self.opened_at = self.last_write = time.monotonic()
+
+
+class PartitionedWriter:
+    """
+    Satu tabel (TABLES) ke ROOT/<tabel>/device=<tag>/date=<tanggal>/.
+
+        writer = PartitionedWriter("ekspor", "pressure")
+        writer.write("bpm_10c4ea60", {"timestamp": ts, "pressure": p})
+        writer.close()
+    """
+
+    def __init__(self, root: str, table: str, fmt: str = "auto",
+                 row_group_rows: int = ROW_GROUP_ROWS, max_open: int = MAX_OPEN_PARTITIONS):
+        self.root = root
+        self.table = table
+        self.columns = TABLES[table]
+        self.format = resolve_format(fmt)
+        self.row_group_rows = row_group_rows
+        self.max_open = max_open
+        self._partitions = OrderedDict()
+        self.rows = 0
+        self.files = 0
+        self.row_groups = 0
+
+    def write(self, device: str, data: dict):
+        """Baris satu alat; `data` = {kolom: array} dengan panjang sama."""
+        timestamps = np.asarray(data["timestamp"], dtype="<f8")
+        if not len(timestamps):
+            return
+        data = {name: np.asarray(data[name], dtype=dtype) for name, dtype in self.columns}
+        labels, index = _local_days(timestamps)
+        if len(labels) == 1:
+            self._append((device, labels[0]), data)
+            return
+        for i, label in enumerate(labels):
+            mask = index == i
+            if mask.any():
+                self._append((device, label), {name: column[mask] for name, column in data.items()})
+
+    def _append(self, key, data: dict):
+        part = self._partitions.get(key)
+        if part is None:
+            # Data berurutan waktu: hari baru berarti file hari sebelumnya
+            # milik alat ini bisa ditutup (Parquet baru terbaca setelah ditutup)
+            for old_key in [k for k in self._partitions if k[0] == key[0] and k[1] < key[1]]:
+                self._close(self._partitions.pop(old_key))
+            if len(self._partitions) >= self.max_open:
+                _, oldest = self._partitions.popitem(last=False)
+                self._close(oldest)
+            device, day = key
+            directory = os.path.join(self.root, self.table, f"device={quote(device, safe='')}",
+                                     f"date={day}")
+            part = self._partitions[key] = _Partition(directory)
+        else:
+            self._partitions.move_to_end(key)
+
+        part.chunks.append(data)
+        part.last_write = time.monotonic()
+        part.rows += len(data["timestamp"])
+        self.rows += len(data["timestamp"])
+        if part.rows >= self.row_group_rows:
+            self._flush(part, final=False)
+
+    def _open(self, part: _Partition):
+        os.makedirs(part.directory, exist_ok=True)
+        ext = EXTENSIONS[self.format]
+        number = 0
+        while os.path.exists(os.path.join(part.directory, f"part-{number:05d}{ext}")):
+            number += 1
+        part.file = FILE_TYPES[self.format](os.path.join(part.directory, f"part-{number:05d}{ext}"),
+                                            self.columns)
+        self.files += 1
+
+    def _flush(self, part: _Partition, final: bool):
+        if not part.rows:
+            return
+        merged = {name: np.concatenate([c[name] for c in part.chunks]) for name, _ in self.columns}
+        size = self.row_group_rows
+        # Sisa di bawah satu row group tetap ditampung kecuali saat ditutup
+        full = part.rows if final else part.rows - part.rows % size
+        if part.file is None:
+            self._open(part)
+        for start in range(0, full, size):
+            part.file.write({name: column[start:min(start + size, full)] for name, column in merged.items()})
+            self.row_groups += 1
+        part.chunks = [{name: column[full:] for name, column in merged.items()}] if full < part.rows else []
+        part.rows -= full
+
+    def _close(self, part: _Partition):
+        self._flush(part, final=True)
+        if part.file is not None:
+            part.file.close()
+            part.file = None
+
+    def close_idle(self, idle: float, max_age: float = MAX_PARTITION_AGE) -> int:
+        """
+        Menutup partisi tanpa baris baru selama `idle` detik atau yang sudah
+        terbuka `max_age` detik. Mengembalikan jumlah partisi yang ditutup.
+        """
+        now = time.monotonic()
+        keys = [
+            key for key, part in self._partitions.items()
+            if now - part.last_write >= idle or now - part.opened_at >= max_age
+        ]
+        for key in keys:
+            self._close(self._partitions.pop(key))
+        return len(keys)
+
+    def close(self):
+        while self._partitions:
+            _, part = self._partitions.popitem(last=False)
+            self._close(part)
+
+
+class _RowBuffer:
+    """Penampung baris per alat untuk Exporter.record()."""
+
+    __slots__ = ("timestamp", "values")
+
+    def __init__(self, typecodes: str):
+        self.timestamp = array("d")
+        self.values = [array(code) for code in typecodes]
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def take(self):
+        # Array lama tidak diubah lagi, jadi numpy cukup memakai buffernya
+        columns = [np.frombuffer(self.timestamp, dtype="<f8")]
+        columns += [np.frombuffer(v, dtype=v.typecode) for v in self.values]
+        self.timestamp = array("d")
+        self.values = [array(v.typecode) for v in self.values]
+        return columns
+
+
+class Exporter:
+    """
+    Tabel `results` dan `pressure` di satu direktori. `record()` menerima
+    TaggedPacket dari DeviceManager.stream() (seperti MeasurementStore);
+    `write_results()` / `write_pressure()` menerima kolom sekaligus.
+
+    Dengan `flush_interval` (data live), record() memanggil poll() paling
+    lambat tiap flush_interval detik; saat alat diam poll() dipanggil timer
+    pemilik Exporter (lihat `bpmpro serve`).
+    """
+
+    def __init__(self, root: str, fmt: str = "auto", row_group_rows: int = ROW_GROUP_ROWS,
+                 max_open: int = MAX_OPEN_PARTITIONS, flush_interval: float = None,
+                 idle_close: float = IDLE_CLOSE, max_age: float = MAX_PARTITION_AGE):
+        self.root = root
+        self.results = PartitionedWriter(root, "results", fmt, row_group_rows, max_open)
+        self.pressure = PartitionedWriter(root, "pressure", fmt, row_group_rows, max_open)
+        self.format = self.results.format
+        self.flush_interval = flush_interval
+        self.idle_close = idle_close
+        self.max_age = max_age
+        self._results = {}
+        self._pressure = {}
+        self._last_poll = time.monotonic()
+
+    def write_results(self, device: str, timestamp, systolic, diastolic, mean, heart_rate, measured_at):
+        self.results.write(device, {
+            "timestamp": timestamp, "systolic": systolic, "diastolic": diastolic,
+            "mean": mean, "heart_rate": heart_rate, "measured_at": measured_at,
+        })
+
+    def write_pressure(self, device: str, timestamp, pressure):
+        self.pressure.write(device, {"timestamp": timestamp, "pressure": pressure})
+
+    def add_result(self, device: str, timestamp: float, result):
+        """Satu MeasurementResult (atau record dengan field yang sama)."""
+        buf = self._results.get(device)
+        if buf is None:
+            # sys, dia, mean, hr, year, month, day, hour, minute
+            buf = self._results[device] = _RowBuffer("HHHHHBBBB")
+        buf.timestamp.append(timestamp)
+        for column, value in zip(buf.values, result):
+            column.append(value)
+        if len(buf) >= RECORD_BATCH_ROWS:
+            self._flush_results(device, buf)
+
+    def add_pressure(self, device: str, timestamp: float, pressure: int):
+        buf = self._pressure.get(device)
+        if buf is None:
+            buf = self._pressure[device] = _RowBuffer("H")
+        buf.timestamp.append(timestamp)
+        buf.values[0].append(pressure)
+        if len(buf) >= RECORD_BATCH_ROWS:
+            self._flush_pressure(device, buf)
+
+    def record(self, item) -> bool:
+        """TaggedPacket dari DeviceManager.stream(); tipe lain diabaikan."""
+        packet_type = type(item.packet)
+        if packet_type is RealtimePressure:
+            self.add_pressure(item.device, item.timestamp, item.packet.pressure)
+        elif packet_type is MeasurementResult:
+            self.add_result(item.device, item.timestamp, item.packet)
+        else:
+            return False
+        if self.flush_interval is not None and time.monotonic() - self._last_poll >= self.flush_interval:
+            self.poll()
+        return True
+
+    def _flush_results(self, device: str, buf: _RowBuffer):
+        ts, sys_, dia, mean, hr, year, month, day, hour, minute = buf.take()
+        self.write_results(device, ts, sys_, dia, mean, hr, wall_time(year, month, day, hour, minute))
+
+    def _flush_pressure(self, device: str, buf: _RowBuffer):
+        ts, pressure = buf.take()
+        self.write_pressure(device, ts, pressure)
+
+    def flush(self):
+        """Teruskan baris dari record() ke penulis (file tetap terbuka)."""
+        for device, buf in self._results.items():
+            if len(buf):
+                self._flush_results(device, buf)
+        for device, buf in self._pressure.items():
+            if len(buf):
+                self._flush_pressure(device, buf)
+
+    def poll(self):
+        """
+        Flush berbasis waktu untuk data live: buffer record() diteruskan ke
+        penulis, lalu partisi yang menganggur `idle_close` detik (atau terbuka
+        `max_age` detik) ditutup supaya file-nya lengkap dan bisa dibaca.
+        """
+        self._last_poll = time.monotonic()
+        self.flush()
+        self.results.close_idle(self.idle_close, self.max_age)
+        self.pressure.close_idle(self.idle_close, self.max_age)
+
+    def close(self):
+        self.flush()
+        self.results.close()
+        self.pressure.close()
+
+    def summary(self) -> dict:
+        return {
+            "format": self.format,
+            "results": self.results.rows,
+            "pressure": self.pressure.rows,
+            "files": self.results.files + self.pressure.files,
+            "row_groups": self.results.row_groups + self.pressure.row_groups,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ================= SUMBER =================
+
+def _by_device(device_column, *columns):
+    """Pecah kolom per nilai device (urutan baris per alat tetap)."""
+    order = np.argsort(device_column, kind="stable")
+    devices, starts = np.unique(device_column[order], return_index=True)
+    bounds = list(starts[1:]) + [len(order)]
+    for device, start, stop in zip(devices.tolist(), starts.tolist(), bounds):
+        rows = order[start:stop]
+        yield device, [column[rows] for column in columns]
+
+
+def export_archive(path: str, exporter: Exporter, batch_rows: int = BATCH_ROWS):
+    """Hasil archive.py (kolom memmap) dibaca per `batch_rows` baris."""
+    from archive import ArchiveError, load_columns, load_devices, load_meta
+
+    meta = load_meta(path)
+    try:
+        realtime = meta["kinds"].index("realtime")
+        result = meta["kinds"].index("result")
+    except ValueError:
+        raise ArchiveError(f"{path}: daftar kind tidak lengkap")
+    devices = load_devices(path)
+    data = load_columns(path)
+
+    for start in range(0, meta["rows"], batch_rows):
+        part = {name: column[start:start + batch_rows] for name, column in data.items()}
+        kind = np.asarray(part["kind"])
+
+        mask = kind == realtime
+        if mask.any():
+            for device, (ts, pressure) in _by_device(part["device"][mask], part["timestamp"][mask],
+                                                     part["value"][mask]):
+                exporter.write_pressure(devices[device], ts, pressure)
+
+        mask = kind == result
+        if mask.any():
+            columns = [part[name][mask] for name in ("timestamp", "systolic", "diastolic", "mean",
+                                                     "heart_rate", "year", "month", "day", "hour",
+                                                     "minute")]
+            for device, (ts, sys_, dia, mean, hr, *clock) in _by_device(part["device"][mask], *columns):
+                exporter.write_results(devices[device], ts, sys_, dia, mean, hr, wall_time(*clock))
+
+
+def export_store(path: str, exporter: Exporter, start: float = None, end: float = None):
+    """Hasil 0x22 dari MeasurementStore (storage.py)."""
+    from storage import KIND_RESULT, MeasurementStore
+
+    if not os.path.isdir(path):
+        raise ExportError(f"{path}: direktori MeasurementStore tidak ada")
+    with MeasurementStore(path) as store:
+        for rec in store.query(start=start, end=end, kind=KIND_RESULT):
+            exporter.add_result(rec.device, rec.timestamp, rec[4:])
+
+
+def export_curves(directory: str, exporter: Exporter):
+    """Sampel tekanan dari file kurva .bpwf (waveform.py)."""
+    import glob
+
+    from waveform import CURVE_SUFFIX, load_curve
+
+    for path in sorted(glob.glob(os.path.join(directory, f"*{CURVE_SUFFIX}"))):
+        curve = load_curve(path)
+        timestamps = curve.started_at + np.asarray(curve.timestamps, dtype="<f8")
+        exporter.write_pressure(curve.device, timestamps, curve.pressures)
+
+
+SOURCES = {"archive": export_archive, "store": export_store, "curves": export_curves}
+
+
+# ================= CLI =================
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ekspor hasil & tekanan BPMPRO 2 ke Parquet/Arrow/CSV")
+    parser.add_argument("source", choices=sorted(SOURCES), help="jenis sumber")
+    parser.add_argument("path", help="direktori sumber")
+    parser.add_argument("out", help="direktori hasil ekspor")
+    parser.add_argument("--format", default="auto", choices=("auto",) + FORMATS,
+                        help="auto = parquet bila pyarrow ada, selain itu csv")
+    parser.add_argument("--row-group", type=int, default=ROW_GROUP_ROWS, help="baris per row group")
+    parser.add_argument("--max-open", type=int, default=MAX_OPEN_PARTITIONS,
+                        help="partisi (alat x hari) yang boleh terbuka bersamaan")
+    args = parser.parse_args(argv)
+
+    from archive import ArchiveError
+
+    try:
+        exporter = Exporter(args.out, args.format, args.row_group, args.max_open)
+        if args.format == "auto" and exporter.format == "csv":
+            print("ℹ️ pyarrow tidak terpasang, ekspor memakai CSV")
+        start = time.perf_counter()
+        with exporter:
+            SOURCES[args.source](args.path, exporter)
+    except (OSError, ValueError, ArchiveError) as e:
+        print(f"❌ {e}")
+        return 1
+    except KeyboardInterrupt:
+        return 130
+
+    summary = exporter.summary()
+    print(f"✔ Ekspor {summary['format']} ke {args.out}: {summary['results']:,} hasil, "
+          f"{summary['pressure']:,} sampel tekanan, {summary['files']} file, "
+          f"{summary['row_groups']} row group ({time.perf_counter() - start:.1f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# ==========================================
+# FRAME DECODER (BUFFERED, INCREMENTAL)
+# ==========================================
+#
+# Menggantikan pola `find_start_byte` yang membaca port 1 byte per syscall.
+# Decoder menerima potongan data berukuran bebas (misalnya sebanyak
+# `ser.in_waiting`), menyimpannya di satu bytearray yang dipakai ulang, lalu
+# mengeluarkan frame lengkap berawalan 0x5A sebagai memoryview tanpa salinan.
+
+from crc16 import CRC_LITTLE, check_frame
+
+START_BYTE = 0x5A
+
+# Start(1) + Len(1) + ID(1) + Param(1) + CRC(2)
+MIN_FRAME_LEN = 6
+# Field length hanya 1 byte
+MAX_FRAME_LEN = 0xFF
+
+DEFAULT_CAPACITY = 4096
+
+
+class FrameDecoder:
+    """
+    Decoder frame inkremental.
+
+        decoder = FrameDecoder()
+        decoder.feed(chunk)
+        for frame in decoder.frames():
+            parse_packet(frame)
+
+    Frame yang dihasilkan adalah memoryview ke buffer internal dan hanya valid
+    sampai pemanggilan `feed()` / `read_from()` berikutnya. Gunakan
+    `bytes(frame)` bila frame perlu disimpan lebih lama.
+
+    Jika field length tidak masuk akal atau CRC salah, decoder bergeser satu
+    byte dan mencari 0x5A berikutnya (resync). Semua byte yang dibuang
+    dihitung di `dropped_bytes`.
+    """
+
+    __slots__ = (
+        "_buf", "_view", "_start", "_end", "verify_crc",
+        "frames_ok", "dropped_bytes", "crc_errors", "length_errors", "resyncs", "bytes_in",
+        "crc_little_endian",
+    )
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, verify_crc: bool = True):
+        capacity = max(capacity, MAX_FRAME_LEN * 2)
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+        self.verify_crc = verify_crc
+
+        self.frames_ok = 0
+        self.dropped_bytes = 0
+        self.crc_errors = 0
+        self.length_errors = 0
+        self.resyncs = 0
+        self.bytes_in = 0
+        self.crc_little_endian = 0
+
+    # ================= BUFFER =================
+
+    def __len__(self):
+        """Jumlah byte yang belum menjadi frame."""
+        return self._end - self._start
+
+    def pending(self) -> bytes:
+        """Salinan byte yang belum menjadi frame (misalnya frame terpotong)."""
+        return bytes(self._view[self._start:self._end])
+
+    def clear(self):
+        """Membuang isi buffer (padanan `ser.reset_input_buffer()`)."""
+        self._start = 0
+        self._end = 0
+
+    def _reserve(self, n: int):
+        """Menjamin ada ruang `n` byte di ujung buffer."""
+        if len(self._buf) - self._end >= n:
+            return
+
+        pending = self._end - self._start
+        if pending + n > len(self._buf):
+            # Buffer baru; memoryview lama yang masih dipegang pemanggil tetap
+            # menunjuk ke buffer lama sehingga tidak rusak.
+            new_buf = bytearray(max(len(self._buf) * 2, pending + n))
+            new_buf[:pending] = self._view[self._start:self._end]
+            self._buf = new_buf
+            self._view = memoryview(new_buf)
+        else:
+            # Geser sisa data (biasanya < 1 frame) ke awal buffer.
+            self._buf[:pending] = bytes(self._view[self._start:self._end])
+        self._start = 0
+        self._end = pending
+
+    def feed(self, data):
+        """Menambahkan potongan byte mentah ke buffer."""
+        n = len(data)
+        if not n:
+            return
+        self._reserve(n)
+        self._view[self._end:self._end + n] = data
+        self._end += n
+        self.bytes_in += n
+
+    def read_from(self, ser) -> int:
+        """
+        Membaca semua byte yang sudah menunggu di port dalam satu panggilan
+        `read()`. Jika belum ada data, menunggu 1 byte sesuai timeout port.
+        """
+        data = ser.read(ser.in_waiting or 1)
+        self.feed(data)
+        return len(data)
+
+    # ================= FRAMING =================
+
+    def frames(self):
+        """Generator frame lengkap (memoryview) yang sudah ada di buffer."""
+        buf = self._buf
+        view = self._view
+        pos = self._start
+        end = self._end
+        verify = self.verify_crc
+
+        while pos < end:
+            if buf[pos] != START_BYTE:
+                idx = buf.find(START_BYTE, pos, end)
+                if idx < 0:
+                    self.dropped_bytes += end - pos
+                    pos = end
+                    break
+                self.dropped_bytes += idx - pos
+                pos = idx
+
+            if end - pos < 2:
+                break
+
+            length = buf[pos + 1]
+            if length < MIN_FRAME_LEN:
+                self.length_errors += 1
+                self.resyncs += 1
+                self.dropped_bytes += 1
+                pos += 1
+                continue
+
+            if end - pos < length:
+                break
+
+            frame = view[pos:pos + length]
+            if verify:
+                order = check_frame(frame)
+                if not order:
+                    self.crc_errors += 1
+                    self.resyncs += 1
+                    self.dropped_bytes += 1
+                    pos += 1
+                    continue
+                if order == CRC_LITTLE:
+                    self.crc_little_endian += 1
+
+            pos += length
+            self._start = pos
+            self.frames_ok += 1
+            yield frame
+
+        self._start = pos
+        if pos == end:
+            self._start = self._end = 0
+
+    def read_frames(self, ser):
+        """Satu putaran baca port + ekstraksi frame."""
+        self.read_from(ser)
+        return self.frames()
+
+    def stats(self) -> dict:
+        return {
+            "frames_ok": self.frames_ok,
+            "dropped_bytes": self.dropped_bytes,
+            "crc_errors": self.crc_errors,
+            "crc_little_endian": self.crc_little_endian,
+            "length_errors": self.length_errors,
+            "resyncs": self.resyncs,
+        }
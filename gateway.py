@@ -0,0 +1,499 @@
+# ==========================================
+# GATEWAY HTTP / SSE / WEBSOCKET LOKAL
+# ==========================================
+#
+# Satu server asyncio (hanya stdlib) di atas DeviceManager, supaya banyak
+# dashboard bisa memantau banyak perangkat tanpa membaca konsol:
+#
+#   GET  /devices                          health semua perangkat
+#   POST /devices/<tag>/<perintah>         start, stop, get-id, set-id {"id"},
+#                                          calibrate {"pressure"}, calibrate-set
+#                                          {"pressure"}, calibrate-cancel, lock,
+#                                          unlock, language {"code"}
+#   GET  /devices/<tag>/records?start=&end=&limit=   hasil tersimpan (MeasurementStore)
+#   GET  /devices/<tag>/history?first=&count=        memori perangkat (0x2C)
+#   GET  /events?device=a,b&types=realtime,result    Server-Sent Events
+#   GET  /ws?device=...&types=...                    WebSocket (teks JSON)
+#   GET  /stats                            klien, sampel digabung, event dibuang
+#   GET  /metrics                          metrik per perangkat (teks Prometheus)
+#
+# Perintah POST wajib `Content-Type: application/json` (selain itu 415), jadi
+# browser tidak bisa mengirimnya sebagai "simple request" lintas origin tanpa
+# preflight. CORS untuk perintah hanya diberikan ke origin dashboard yang
+# terdaftar (`allowed_origins`); origin lain ditolak 403. Endpoint baca (GET)
+# tetap `Access-Control-Allow-Origin: *`.
+#
+# Backpressure: pembaca serial tidak pernah menunggu klien. Setiap klien
+# punya ClientFeed; sampel realtime 0x28 per perangkat hanya disimpan yang
+# terbaru (klien lambat menerima sampel yang digabung), sedangkan hasil 0x22
+# dan error 0x25 diantrekan sampai FEED_EVENT_LIMIT (lebih dari itu yang
+# tertua dibuang dan dihitung).
+
+import asyncio
+import base64
+import hashlib
+import json
+from collections import deque
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from packets import RealtimePressure
+from render import PACKET_TYPE_NAMES, packet_to_dict
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+FEED_EVENT_LIMIT = 256
+HEARTBEAT_INTERVAL = 15.0
+MAX_HEADER_SIZE = 16 * 1024
+MAX_BODY_SIZE = 64 * 1024
+
+JSON_CONTENT_TYPE = "application/json"
+CORS_ANY = ("Access-Control-Allow-Origin: *",)
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_TEXT = 0x1
+WS_CLOSE = 0x8
+WS_PING = 0x9
+WS_PONG = 0xA
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# ================= FEED PER KLIEN =================
+
+class ClientFeed:
+    """Antrian satu klien: realtime digabung per perangkat, hasil/error diantrekan."""
+
+    __slots__ = ("devices", "types", "latest", "events", "limit", "wakeup", "coalesced", "dropped", "sent")
+
+    def __init__(self, devices=None, types=None, limit: int = FEED_EVENT_LIMIT):
+        self.devices = devices
+        self.types = types
+        self.latest = {}
+        self.events = deque()
+        self.limit = limit
+        self.wakeup = asyncio.Event()
+        self.coalesced = 0
+        self.dropped = 0
+        self.sent = 0
+
+    def push(self, item):
+        """Dipanggil dari task dispatch; O(1), tidak pernah menunggu klien."""
+        if self.devices and item.device not in self.devices:
+            return
+        packet_type = type(item.packet)
+        if self.types and PACKET_TYPE_NAMES.get(packet_type) not in self.types:
+            return
+        if packet_type is RealtimePressure:
+            if item.device in self.latest:
+                self.coalesced += 1
+            self.latest[item.device] = item
+        else:
+            if len(self.events) >= self.limit:
+                self.events.popleft()
+                self.dropped += 1
+            self.events.append(item)
+        self.wakeup.set()
+
+    def take(self) -> list:
+        items = list(self.events)
+        items.extend(self.latest.values())
+        self.events.clear()
+        self.latest.clear()
+        self.wakeup.clear()
+        items.sort(key=lambda item: item.timestamp)
+        self.sent += len(items)
+        return items
+
+
+def event_json(item) -> str:
+    return json.dumps(
+        {"device": item.device, "ts": item.timestamp, **packet_to_dict(item.packet)},
+        separators=(",", ":"),
+    )
+
+
+def _csv_set(query, name):
+    values = [v for raw in query.get(name, ()) for v in raw.split(",") if v]
+    return frozenset(values) or None
+
+
+# ================= HTTP =================
+
+async def _read_request(reader):
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.LimitOverrunError:
+        raise HttpError(431, "Header terlalu besar") from None
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Request line tidak valid") from None
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    length = headers.get("content-length") or "0"
+    # Hanya angka desimal: int() juga menerima "-1", "+5" dan "1_0"
+    if not (length.isascii() and length.isdigit()):
+        raise HttpError(400, "Content-Length tidak valid")
+    length = int(length)
+    if length > MAX_BODY_SIZE:
+        raise HttpError(413, "Body terlalu besar")
+    body = await reader.readexactly(length) if length else b""
+    url = urlsplit(target)
+    return method.upper(), url.path.rstrip("/") or "/", parse_qs(url.query), headers, body
+
+
+def _response(status: int, body: bytes = b"", content_type: str = JSON_CONTENT_TYPE,
+              headers: tuple = CORS_ANY) -> bytes:
+    lines = [
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        "Connection: close",
+        *headers,
+    ]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def _json_response(status: int, data, headers: tuple = CORS_ANY) -> bytes:
+    body = json.dumps(data, separators=(",", ":"), default=str).encode("utf-8")
+    return _response(status, body, headers=headers)
+
+
+# ================= WEBSOCKET =================
+
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    length = len(payload)
+    if length < 126:
+        header = bytes((0x80 | opcode, length))
+    elif length < 1 << 16:
+        header = bytes((0x80 | opcode, 126)) + length.to_bytes(2, "big")
+    else:
+        header = bytes((0x80 | opcode, 127)) + length.to_bytes(8, "big")
+    return header + payload
+
+
+async def _ws_read_frame(reader):
+    """Satu frame dari klien (selalu ter-mask menurut RFC 6455): (opcode, payload)."""
+    b0, b1 = await reader.readexactly(2)
+    length = b1 & 0x7F
+    if length == 126:
+        length = int.from_bytes(await reader.readexactly(2), "big")
+    elif length == 127:
+        length = int.from_bytes(await reader.readexactly(8), "big")
+    if length > MAX_BODY_SIZE:
+        raise HttpError(413, "Frame WebSocket terlalu besar")
+    mask = await reader.readexactly(4) if b1 & 0x80 else b"\x00\x00\x00\x00"
+    data = bytearray(await reader.readexactly(length))
+    for i in range(length):
+        data[i] ^= mask[i & 3]
+    return b0 & 0x0F, bytes(data)
+
+
+# ================= GATEWAY =================
+
+COMMAND_ROUTES = {
+    "start": lambda session, body: session.start_measurement(),
+    "stop": lambda session, body: session.stop_measurement(),
+    "get-id": lambda session, body: session.get_device_id(),
+    "set-id": lambda session, body: session.set_device_id(str(body["id"])),
+    "calibrate": lambda session, body: session.start_calibration(int(body["pressure"])),
+    "calibrate-set": lambda session, body: session.set_calibration_pressure(int(body["pressure"])),
+    "calibrate-cancel": lambda session, body: session.cancel_calibration(),
+    "lock": lambda session, body: session.set_button_lock(True),
+    "unlock": lambda session, body: session.set_button_lock(False),
+    "language": lambda session, body: session.set_language(int(body["code"])),
+}
+
+
+class Gateway:
+    """
+        gateway = Gateway(manager, store)
+        await gateway.start()
+        ...
+        await gateway.close()
+    """
+
+    def __init__(self, manager, store=None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 feed_limit: int = FEED_EVENT_LIMIT, allowed_origins=()):
+        self.manager = manager
+        self.store = store
+        self.host = host
+        self.port = port
+        self.feed_limit = feed_limit
+        # Origin dashboard yang boleh mengirim perintah dari browser
+        self.allowed_origins = frozenset(allowed_origins)
+        self.feeds = set()
+        self.requests = 0
+        self._server = None
+        self._dispatcher = None
+        self._clients = set()
+
+    async def start(self):
+        self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_HEADER_SIZE)
+        if self.port == 0:
+            self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            # Klien SSE / WebSocket tidak pernah selesai sendiri
+            for task in list(self._clients):
+                task.cancel()
+            await asyncio.gather(*self._clients, return_exceptions=True)
+            await self._server.wait_closed()
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+
+    async def _dispatch(self):
+        """Satu-satunya konsumen manager.stream(): simpan lalu sebar ke semua feed."""
+        store = self.store
+        async for item in self.manager.stream():
+            if store is not None and store.record(item):
+                store.flush()
+            for feed in self.feeds:
+                feed.push(item)
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self.feeds),
+            "requests": self.requests,
+            "sent": sum(f.sent for f in self.feeds),
+            "coalesced": sum(f.coalesced for f in self.feeds),
+            "dropped": sum(f.dropped for f in self.feeds),
+        }
+
+    # ----- koneksi -----
+
+    def _command_cors(self, headers) -> tuple:
+        """Header CORS untuk perintah: hanya origin yang terdaftar, tanpa wildcard."""
+        origin = headers.get("origin")
+        if origin is None or origin not in self.allowed_origins:
+            return ()
+        return (f"Access-Control-Allow-Origin: {origin}", "Vary: Origin")
+
+    def _check_command_request(self, headers):
+        origin = headers.get("origin")
+        if origin is not None and origin not in self.allowed_origins:
+            raise HttpError(403, f"Origin tidak diizinkan: {origin}")
+        media_type = headers.get("content-type", "").split(";", 1)[0].strip().lower()
+        if media_type != JSON_CONTENT_TYPE:
+            raise HttpError(415, f"Perintah wajib Content-Type: {JSON_CONTENT_TYPE}")
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._clients.add(task)
+        cors = CORS_ANY
+        try:
+            try:
+                method, path, query, headers, body = await _read_request(reader)
+                self.requests += 1
+                if method in ("POST", "OPTIONS"):
+                    cors = self._command_cors(headers)
+                if method == "OPTIONS":
+                    writer.write(_response(204, headers=(
+                        *cors,
+                        "Access-Control-Allow-Methods: GET, POST, OPTIONS",
+                        "Access-Control-Allow-Headers: Content-Type",
+                    )))
+                elif path == "/events" and method == "GET":
+                    await self._serve_sse(writer, query)
+                elif path == "/ws" and method == "GET":
+                    await self._serve_ws(reader, writer, query, headers)
+                elif path == "/metrics" and method == "GET":
+                    writer.write(self._metrics())
+                else:
+                    if method == "POST":
+                        self._check_command_request(headers)
+                    status, data = await self._route(method, path, query, body)
+                    writer.write(_json_response(status, data, cors))
+            except HttpError as e:
+                writer.write(_json_response(e.status, {"error": str(e)}, cors))
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            pass  # gateway ditutup
+        finally:
+            self._clients.discard(task)
+            writer.close()
+
+    async def _route(self, method, path, query, body):
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        if parts == ["devices"] and method == "GET":
+            return 200, {"devices": self.manager.health_report()}
+        if parts == ["stats"] and method == "GET":
+            return 200, self.stats()
+        if len(parts) == 3 and parts[0] == "devices":
+            tag, action = parts[1], parts[2]
+            if action == "records" and method == "GET":
+                return 200, self._records(tag, query)
+            if action == "history" and method == "GET":
+                return 200, await self._history(tag, query)
+            if action in COMMAND_ROUTES:
+                if method != "POST":
+                    raise HttpError(405, "Perintah perangkat memakai POST")
+                return 200, await self._command(tag, action, body)
+        raise HttpError(404, f"Tidak ada endpoint {method} {path}")
+
+    def _session(self, tag):
+        session = self.manager.sessions.get(tag)
+        if session is None:
+            raise HttpError(404, f"Perangkat tidak dikenal: {tag}")
+        if session.closed:
+            raise HttpError(503, f"Perangkat {tag} sedang terputus")
+        return session
+
+    # ----- REST -----
+
+    def _metrics(self) -> bytes:
+        if self.manager.metrics is None:
+            raise HttpError(404, "Metrik tidak aktif")
+        body = self.manager.metrics.render().encode("utf-8")
+        return _response(200, body, "text/plain; version=0.0.4; charset=utf-8")
+
+    async def _command(self, tag, action, body):
+        from session import SessionClosed
+
+        session = self._session(tag)
+        try:
+            params = json.loads(body) if body else {}
+            reply = await COMMAND_ROUTES[action](session, params)
+        except (ValueError, KeyError, TypeError) as e:
+            raise HttpError(400, f"Parameter tidak valid: {e}") from None
+        except asyncio.TimeoutError:
+            raise HttpError(504, "Perangkat tidak membalas") from None
+        except SessionClosed:
+            raise HttpError(503, f"Perangkat {tag} terputus") from None
+        return {"device": tag, "command": action, "reply": packet_to_dict(reply)}
+
+    def _records(self, tag, query):
+        if self.store is None:
+            raise HttpError(404, "Penyimpanan tidak aktif (jalankan dengan --store)")
+        try:
+            start = float(query["start"][0]) if "start" in query else None
+            end = float(query["end"][0]) if "end" in query else None
+            limit = int(query["limit"][0]) if "limit" in query else None
+        except ValueError:
+            raise HttpError(400, "start / end / limit harus angka") from None
+        records = []
+        for record in self.store.query(tag, start, end):
+            records.append(record._asdict())
+            if limit is not None and len(records) >= limit:
+                break
+        return {"device": tag, "records": records}
+
+    async def _history(self, tag, query):
+        from history import HistoryDownloadError, download_history
+
+        session = self._session(tag)
+        try:
+            first = int(query["first"][0]) if "first" in query else 0
+            count = int(query["count"][0]) if "count" in query else None
+        except ValueError:
+            raise HttpError(400, "first / count harus angka") from None
+        try:
+            records = [packet_to_dict(r) async for r in download_history(session, first_index=first, count=count)]
+        except (HistoryDownloadError, asyncio.TimeoutError) as e:
+            raise HttpError(504, str(e) or "Perangkat tidak membalas") from None
+        return {"device": tag, "records": records}
+
+    # ----- streaming -----
+
+    def _open_feed(self, query):
+        feed = ClientFeed(_csv_set(query, "device"), _csv_set(query, "types"), self.feed_limit)
+        self.feeds.add(feed)
+        return feed
+
+    async def _next_batch(self, feed):
+        """Batch berikutnya, atau None bila tidak ada data selama HEARTBEAT_INTERVAL."""
+        try:
+            await asyncio.wait_for(feed.wakeup.wait(), HEARTBEAT_INTERVAL)
+        except asyncio.TimeoutError:
+            return None
+        return feed.take()
+
+    async def _serve_sse(self, writer, query):
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+            b"Access-Control-Allow-Origin: *\r\nConnection: close\r\n\r\n"
+        )
+        feed = self._open_feed(query)
+        try:
+            await writer.drain()
+            while not writer.is_closing():
+                items = await self._next_batch(feed)
+                if items is None:
+                    writer.write(b": heartbeat\n\n")
+                else:
+                    writer.write("".join(
+                        f"event: {PACKET_TYPE_NAMES[type(item.packet)]}\ndata: {event_json(item)}\n\n"
+                        for item in items
+                    ).encode("utf-8"))
+                # Klien lambat menahan task ini saja; feed terus menggabungkan sampel
+                await writer.drain()
+        finally:
+            self.feeds.discard(feed)
+
+    async def _serve_ws(self, reader, writer, query, headers):
+        key = headers.get("sec-websocket-key")
+        if headers.get("upgrade", "").lower() != "websocket" or not key:
+            raise HttpError(400, "Butuh upgrade WebSocket")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("ascii")
+        )
+        await writer.drain()
+
+        feed = self._open_feed(query)
+        loop = asyncio.get_running_loop()
+        receiver = loop.create_task(self._ws_receive(reader, writer))
+        waiter = None
+        try:
+            while not writer.is_closing():
+                # Waiter lama dipakai lagi setelah heartbeat; yang baru hanya bila sudah selesai
+                if waiter is None or waiter.done():
+                    waiter = loop.create_task(feed.wakeup.wait())
+                done, _ = await asyncio.wait(
+                    (waiter, receiver), timeout=HEARTBEAT_INTERVAL, return_when=asyncio.FIRST_COMPLETED
+                )
+                if receiver in done:
+                    break
+                if waiter in done:
+                    for item in feed.take():
+                        writer.write(_ws_frame(WS_TEXT, event_json(item).encode("utf-8")))
+                else:
+                    writer.write(_ws_frame(WS_PING, b""))
+                await writer.drain()
+        finally:
+            self.feeds.discard(feed)
+            receiver.cancel()
+            if waiter is not None:
+                waiter.cancel()
+
+    async def _ws_receive(self, reader, writer):
+        """Menjawab ping / close dari klien; pesan teks klien diabaikan."""
+        try:
+            while True:
+                opcode, payload = await _ws_read_frame(reader)
+                if opcode == WS_CLOSE:
+                    writer.write(_ws_frame(WS_CLOSE, payload[:2]))
+                    return
+                if opcode == WS_PING:
+                    writer.write(_ws_frame(WS_PONG, payload))
+        except (ConnectionError, asyncio.IncompleteReadError, HttpError):
+            return
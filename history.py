@@ -0,0 +1,178 @@
+# ==========================================
+# UNDUH RIWAYAT PENGUKURAN (0x2B / 0x2C)
+# ==========================================
+#
+# Membaca jumlah record tersimpan (0x2B), lalu mengambil semua record (0x2C)
+# dengan beberapa permintaan sekaligus di jalur serial.
+#
+# Asumsi protokol (docs.md tidak merinci segmen data 0x2C):
+# - permintaan 0x2C membawa nomor record 2 byte (high byte dulu), mulai dari
+#   `first_index` (default 0);
+# - perangkat membalas berurutan. Jika balasan ikut membawa nomor record,
+#   nomor itu yang dipakai; jika tidak, balasan dicocokkan FIFO.
+#
+# Permintaan dikirim per jendela (`window`). Jendela dianggap berhasil hanya
+# jika semua balasannya datang; jika ada yang hilang, jendela dikirim ulang
+# utuh setelah jeda (backoff) supaya balasan yang terlambat tidak tertukar.
+# Karena itu permintaan 0x2C di sini tidak memakai pengiriman ulang per
+# perintah dari sesi (retries=0).
+
+import asyncio
+import csv
+
+from packets import (
+    PACKET_ID_STORAGE_COUNT,
+    PACKET_ID_STORED_DATA,
+    ErrorReport,
+    StorageCount,
+    StoredResult,
+)
+
+DEFAULT_WINDOW = 8
+WINDOW_TIMEOUT = 2.0
+MAX_RETRIES = 4
+BACKOFF_FACTOR = 2.0
+
+# Kode error 0x25 saat perangkat belum punya riwayat
+ERROR_NO_RECORDS = 0x60
+
+CSV_HEADER = (
+    "index", "systolic", "diastolic", "mean", "heart_rate",
+    "year", "month", "day", "hour", "minute",
+)
+
+
+class HistoryDownloadError(Exception):
+    """Satu jendela permintaan tetap gagal setelah semua percobaan ulang."""
+
+
+async def _wait_no_records(errors) -> bool:
+    """True begitu error 0x25 kode 0x60 datang; False bila sesi ditutup."""
+    async for error in errors:
+        if error.code == ERROR_NO_RECORDS:
+            return True
+    return False
+
+
+async def get_storage_count(session, timeout: float = WINDOW_TIMEOUT) -> int:
+    """
+    Jumlah record di memori perangkat. Perangkat tanpa riwayat bisa membalas
+    dengan error 0x25 kode 0x60, yang dianggap 0 record. Error itu ditunggu
+    bersamaan dengan permintaan 0x2B, jadi hasil 0 langsung didapat tanpa
+    menunggu timeout dan pengiriman ulang.
+    """
+    errors = session.subscribe(ErrorReport)
+    request = asyncio.ensure_future(session.request(PACKET_ID_STORAGE_COUNT, timeout=timeout))
+    no_records = asyncio.ensure_future(_wait_no_records(errors))
+    try:
+        await asyncio.wait((request, no_records), return_when=asyncio.FIRST_COMPLETED)
+        if not request.done() and no_records.result():
+            return 0
+        reply = await request
+    finally:
+        errors.close()
+        for task in (request, no_records):
+            task.cancel()
+        await asyncio.gather(request, no_records, return_exceptions=True)
+
+    if type(reply) is not StorageCount:
+        raise HistoryDownloadError(f"Balasan 0x2B tidak dikenal: {reply!r}")
+    return reply.count
+
+
+async def _fetch_window(session, indexes, timeout: float):
+    requests = [
+        session.request(PACKET_ID_STORED_DATA, index.to_bytes(2, 'big'), timeout, retries=0)
+        for index in indexes
+    ]
+    replies = await asyncio.gather(*requests, return_exceptions=True)
+
+    records = []
+    for index, reply in zip(indexes, replies):
+        if isinstance(reply, BaseException) or type(reply) is not StoredResult:
+            return None
+        if reply.index == -1:
+            reply = reply._replace(index=index)
+        records.append(reply)
+    # Dengan nomor record dari perangkat, urutan balasan boleh acak
+    records.sort(key=lambda r: r.index)
+    if [r.index for r in records] != list(indexes):
+        return None
+    return records
+
+
+async def download_history(
+    session,
+    window: int = DEFAULT_WINDOW,
+    timeout: float = WINDOW_TIMEOUT,
+    retries: int = MAX_RETRIES,
+    first_index: int = 0,
+    count: int = None,
+):
+    """
+    Async generator StoredResult untuk seluruh memori perangkat, urut nomor
+    record. Memori dibaca per jendela `window` permintaan yang dikirim
+    beruntun tanpa menunggu balasan satu per satu.
+    """
+    if count is None:
+        count = await get_storage_count(session, timeout)
+
+    next_index = first_index
+    last_index = first_index + count
+    while next_index < last_index:
+        indexes = range(next_index, min(next_index + window, last_index))
+        delay = timeout
+        for _ in range(retries + 1):
+            records = await _fetch_window(session, indexes, timeout)
+            if records is not None:
+                break
+            # Tunggu balasan yang terlambat lewat (dibuang karena tidak ada
+            # lagi yang menunggu) sebelum mengirim ulang
+            await asyncio.sleep(delay)
+            delay *= BACKOFF_FACTOR
+        else:
+            raise HistoryDownloadError(
+                f"Record {indexes.start}-{indexes.stop - 1} gagal diambil setelah {retries} percobaan ulang"
+            )
+
+        for record in records:
+            yield record
+        next_index = indexes.stop
+
+
+async def export_history_csv(session, path: str, **kwargs) -> int:
+    """Menulis seluruh riwayat perangkat ke CSV secara streaming."""
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        async for record in download_history(session, **kwargs):
+            writer.writerow((record.index,) + tuple(record.result))
+            written += 1
+    return written
+
+
+# ================= MAIN =================
+
+async def main(port: str, path: str):
+    from session import open_session
+
+    session = await open_session(port)
+    try:
+        count = await get_storage_count(session)
+        print(f"Jumlah data tersimpan: {count}")
+        written = await export_history_csv(session, path, count=count)
+        print(f"✔ {written} record ditulis ke {path}")
+    except asyncio.TimeoutError:
+        print("⏳ Perangkat tidak merespons permintaan jumlah data (0x2B).")
+    finally:
+        await session.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 3:
+        print("Pemakaian: python history.py <port> <output.csv>")
+        sys.exit(1)
+    asyncio.run(main(sys.argv[1], sys.argv[2]))
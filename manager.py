@@ -0,0 +1,322 @@
+# ==========================================
+# MANAJER MULTI-PERANGKAT BPMPRO 2
+# ==========================================
+#
+# Membuka semua port BPMPRO 2 sekaligus, menjalankan satu BpmSession per
+# perangkat di satu event loop, dan menggabungkan hasil pengukuran serta data
+# realtime ke satu aliran yang ditandai dengan tag perangkat. Perangkat yang
+# putus (cabut USB / glitch hub) dibuka ulang otomatis dengan tag yang sama,
+# mengikuti nomor seri USB-nya bila nama port berubah.
+
+import asyncio
+import time
+from typing import Any, NamedTuple
+
+from discovery import DeviceDiscovery, PortFilter
+from packets import ErrorReport, MeasurementResult, RealtimePressure
+from session import BAUD_RATE, SUBSCRIBER_QUEUE_SIZE, open_session
+from telemetry import get_logger
+
+STREAM_QUEUE_SIZE = SUBSCRIBER_QUEUE_SIZE * 16
+BPM_PORT_FILTER = PortFilter()
+
+# Jeda buka ulang perangkat yang putus, digandakan tiap kali gagal
+RECONNECT_MIN_DELAY = 0.2
+RECONNECT_MAX_DELAY = 3.0
+
+log = get_logger("manager")
+
+
+class DevicePort(NamedTuple):
+    tag: str
+    port: str
+    serial_number: str
+
+
+class TaggedPacket(NamedTuple):
+    device: str
+    timestamp: float
+    packet: Any
+
+
+# ================= IDENTITAS PORT =================
+
+def is_bpm_port(port_info) -> bool:
+    """Saringan VID/PID yang sama dengan discovery.py (Silicon Labs CP210x)."""
+    return BPM_PORT_FILTER.matches(port_info)
+
+
+def device_tag(port_info) -> str:
+    """
+    Tag unik per perangkat. Nomor seri USB dipakai bila ada; VID/PID saja
+    tidak cukup karena semua board CP210x sama (`bpm_10c4ea60`), jadi nama
+    port ditambahkan sebagai pembeda.
+    """
+    if port_info.serial_number:
+        return port_info.serial_number
+    vid_hex = f"{port_info.vid:04x}" if port_info.vid else "0000"
+    pid_hex = f"{port_info.pid:04x}" if port_info.pid else "0000"
+    return f"bpm_{vid_hex}{pid_hex}@{port_info.device}"
+
+
+def list_bpm_ports():
+    import serial.tools.list_ports
+
+    return [
+        DevicePort(device_tag(p), p.device, p.serial_number or "")
+        for p in serial.tools.list_ports.comports()
+        if is_bpm_port(p)
+    ]
+
+
+# ================= KESEHATAN PERANGKAT =================
+
+class DeviceHealth:
+    """Penghitung per perangkat; diperbarui langsung dari task pembaca."""
+
+    __slots__ = (
+        "connected", "realtime_samples", "results", "errors", "other_packets",
+        "stream_dropped", "disconnects", "reconnects", "port", "last_packet_at", "last_error",
+    )
+
+    def __init__(self):
+        self.connected = False
+        self.realtime_samples = 0
+        self.results = 0
+        self.errors = 0
+        self.other_packets = 0
+        self.stream_dropped = 0
+        self.disconnects = 0
+        self.reconnects = 0
+        self.port = ""
+        self.last_packet_at = 0.0
+        self.last_error = ""
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# ================= MANAJER =================
+
+class DeviceManager:
+    """
+        manager = DeviceManager()
+        await manager.start()
+        async for item in manager.stream():
+            print(item.device, item.packet)
+    """
+
+    def __init__(self, ports=None, baudrate: int = BAUD_RATE, stream_size: int = STREAM_QUEUE_SIZE,
+                 reconnect: bool = True, capture=None, metrics=None):
+        self._ports = ports
+        self.baudrate = baudrate
+        self.reconnect = reconnect
+        # CaptureWriter bersama (capture.py); setiap sesi merekam dengan tag-nya
+        self.capture = capture
+        # MetricsRegistry (telemetry.py) opsional, satu DeviceMetrics per tag
+        self.metrics = metrics
+        self.sessions = {}
+        self.health = {}
+        self._stream = asyncio.Queue(stream_size)
+        self._supervisors = {}
+        self._closing = False
+
+    async def start(self):
+        """Membuka semua port secara paralel. Port yang gagal dicatat di health."""
+        ports = self._ports if self._ports is not None else list_bpm_ports()
+        results = await asyncio.gather(
+            *(open_session(p.port, self.baudrate, p.tag) for p in ports),
+            return_exceptions=True,
+        )
+        for device, result in zip(ports, results):
+            health = self.health.setdefault(device.tag, DeviceHealth())
+            health.port = device.port
+            if isinstance(result, BaseException):
+                health.last_error = str(result)
+            else:
+                self.add_session(device.tag, result)
+            # Port yang gagal dibuka juga diawasi, supaya tersambung begitu alatnya siap
+            if self.reconnect:
+                self._supervisors[device.tag] = asyncio.get_running_loop().create_task(
+                    self._supervise(device)
+                )
+        return self
+
+    def add_session(self, tag: str, session):
+        """Mendaftarkan sesi yang sudah terbuka (juga dipakai untuk transport simulasi)."""
+        health = self.health.setdefault(tag, DeviceHealth())
+        health.connected = True
+        self.sessions[tag] = session
+        if self.capture is not None and session.capture is None:
+            session.capture = self.capture
+        if self.metrics is not None:
+            session.metrics = self.metrics.device(tag).attach(session.decoder, session.correlator)
+        session.add_listener(self._make_listener(tag, health))
+        return session
+
+    def _make_listener(self, tag, health):
+        stream = self._stream
+        clock = time.time
+
+        def on_packet(packet):
+            now = clock()
+            health.last_packet_at = now
+            packet_type = type(packet)
+            if packet_type is RealtimePressure:
+                health.realtime_samples += 1
+            elif packet_type is MeasurementResult:
+                health.results += 1
+            elif packet_type is ErrorReport:
+                health.errors += 1
+            else:
+                health.other_packets += 1
+                return
+
+            if stream.full():
+                stream.get_nowait()
+                health.stream_dropped += 1
+            stream.put_nowait(TaggedPacket(tag, now, packet))
+
+        return on_packet
+
+    # ----- koneksi ulang -----
+
+    async def _supervise(self, device: DevicePort):
+        """
+        Menunggu sesi perangkat putus lalu membukanya lagi. Dengan nomor seri
+        USB, perangkat diikuti ke nama port barunya (/dev/ttyUSB0 -> ttyUSB1);
+        tag, health, dan pelanggan stream() tetap sama. Bila port gagal dibuka
+        sejak start(), belum ada sesi dan loop langsung mencoba membuka.
+        """
+        health = self.health[device.tag]
+        discovery = DeviceDiscovery(PortFilter(serial_numbers=frozenset((device.serial_number,))))
+        while not self._closing:
+            session = self.sessions.get(device.tag)
+            if session is not None:
+                await session.wait_closed()
+                if self._closing:
+                    return
+                if health.connected:
+                    health.connected = False
+                    health.disconnects += 1
+
+            delay = RECONNECT_MIN_DELAY
+            while not self._closing:
+                port = device.port
+                if device.serial_number:
+                    port = await asyncio.to_thread(
+                        discovery.wait_for_serial, device.serial_number, RECONNECT_MAX_DELAY
+                    ) or device.port
+                try:
+                    session = await open_session(port, self.baudrate, device.tag)
+                except OSError as e:
+                    health.last_error = str(e)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                    continue
+                except Exception as e:
+                    # Bukan masalah port (pyserial-asyncio tidak ada, opsi sim:// salah):
+                    # mencoba ulang tidak akan berhasil, jadi berhenti dengan jelas
+                    health.last_error = f"tidak dicoba lagi: {type(e).__name__}: {e}"
+                    log.error("%s: koneksi ulang dihentikan: %s", device.tag, health.last_error)
+                    return
+                if self._closing:
+                    await session.close()
+                    return
+                device = device._replace(port=port)
+                health.port = port
+                if device.tag in self.sessions:
+                    health.reconnects += 1
+                self.add_session(device.tag, session)
+                break
+
+    async def close(self):
+        self._closing = True
+        for task in self._supervisors.values():
+            task.cancel()
+        await asyncio.gather(*self._supervisors.values(), return_exceptions=True)
+        self._supervisors.clear()
+        await asyncio.gather(*(s.close() for s in self.sessions.values()), return_exceptions=True)
+        for health in self.health.values():
+            health.connected = False
+        self.sessions.clear()
+        if self.capture is not None:
+            self.capture.flush()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def stream(self):
+        """Aliran gabungan TaggedPacket (realtime, hasil, error) dari semua perangkat."""
+        while True:
+            yield await self._stream.get()
+
+    async def broadcast(self, command: str, *args, **kwargs) -> dict:
+        """
+        Menjalankan satu perintah sesi di semua perangkat sekaligus, misalnya
+        `await manager.broadcast("start_measurement")`. Hasil per tag berupa
+        record balasan atau exception.
+        """
+        tags = list(self.sessions)
+        replies = await asyncio.gather(
+            *(getattr(self.sessions[tag], command)(*args, **kwargs) for tag in tags),
+            return_exceptions=True,
+        )
+        return dict(zip(tags, replies))
+
+    def health_report(self) -> dict:
+        report = {}
+        for tag, health in self.health.items():
+            entry = health.as_dict()
+            session = self.sessions.get(tag)
+            if session is not None:
+                entry.update(session.decoder.stats())
+                entry["latency"] = session.correlator.latency_report()
+                if session.closed and health.connected:
+                    health.connected = False
+                    health.disconnects += 1
+                    entry["connected"] = False
+            report[tag] = entry
+        return report
+
+
+# ================= MAIN =================
+
+DEFAULT_STORE_DIR = "bpm_data"
+
+
+async def main():
+    from render import render_packet
+    from storage import MeasurementStore
+
+    manager = DeviceManager()
+    await manager.start()
+    if not manager.health:
+        print("❌ Tidak ada perangkat yang cocok (Silicon Labs CP210x) ditemukan.")
+        return
+
+    store = MeasurementStore(DEFAULT_STORE_DIR)
+    for tag, health in manager.health.items():
+        if health.connected:
+            print(f"✔ Terhubung: {tag}")
+        else:
+            print(f"⏳ Menunggu {tag} ({health.port}): {health.last_error}")
+
+    try:
+        async for item in manager.stream():
+            print(f"[{item.device}] {render_packet(item.packet)}")
+            if store.record(item):
+                store.flush()
+    finally:
+        await manager.close()
+        store.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nProgram dihentikan oleh user.")
@@ -0,0 +1,218 @@
+# ==========================================
+# STATE MACHINE SIKLUS PENGUKURAN
+# ==========================================
+#
+#   IDLE -> INFLATING -> DEFLATING -> RESULT / ERROR -> COOLDOWN -> IDLE
+#   IDLE / COOLDOWN -> CALIBRATING (0x35) -> IDLE (0x37, atau 0x35 gagal)
+#
+# Status berpindah karena record paket (0x28 realtime, 0x22 hasil, 0x25
+# error) atau karena batas waktu. Tidak ada sleep di sini:
+# - watchdog realtime adalah deadline; lewat REALTIME_TIMEOUT tanpa sampel
+#   saat inflasi/deflasi -> ERROR (emergency stop);
+# - masa istirahat setelah hasil / error juga deadline; perintah lain tetap
+#   bisa dikirim, hanya Start berikutnya yang perlu menunggu `ready`.
+# Selama kalibrasi alat menahan tekanan pre-fill dan tetap mengirim 0x28;
+# sampel itu hanya memperbarui `pressure`, tidak membuka siklus pengukuran
+# dan tidak memasang watchdog. 0x36 tidak mengakhiri mode kalibrasi (titik
+# berikutnya boleh menyusul, lihat kalibrasi.md), hanya 0x37.
+#
+# Seperti correlation.py, modul ini tidak punya thread/timer sendiri:
+# pemakai memanggil `poll()` saat `next_deadline()` tercapai (new.py memakai
+# `time_until_deadline()` sebagai timeout baca port).
+
+import time
+
+from packets import (
+    EXEC_FAILED,
+    EXEC_OK,
+    EXEC_RUNNING,
+    PACKET_ID_CANCEL_CALIBRATION,
+    PACKET_ID_START_CALIBRATION,
+    ErrorReport,
+    ExecStatus,
+    MeasurementResult,
+    RealtimePressure,
+)
+
+IDLE = "idle"
+INFLATING = "inflating"
+DEFLATING = "deflating"
+RESULT = "result"
+ERROR = "error"
+COOLDOWN = "cooldown"
+CALIBRATING = "calibrating"
+
+REALTIME_TIMEOUT = 5.0
+START_TIMEOUT = 5.0
+RESULT_COOLDOWN = 5.0
+ERROR_COOLDOWN = 1.0
+# Turun sejauh ini dari puncak -> dianggap mulai deflasi
+DEFLATION_DROP = 5
+
+# Outcome khusus saat watchdog realtime memutus pengukuran
+OUTCOME_WATCHDOG = "watchdog"
+
+
+class MeasurementCycle:
+    """
+    State machine satu perangkat. Listener `callback(old, new, cycle)`
+    dipanggil setiap kali status berubah.
+    """
+
+    def __init__(self, realtime_timeout: float = REALTIME_TIMEOUT,
+                 start_timeout: float = START_TIMEOUT,
+                 result_cooldown: float = RESULT_COOLDOWN,
+                 error_cooldown: float = ERROR_COOLDOWN,
+                 clock=time.monotonic):
+        self.realtime_timeout = realtime_timeout
+        self.start_timeout = start_timeout
+        self.result_cooldown = result_cooldown
+        self.error_cooldown = error_cooldown
+        self.clock = clock
+
+        self.state = IDLE
+        self.deadline = None
+        self.peak = 0
+        self.pressure = 0
+        self.outcome = None
+        self.started_at = None
+        self.measurements = 0
+        self.errors = 0
+        self.watchdog_trips = 0
+        self._listeners = []
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _set(self, state, deadline=None):
+        old = self.state
+        self.state = state
+        self.deadline = deadline
+        if old != state:
+            for callback in self._listeners:
+                callback(old, state, self)
+
+    # ----- kejadian -----
+
+    def start_sent(self):
+        """Start (0x21) sudah dikirim; sampel pertama ditunggu `start_timeout`."""
+        self.peak = 0
+        self.outcome = None
+        self.started_at = self.clock()
+        self._set(INFLATING, self.started_at + self.start_timeout)
+
+    def calibration_started(self):
+        """
+        Start kalibrasi (0x35) sudah dikirim. Dipanggil sebelum balasan datang
+        karena alat baru membalas 0x00 setelah pre-fill tercapai, sementara
+        sampel pemompaan sudah mengalir lebih dulu.
+        """
+        if not self.measuring:
+            self._set(CALIBRATING)
+
+    def calibration_finished(self):
+        """Mode kalibrasi selesai / dibatalkan (0x37): kembali ke IDLE."""
+        if self.state == CALIBRATING:
+            self._set(IDLE)
+
+    def on_packet(self, packet):
+        packet_type = type(packet)
+        if packet_type is RealtimePressure:
+            self._on_sample(packet.pressure)
+        elif packet_type is ExecStatus:
+            self._on_exec_status(packet)
+        elif packet_type is MeasurementResult:
+            self.measurements += 1
+            self._finish(RESULT, packet, self.result_cooldown)
+        elif packet_type is ErrorReport and self.measuring:
+            # Error di luar pengukuran (mis. 0x60 saat baca riwayat) tidak mengubah siklus
+            self.errors += 1
+            self._finish(ERROR, packet, self.error_cooldown)
+
+    def _on_exec_status(self, packet):
+        # Balasan perintah kalibrasi juga dari pemakai yang tidak memanggil
+        # calibration_started() sendiri (mis. bp.py saat kalibrasi dari alat lain)
+        if packet.packet_id == PACKET_ID_START_CALIBRATION:
+            if packet.status in (EXEC_RUNNING, EXEC_OK):
+                self.calibration_started()
+            elif packet.status == EXEC_FAILED:
+                self.calibration_finished()
+        elif packet.packet_id == PACKET_ID_CANCEL_CALIBRATION and packet.status != EXEC_RUNNING:
+            self.calibration_finished()
+
+    def _on_sample(self, pressure: int):
+        now = self.clock()
+        self.pressure = pressure
+        if self.state == CALIBRATING:
+            # Tekanan pre-fill kalibrasi, bukan pengukuran
+            return
+        if self.state in (IDLE, COOLDOWN, RESULT, ERROR):
+            # Pengukuran dimulai dari tombol fisik alat
+            self.peak = 0
+            self.outcome = None
+            self.started_at = now
+            self._set(INFLATING)
+        if pressure > self.peak:
+            self.peak = pressure
+        if self.state == INFLATING and pressure <= self.peak - DEFLATION_DROP:
+            self._set(DEFLATING)
+        self.deadline = now + self.realtime_timeout
+
+    def _finish(self, state, outcome, cooldown: float):
+        self.outcome = outcome
+        self._set(state)
+        self._set(COOLDOWN, self.clock() + cooldown)
+
+    def poll(self):
+        """
+        Memproses deadline yang sudah lewat. Mengembalikan True jika watchdog
+        realtime baru saja memutus pengukuran.
+        """
+        if self.deadline is None or self.clock() < self.deadline:
+            return False
+        if self.state in (INFLATING, DEFLATING):
+            self.watchdog_trips += 1
+            self._finish(ERROR, OUTCOME_WATCHDOG, self.error_cooldown)
+            return True
+        if self.state == COOLDOWN:
+            self._set(IDLE)
+        return False
+
+    # ----- penjadwalan -----
+
+    def next_deadline(self):
+        return self.deadline
+
+    def time_until_deadline(self, max_wait: float = None):
+        """Detik sampai deadline berikutnya (dibatasi `max_wait`), untuk timeout baca."""
+        if self.deadline is None:
+            return max_wait
+        remaining = max(0.0, self.deadline - self.clock())
+        return remaining if max_wait is None else min(remaining, max_wait)
+
+    @property
+    def measuring(self) -> bool:
+        return self.state in (INFLATING, DEFLATING)
+
+    @property
+    def ready(self) -> bool:
+        """Boleh mengirim Start berikutnya (tidak sedang mengukur / istirahat)."""
+        return self.state == IDLE or (self.state == COOLDOWN and self.cooldown_remaining() == 0.0)
+
+    def resume(self):
+        """
+        Koneksi pulih di tengah pengukuran (cabut-colok / glitch hub USB):
+        watchdog dihitung ulang dari sekarang, status dan puncak tekanan tetap.
+        """
+        if self.measuring:
+            self.deadline = self.clock() + self.realtime_timeout
+
+    def cancel(self):
+        """Start tidak pernah dikonfirmasi perangkat: kembali ke IDLE tanpa error."""
+        if self.measuring:
+            self._set(IDLE)
+
+    def cooldown_remaining(self) -> float:
+        if self.state != COOLDOWN:
+            return 0.0
+        return max(0.0, self.deadline - self.clock())
@@ -1,51 +1,81 @@
 import serial
-import serial.tools.list_ports
 import time
-from datetime import datetime
+from logging import DEBUG
+
+from capture import CaptureWriter, RecordingSerial
+from commands import send_command
+from correlation import Correlator
+from discovery import DeviceDiscovery
+from measurement import MeasurementCycle
+from framing import FrameDecoder
+from packets import (
+    PACKET_ID_START,
+    PACKET_ID_STOP,
+    RealtimePressure,
+    MeasurementResult,
+    ExecStatus,
+    DeviceId,
+    ErrorReport,
+    decode_packet,
+    encode_device_id,
+)
+from provisioning import DEFAULT_CACHE_PATH, SCHEME_SERIAL, Provisioner
+from render import RealtimeThrottle, render_packet, debug_label
+from telemetry import HexDump, MetricsRegistry, get_logger, setup_logging
+from transport import open_serial
 
 # ================= KONFIGURASI =================
 
 BAUD_RATE = 19200
 
-START_BYTE = 0x5A
-PARAM_TYPE_BP = 0xF2
-PACKET_ID_REALTIME = 0x28
-PACKET_ID_RESULT = 0x22
-PACKET_ID_GET_DEVICE_ID = 0x0F
-PACKET_ID_SET_DEVICE_ID = 0x0E
+REALTIME_TIMEOUT = 5
 
-PACKET_ID_START_CALIBRATION = 0x35
-PACKET_ID_SET_CALIBRATION_PRESSURE = 0x36
-PACKET_ID_CANCEL_CALIBRATION = 0x37
-PACKET_ID_TOGGLE_BUTTON = 0x26
-PACKET_ID_SET_LANGUAGE = 0x66
-PACKET_ID_ERROR = 0x25
+# Masa istirahat sebelum Start berikutnya (tidak memblokir pembacaan port)
+RESULT_COOLDOWN = 5
+ERROR_COOLDOWN = 1
 
-REALTIME_TIMEOUT = 5
+# Batas lama satu kali baca port saat tidak ada deadline yang lebih dekat
+READ_TIMEOUT = 1
 
-# ================= VARIABEL GLOBAL =================
+# Skema Device ID otomatis (lihat provisioning.py): "serial" memberi ID unik
+# per board dari nomor seri USB, "vidpid" = `bpm_10c4ea60` lama, "fleet" =
+# nomor urut. ID yang diharapkan per nomor seri USB disimpan di file cache.
+DEVICE_ID_SCHEME = SCHEME_SERIAL
+DEVICE_ID_CACHE = DEFAULT_CACHE_PATH
 
-in_realtime_mode = False
-last_realtime_data = 0
+# Jeda koneksi ulang setelah port putus, digandakan tiap kali gagal
+RECONNECT_MIN_DELAY = 0.2
+RECONNECT_MAX_DELAY = 3
 
+# File rekaman byte mentah RX/TX (capture.py), mis. "lapangan.bpmcap";
+# None = tidak merekam. Putar ulang: python capture.py replay <file>
+CAPTURE_FILE = None
 
-# ================= CRC & KOMUNIKASI =================
+# Level log: "DEBUG" menampilkan hex dump setiap frame RX/TX (lambat di
+# terminal); level lain tanpa hex dump
+LOG_LEVEL = "INFO"
+
+# File metrik Prometheus (frame, byte, CRC salah, latensi perintah, kode
+# error) yang ditulis ulang setiap kembali ke menu; None = tidak ditulis
+METRICS_FILE = None
+
+log = get_logger("new")
+
+
+# ================= KOMUNIKASI =================
+#
+# Frame perintah diambil dari tabel commands.py: frame tanpa data sudah
+# dihitung sekali saat import, frame berparameter lewat satu encoder.
+# Setiap fungsi mengembalikan frame yang dikirim supaya bisa dilacak
+# oleh Correlator (pengiriman ulang bila tidak dibalas).
+
+def _log_sent(message: str, frame: bytes):
+    # Konfirmasi menu tetap print (sinkron, urutannya sama dengan tampilan
+    # balasan); hanya hex dump yang lewat antrian log
+    print(message)
+    if log.isEnabledFor(DEBUG):
+        log.debug("TX %s", HexDump(frame))
 
-def calc_crc(data_bytes):
-    """
-    Menghitung CRC16 Modbus (Polynomial 0xA001) untuk verifikasi paket.
-    """
-    crc = 0xFFFF
-    for byte in data_bytes:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x0001:
-                crc >>= 1
-                crc ^= 0xA001
-            else:
-                crc >>= 1
-    # Mengembalikan dalam byte-order big-endian (High-byte, Low-byte)
-    return crc.to_bytes(2, byteorder='big')
 
 def send_start_command(ser):
     """
@@ -57,46 +87,25 @@ def send_start_command(ser):
     - 0xF2 (Parameter Type: Complete Machine)
     - CRC16 (2 bytes)
     """
-    packet_id = 0x21
-    param_type = PARAM_TYPE_BP
-    packet_length = 0x06
-    
-    payload = bytes([START_BYTE, packet_length, packet_id, param_type])
-    crc = calc_crc(payload)
-    
-    full_packet = payload + crc
-    ser.write(full_packet)
-    print(f"📡 Perintah Start Measurement terkirim! (Paket: {full_packet.hex().upper()})")
+    full_packet = send_command(ser, "start")
+    _log_sent("📡 Perintah Start Measurement terkirim!", full_packet)
+    return full_packet
 
 def send_stop_command(ser):
     """
     Mengirimkan instruksi Stop Measurement (ID: 0x20) ke perangkat.
     """
-    packet_id = 0x20
-    param_type = PARAM_TYPE_BP
-    packet_length = 0x06
-    
-    payload = bytes([START_BYTE, packet_length, packet_id, param_type])
-    crc = calc_crc(payload)
-    
-    full_packet = payload + crc
-    ser.write(full_packet)
-    print(f"\n🛑 Perintah Stop Measurement terkirim! (Paket: {full_packet.hex().upper()})")
+    full_packet = send_command(ser, "stop")
+    _log_sent("\n🛑 Perintah Stop Measurement terkirim!", full_packet)
+    return full_packet
 
 def send_get_device_id_command(ser):
     """
     Mengirimkan instruksi Get Device ID (ID: 0x0F) ke perangkat.
     """
-    packet_id = PACKET_ID_GET_DEVICE_ID
-    param_type = PARAM_TYPE_BP
-    packet_length = 0x06
-    
-    payload = bytes([START_BYTE, packet_length, packet_id, param_type])
-    crc = calc_crc(payload)
-    
-    full_packet = payload + crc
-    ser.write(full_packet)
-    print(f"\n🔍 Perintah Get Device ID terkirim! (Paket: {full_packet.hex().upper()})")
+    full_packet = send_command(ser, "get_device_id")
+    _log_sent("\n🔍 Perintah Get Device ID terkirim!", full_packet)
+    return full_packet
 
 def send_set_device_id_command(ser, new_id: str):
     """
@@ -104,65 +113,34 @@ def send_set_device_id_command(ser, new_id: str):
     Device ID harus terdiri dari maksimal 12 karakter ASCII.
     """
     # Memotong atau mendempul (padding) agar tepat 12 byte
-    new_id_bytes = new_id.encode('ascii', errors='ignore')[:12].ljust(12, b'\x00')
-    
-    packet_id = PACKET_ID_SET_DEVICE_ID
-    param_type = PARAM_TYPE_BP
-    packet_length = len(new_id_bytes) + 6 # Start(1) + Len(1) + ID(1) + Param(1) + Data(12) + CRC(2)
-    
-    payload = bytes([START_BYTE, packet_length, packet_id, param_type]) + new_id_bytes
-    crc = calc_crc(payload)
-    
-    full_packet = payload + crc
-    ser.write(full_packet)
-    print(f"\n✍️ Perintah Set Device ID '{new_id_bytes.decode('ascii').strip(chr(0))}' terkirim! (Paket: {full_packet.hex().upper()})")
+    new_id_bytes = encode_device_id(new_id)
+    full_packet = send_command(ser, "set_device_id", new_id_bytes)
+    _log_sent(f"\n✍️ Perintah Set Device ID '{new_id_bytes.decode('ascii').strip(chr(0))}' terkirim!", full_packet)
+    return full_packet
 
 def send_start_calibration_command(ser, prefill_pressure: int):
     """
     Memulai kalibrasi tekanan dengan mengirim parameter pre-fill pressure (2 bytes).
     """
-    pressure_bytes = prefill_pressure.to_bytes(2, byteorder='big')
-    packet_id = PACKET_ID_START_CALIBRATION
-    param_type = PARAM_TYPE_BP
-    packet_length = len(pressure_bytes) + 6
-    
-    payload = bytes([START_BYTE, packet_length, packet_id, param_type]) + pressure_bytes
-    crc = calc_crc(payload)
-    
-    full_packet = payload + crc
-    ser.write(full_packet)
-    print(f"\n⚙️ Perintah Start Kalibrasi ({prefill_pressure} mmHg) terkirim! (Paket: {full_packet.hex().upper()})")
+    full_packet = send_command(ser, "start_calibration", prefill_pressure)
+    _log_sent(f"\n⚙️ Perintah Start Kalibrasi ({prefill_pressure} mmHg) terkirim!", full_packet)
+    return full_packet
 
 def send_set_calibration_pressure_command(ser, actual_pressure: int):
     """
     Mengatur tekanan nyata (Aktual) untuk kalibrasi (2 bytes).
     """
-    pressure_bytes = actual_pressure.to_bytes(2, byteorder='big')
-    packet_id = PACKET_ID_SET_CALIBRATION_PRESSURE
-    param_type = PARAM_TYPE_BP
-    packet_length = len(pressure_bytes) + 6
-    
-    payload = bytes([START_BYTE, packet_length, packet_id, param_type]) + pressure_bytes
-    crc = calc_crc(payload)
-    
-    full_packet = payload + crc
-    ser.write(full_packet)
-    print(f"\n⚙️ Perintah Set Tekanan Aktual Kalibrasi ({actual_pressure} mmHg) terkirim! (Paket: {full_packet.hex().upper()})")
+    full_packet = send_command(ser, "set_calibration_pressure", actual_pressure)
+    _log_sent(f"\n⚙️ Perintah Set Tekanan Aktual Kalibrasi ({actual_pressure} mmHg) terkirim!", full_packet)
+    return full_packet
 
 def send_cancel_calibration_command(ser):
     """
     Membatalkan mode kalibrasi tekanan secara manual.
     """
-    packet_id = PACKET_ID_CANCEL_CALIBRATION
-    param_type = PARAM_TYPE_BP
-    packet_length = 0x06
-    
-    payload = bytes([START_BYTE, packet_length, packet_id, param_type])
-    crc = calc_crc(payload)
-    
-    full_packet = payload + crc
-    ser.write(full_packet)
-    print(f"\n🚫 Perintah Cancel Kalibrasi terkirim! (Paket: {full_packet.hex().upper()})")
+    full_packet = send_command(ser, "cancel_calibration")
+    _log_sent("\n🚫 Perintah Cancel Kalibrasi terkirim!", full_packet)
+    return full_packet
 
 def send_toggle_button_command(ser, unlock: bool):
     """
@@ -170,205 +148,113 @@ def send_toggle_button_command(ser, unlock: bool):
     unlock=True (0x00) -> Buka (Enable) tombol
     unlock=False (0x01) -> Blokir (Disable) tombol
     """
-    packet_id = PACKET_ID_TOGGLE_BUTTON
-    param_type = PARAM_TYPE_BP
-    packet_length = 0x07  # Start(1) + Len(1) + ID(1) + Param(1) + Data(1) + CRC(2)
-    data_byte = 0x00 if unlock else 0x01
-    
-    payload = bytes([START_BYTE, packet_length, packet_id, param_type, data_byte])
-    crc = calc_crc(payload)
-    
-    full_packet = payload + crc
-    ser.write(full_packet)
+    full_packet = send_command(ser, "toggle_button", 0x00 if unlock else 0x01)
     status_str = "DIBUKA" if unlock else "DIBLOKIR"
-    print(f"\n⚙️ Perintah Tombol Fisik -> {status_str} terkirim! (Paket: {full_packet.hex().upper()})")
+    _log_sent(f"\n⚙️ Perintah Tombol Fisik -> {status_str} terkirim!", full_packet)
+    return full_packet
 
 def send_set_language_command(ser, lang_code: int):
     """
     Mengatur bahasa perangkat / alat ukur (ID: 0x66).
     lang_code = 0x00 (Mandarin), 0x01 (English), 0x02 (Thailand)
     """
-    packet_id = PACKET_ID_SET_LANGUAGE
-    param_type = PARAM_TYPE_BP
-    packet_length = 0x07 # Start(1) + Len(1) + ID(1) + Param(1) + Data(1) + CRC(2)
-    
-    payload = bytes([START_BYTE, packet_length, packet_id, param_type, lang_code])
-    crc = calc_crc(payload)
-    
-    full_packet = payload + crc
-    ser.write(full_packet)
-    
+    full_packet = send_command(ser, "set_language", lang_code)
+
     lang_map = {0x00: "Mandarin", 0x01: "Bahasa Inggris", 0x02: "Thailand"}
     lang_text = lang_map.get(lang_code, "Tidak Dikenal")
-    print(f"\n⚙️ Perintah Atur Bahasa ({lang_text}) terkirim! (Paket: {full_packet.hex().upper()})")
+    _log_sent(f"\n⚙️ Perintah Atur Bahasa ({lang_text}) terkirim!", full_packet)
+    return full_packet
 
 # ================= PARSE PAKET =================
 
-def parse_packet(data_bytes):
-    global in_realtime_mode, last_realtime_data
+def parse_packet(data_bytes, correlator=None, cycle=None, metrics=None, throttle=None):
+    """
+    Mengubah frame menjadi record terstruktur (lihat packets.py). Jika
+    `correlator` diberikan, setiap record juga dicocokkan dengan perintah
+    yang menunggu balasan; `cycle` (MeasurementCycle) menerima semua record,
+    termasuk sampel realtime yang tidak ditampilkan; `metrics`
+    (DeviceMetrics) menghitung tipe paket dan kode error; `throttle`
+    (RealtimeThrottle) membatasi sampel realtime yang dikembalikan.
+
+    Tidak ada status global: semua status ada di objek yang diberikan
+    pemanggil (lihat Connection), jadi beberapa koneksi bisa di-parse
+    bersamaan di thread / proses berbeda.
+    """
+    packet = decode_packet(data_bytes)
+    if packet is None:
+        return None
 
-    try:
-        if data_bytes[0] != START_BYTE:
-            return None
+    if correlator is not None:
+        correlator.on_packet(data_bytes[2], packet)
+    if cycle is not None:
+        cycle.on_packet(packet)
+    if metrics is not None:
+        metrics.on_packet(packet)
 
-        length = data_bytes[1]
-        packet_id = data_bytes[2]
-        param_type = data_bytes[3]
+    # Balasan Start/Stop tidak ditampilkan, yang ditunggu adalah data realtime/hasil
+    if type(packet) is ExecStatus and packet.packet_id in (PACKET_ID_START, PACKET_ID_STOP):
+        return None
 
-        if param_type != PARAM_TYPE_BP:
-            return None
+    # Hex dump hanya diformat bila level DEBUG aktif
+    if log.isEnabledFor(DEBUG):
+        log.debug("[DEBUG %s] %s", debug_label(packet), HexDump(data_bytes))
 
-        # ===== REALTIME =====
-        if packet_id == PACKET_ID_REALTIME and length >= 0x08:
-            in_realtime_mode = True
-            
-            # Debug Hex
-            print(f"[DEBUG REALTIME] {data_bytes.hex().upper()}")
-
-            pressure = int.from_bytes(data_bytes[4:6], 'big')
-
-            now = time.time()
-            if now - last_realtime_data >= 0.5:
-                last_realtime_data = now
-                return f"Realtime Pressure: {pressure} mmHg"
-
-        # ===== GET DEVICE ID =====
-        elif packet_id == PACKET_ID_GET_DEVICE_ID:
-            in_realtime_mode = False
-            print(f"\n[DEBUG GET ID] {data_bytes.hex().upper()}")
-            device_id_bytes = data_bytes[4:-2]
-            try:
-                device_id_str = device_id_bytes.decode('ascii', errors='replace').strip('\x00')
-            except:
-                device_id_str = "Error Decoding"
-                
-            return (
-                "\n=== GET DEVICE ID ===\n"
-                f"Raw Hex : {device_id_bytes.hex().upper()}\n"
-                f"ASCII   : {device_id_str}\n"
-                "=====================\n"
-            )
-            
-        # ===== GENERAL EXECUTION RESULT (Set ID, Kalibrasi, dsb) =====
-        elif packet_id in [PACKET_ID_SET_DEVICE_ID, PACKET_ID_START_CALIBRATION, PACKET_ID_SET_CALIBRATION_PRESSURE, PACKET_ID_CANCEL_CALIBRATION, PACKET_ID_TOGGLE_BUTTON, PACKET_ID_SET_LANGUAGE]:
-            in_realtime_mode = False
-            print(f"\n[DEBUG EXEC ID: {hex(packet_id).upper()}] {data_bytes.hex().upper()}")
-            
-            # Segmen data eksekusi umum (1 byte setelah param_type)
-            exec_status = data_bytes[4] if len(data_bytes) > 6 else 0xFF
-            
-            status_map = {
-                0x00: "✅ Operasi Berhasil Diselesaikan!",
-                0x01: "Memproses Command...",
-                0x02: "Perangkat Sibuk",
-                0x03: "❌ Operasi Gagal",
-                0x04: "System Protection Aktif",
-            }
-            status_text = status_map.get(exec_status, f"Kode Tak Dikenal: {exec_status}")
-            
-            return (
-                f"\n=== HASIL EKSEKUSI (ID {hex(packet_id).upper()}) ===\n"
-                f"Status: {status_text}\n"
-                "==================================\n"
-            )
-
-        # ===== ERROR CODE =====
-        elif packet_id == PACKET_ID_ERROR:
-            in_realtime_mode = False
-            print(f"\n[DEBUG ERROR] {data_bytes.hex().upper()}")
-            error_code = data_bytes[4] if len(data_bytes) > 6 else 0xFF
-            
-            error_map = {
-                0x00: "Hasil normal",
-                0x01: "Manset terlalu longgar atau tidak terhubung",
-                0x02: "Terjadi kebocoran pada sirkuit udara atau katup",
-                0x03: "Kesalahan tekanan udara, kemungkinan katup tidak terbuka normal",
-                0x04: "Sinyal lemah (denyut nadi terlalu lemah atau manset terlalu longgar)",
-                0x05: "Nilai tekanan darah objek berada di luar jangkauan pengukuran",
-                0x06: "Gerakan berlebihan selama pengukuran",
-                0x07: "Pengukuran tekanan berlebih (>290 mmHg untuk dewasa)",
-                0x08: "Saturasi sinyal, amplitudo terlalu besar karena gerakan",
-                0x09: "Waktu pengukuran berakhir (timeout melebihi 120s/90s)",
-                0x0A: "Dihentikan secara manual",
-                0x0B: "Kesalahan sistem",
-                0x0C: "Kesalahan saat membaca informasi kalibrasi",
-                0x0D: "Tidak ada sinyal yang terdeteksi",
-                0x0E: "Gelombang denyut nadi tidak teratur",
-                0x10: "Perlindungan tekanan berlebih aktif (>290 mmHg)",
-                0x11: "Kegagalan pada sleeve, kegagalan operasi motor",
-                0x12: "Pengukuran gagal dilakukan",
-                0x13: "Postur lengan salah atau sakelar siku tidak ditekan",
-                0x20: "Komunikasi handshake gagal",
-                0x23: "Pengukuran tidak dapat dimulai, tidak ada respons saat diinstruksikan",
-                0x24: "Tidak bisa mendapatkan hasil pengukuran",
-                0x25: "Batas waktu keseluruhan melebihi 180 detik",
-                0x26: "Komunikasi awal (Handshake) gagal dilakukan",
-                0x40: "Kertas pada printer habis",
-                0x41: "Penutup printer tidak ditutup dengan rapat",
-                0x42: "Penutup luar printer terbuka",
-                0x60: "Saat ini tidak ada rekaman/riwayat pengukuran",
-                0x64: "Tombol berhenti darurat (emergency stop) ditekan",
-            }
-            err_text = error_map.get(error_code, f"Kode Kesalahan Tak Dikenal: {hex(error_code)}")
-            
-            return (
-                "\n=== PENGUKURAN GAGAL (ERROR) ===\n"
-                f"Penyebab: {err_text}\n"
-                "================================\n"
-            )
-
-        # ===== RESULT =====
-        elif packet_id == PACKET_ID_RESULT and length >= 0x14:
-            in_realtime_mode = False
-            
-            # Debug Hex
-            print(f"\n[DEBUG RESULT] {data_bytes.hex().upper()}")
+    # ===== REALTIME =====
+    if type(packet) is RealtimePressure:
+        if throttle is None or throttle.due():
+            return packet
+        return None
+
+    return packet
 
-            systolic = int.from_bytes(data_bytes[4:6], 'big')
-            diastolic = int.from_bytes(data_bytes[6:8], 'big')
-            mean = int.from_bytes(data_bytes[8:10], 'big')
-            heart_rate = int.from_bytes(data_bytes[10:12], 'big')
 
-            year = int.from_bytes(data_bytes[12:14], 'big')
-            month = data_bytes[14]
-            day = data_bytes[15]
-            hour = data_bytes[16]
-            minute = data_bytes[17]
+# ================= KONEKSI =================
 
-            try:
-                measurement_time = datetime(year, month, day, hour, minute)
-            except:
-                measurement_time = datetime.now()
+class Connection:
+    """
+    Status satu koneksi port: decoder frame, correlator perintah, throttle
+    tampilan realtime dan metrik. `cycle` (MeasurementCycle) dipinjam dari
+    pemanggil karena bertahan melewati koneksi ulang.
+    """
 
-            return (
-                "\n=== HASIL PENGUKURAN ===\n"
-                f"Sistolik     : {systolic} mmHg\n"
-                f"Diastolik    : {diastolic} mmHg\n"
-                f"Mean         : {mean} mmHg\n"
-                f"Heart Rate   : {heart_rate} bpm\n"
-                f"Waktu        : {measurement_time}\n"
-                "=========================\n"
-            )
+    __slots__ = ("ser", "decoder", "correlator", "cycle", "metrics", "throttle")
 
-    except Exception as e:
-        print("Error parsing:", e)
+    def __init__(self, ser, cycle, metrics=None):
+        self.ser = ser
+        # Buffer frame per koneksi; port dibaca per potongan, bukan per byte
+        self.decoder = FrameDecoder()
+        # Pelacak balasan perintah (timeout + kirim ulang), lihat correlation.py
+        self.correlator = Correlator(ser.write)
+        self.cycle = cycle
+        self.metrics = metrics
+        self.throttle = RealtimeThrottle()
+        if metrics is not None:
+            metrics.attach(self.decoder, self.correlator)
 
-    return None
+    def read_packets(self):
+        """Satu putaran baca port; generator record yang perlu ditangani."""
+        for frame in self.decoder.read_frames(self.ser):
+            packet = parse_packet(frame, self.correlator, self.cycle, self.metrics, self.throttle)
+            if packet is not None:
+                yield packet
+
+    def drain(self):
+        """Satu putaran baca port; record hanya diteruskan ke correlator / cycle."""
+        for _ in self.read_packets():
+            pass
+
+    def track(self, frame):
+        return self.correlator.track(frame[2], frame)
 
 
 # ================= SERIAL READER =================
 
 def select_port():
     print("Mencari perangkat Silicon Labs CP210x...")
-    ports = serial.tools.list_ports.comports()
-    valid_ports = []
-    
-    for p in ports:
-        manufacturer = p.manufacturer if p.manufacturer else ""
-        description = p.description if p.description else ""
-        
-        if "Silicon Laboratories" in manufacturer and "CP210x" in description:
-            valid_ports.append(p)
+    # Saringan VID/PID USB + probe Get Device ID singkat, lihat discovery.py
+    discovery = DeviceDiscovery(baudrate=BAUD_RATE)
+    discovery.scan()
+    valid_ports = discovery.candidates()
             
     if not valid_ports:
         print("❌ Tidak ada perangkat yang cocok (Silicon Labs CP210x) ditemukan.")
@@ -377,7 +263,12 @@ def select_port():
     print("\nPerangkat ditemukan:")
     for idx, p in enumerate(valid_ports):
         alias_name = "BPMPRO 2" if idx == 0 else f"BPMPRO 2 ({idx + 1})"
-        print(f"[{idx + 1}] {p.device} - {alias_name}")
+        device = discovery.find(port=p.device)
+        if device is None:
+            status = "tidak menjawab"
+        else:
+            status = device.device_id or "ID belum terbaca"
+        print(f"[{idx + 1}] {p.device} - {alias_name} ({status})")
         
     while True:
         try:
@@ -393,107 +284,173 @@ def select_port():
             print("⚠️ Masukkan angka yang valid.")
 
 
-def find_start_byte(ser):
-    while True:
-        byte = ser.read(1)
-        if not byte:
-            return None
-        if byte[0] == START_BYTE:
-            return byte
+def set_read_timeout(ser, timeout):
+    # Mengubah timeout pyserial mengonfigurasi ulang port, jadi hanya bila berbeda
+    if ser.timeout != timeout:
+        ser.timeout = timeout
 
 
-def check_realtime_timeout():
-    global in_realtime_mode
+def wait_for_cooldown(conn):
+    """
+    Menunggu masa istirahat selesai sebelum Start. Port tetap dibaca selama
+    menunggu (bukan sleep), jadi balasan / data lain tidak tertahan.
+    """
+    cycle = conn.cycle
+    remaining = cycle.cooldown_remaining()
+    if remaining > 0:
+        print(f"⏳ Masa istirahat, Start dikirim dalam {remaining:.1f} detik...")
+    while cycle.cooldown_remaining() > 0:
+        set_read_timeout(conn.ser, cycle.time_until_deadline(READ_TIMEOUT))
+        conn.drain()
+    cycle.poll()
+    set_read_timeout(conn.ser, READ_TIMEOUT)
+
+
+def wait_for_reply(conn, pending):
+    """
+    Membaca port sampai perintah `pending` mendapat balasan final. Perintah
+    yang tidak dibalas dikirim ulang oleh correlator; mengembalikan record
+    balasan atau None jika tetap tidak dibalas.
+    """
+    while not pending.done:
+        conn.drain()
+        conn.correlator.poll()
+    if pending.error is not None:
+        print(f"⏳ {pending.error}")
+    return pending.reply
 
-    if in_realtime_mode and (time.time() - last_realtime_data > REALTIME_TIMEOUT):
-        print("❌ EMERGENCY STOP (5 detik tanpa data)")
-        in_realtime_mode = False
+
+def ensure_device_id(conn, provisioner, port_info):
+    """
+    Membaca Device ID (0x0F) dulu dan hanya menulis (0x0E) bila berbeda dari
+    ID yang diharapkan `provisioner`, supaya koneksi ulang tidak selalu
+    menulis ulang ID ke perangkat. Mengembalikan True bila ID sudah sesuai.
+    """
+    serial_number = getattr(port_info, "serial_number", None)
+    frame = send_get_device_id_command(conn.ser)
+    reply = wait_for_reply(conn, conn.track(frame))
+    current_id = reply.text if type(reply) is DeviceId else None
+    if current_id is not None:
+        print(render_packet(reply))
+
+    wanted_id = provisioner.expected_id(
+        serial_number, port_info.device, port_info.vid, port_info.pid, current_id
+    )
+    if not provisioner.needs_write(current_id, wanted_id):
+        print(f"✔ Device ID sudah sesuai ({wanted_id}), tidak ditulis ulang.")
+        provisioner.confirm(wanted_id, serial_number, port_info.device)
         return True
+
+    print(f"\n⚙️ Melakukan Auto-Set Device ID ({wanted_id})...")
+    frame = send_set_device_id_command(conn.ser, wanted_id)
+    reply = wait_for_reply(conn, conn.track(frame))
+    if type(reply) is ExecStatus:
+        print(render_packet(reply))
+
+    # Minta Get Device ID untuk membuktikan sukses dicatatkan
+    frame = send_get_device_id_command(conn.ser)
+    reply = wait_for_reply(conn, conn.track(frame))
+    if type(reply) is DeviceId:
+        print(render_packet(reply))
+        if reply.text == wanted_id:
+            provisioner.confirm(wanted_id, serial_number, port_info.device)
+            return True
     return False
 
 
-def read_serial_loop(port_info):
-    global last_realtime_data
+def follow_device(discovery, port_name, serial_number, delay):
+    """
+    Menunggu perangkat kembali setelah port putus. Dengan nomor seri USB,
+    perangkat diikuti ke nama port barunya (mis. /dev/ttyUSB0 -> /dev/ttyUSB1)
+    begitu muncul lagi di enumerasi; tanpa nomor seri (simulator / port dari
+    argumen) port yang sama dicoba lagi setelah `delay`.
+    """
+    deadline = time.monotonic() + delay
+    if serial_number:
+        new_port = discovery.wait_for_serial(serial_number, timeout=delay)
+        if new_port is not None and new_port != port_name:
+            print(f"🔌 Perangkat {serial_number} pindah ke {new_port}")
+            return new_port
+    remaining = deadline - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
+    return port_name
 
-    port_name = port_info.device
 
-    vid_hex = f"{port_info.vid:04x}" if port_info.vid else "0000"
-    pid_hex = f"{port_info.pid:04x}" if port_info.pid else "0000"
+def read_serial_loop(port_info):
+    port_name = port_info.device
+    serial_number = getattr(port_info, "serial_number", None)
+
+    # Siklus pengukuran bertahan melewati koneksi ulang (masa istirahat tetap berlaku)
+    cycle = MeasurementCycle(
+        REALTIME_TIMEOUT, result_cooldown=RESULT_COOLDOWN, error_cooldown=ERROR_COOLDOWN
+    )
+    discovery = DeviceDiscovery(baudrate=BAUD_RATE)
+    provisioner = Provisioner(DEVICE_ID_SCHEME, DEVICE_ID_CACHE)
+    # ID sudah dicek sejak koneksi terakhir yang tidak putus (cabut / glitch hub)
+    provisioned = False
+    reconnect_delay = RECONNECT_MIN_DELAY
+    ser = None
+    capture = CaptureWriter(CAPTURE_FILE) if CAPTURE_FILE else None
+    registry = MetricsRegistry()
+    metrics = registry.device(serial_number or port_name)
 
     while True:
         try:
             print(f"\nMencoba koneksi ke {port_name}...")
-            ser = serial.Serial(port_name, BAUD_RATE, timeout=1)
+            ser = open_serial(port_name, BAUD_RATE, timeout=READ_TIMEOUT)
+            if capture is not None:
+                ser = RecordingSerial(ser, capture, serial_number or port_name)
             print(f"✔ Terhubung ke {port_name}")
+            reconnect_delay = RECONNECT_MIN_DELAY
+            conn = Connection(ser, cycle, metrics)
+
+            # Koneksi putus di tengah pengukuran: langsung lanjut menunggu hasil,
+            # pengecekan ID ditunda sampai pengukuran selesai
+            resume = cycle.measuring
+            if resume:
+                cycle.resume()
+                print("🔄 Melanjutkan pengukuran yang sedang berjalan, menunggu hasil...")
+            elif not provisioned:
+                # Auto Set ID: baca dulu, tulis hanya bila berbeda (provisioning.py)
+                provisioned = ensure_device_id(conn, provisioner, port_info)
+
+            frame = None
 
-            # Auto Set ID
-            # Karena batas maksimal Device ID adalah 12 byte (sesuai dokumen 0x0E), 
-            # maka 'bpmpro2_' (8) + '10c4ea60' (8) = 16 byte (akan terpotong jadi 'bpmpro2_10c4').
-            # Kita menggunakan awalan 'bpm_' (4) + 8 byte PID/VID = 12 byte agar lengkap.
-            auto_id = f"bpm_{vid_hex}{pid_hex}"
-            
-            print(f"\n⚙️ Melakukan Auto-Set Device ID ({auto_id})...")
-            send_set_device_id_command(ser, auto_id)
-            
-            # Tunggu respon eksekusi balasan Set ID sebentar
-            t_end = time.time() + 2
-            while time.time() < t_end:
-                sb = find_start_byte(ser)
-                if sb:
-                    lb = ser.read(1)
-                    if lb:
-                        rem = ser.read(lb[0] - 2)
-                        res = parse_packet(sb + lb + rem)
-                        if res and "HASIL EKSEKUSI" in res:
-                            print(res)
-                            break
-            
-            # Minta Get Device ID untuk membuktikan sukses dicatatkan
-            send_get_device_id_command(ser)
-            t_end = time.time() + 2
-            while time.time() < t_end:
-                sb = find_start_byte(ser)
-                if sb:
-                    lb = ser.read(1)
-                    if lb:
-                        rem = ser.read(lb[0] - 2)
-                        res = parse_packet(sb + lb + rem)
-                        if res and "GET DEVICE ID" in res:
-                            print(res)
-                            break
-
-            last_command_sent = None
-            
             # Fitur memicu perintah secara manual
-            while True:
+            while not resume:
+                if METRICS_FILE:
+                    registry.write(METRICS_FILE)
+                # Menu menunggu input() tanpa membaca port: tulis rekaman yang masih di buffer
+                if capture is not None:
+                    capture.flush()
                 user_input = input('\nMenu:\n[1] Start, [2] Stop, [3] Get ID, [4] Set ID.\n[5] Start Kalibrasi, [6] Set Tkn Aktual, [7] Cancel Kalibrasi.\n[8] Kunci Tombol Fisik Alat, [9] Pengaturan Bahasa.\nPilih Angka: ')
                 if user_input.strip() == '1':
+                    wait_for_cooldown(conn)
                     ser.reset_input_buffer()
-                    send_start_command(ser)
-                    last_command_sent = 0x21
+                    frame = send_start_command(ser)
+                    cycle.start_sent()
                     break
                 elif user_input.strip() == '2':
                     ser.reset_input_buffer()
-                    send_stop_command(ser)
-                    last_command_sent = 0x20
+                    frame = send_stop_command(ser)
                     break
                 elif user_input.strip() == '3':
                     ser.reset_input_buffer()
-                    send_get_device_id_command(ser)
-                    last_command_sent = 0x0F
+                    frame = send_get_device_id_command(ser)
                     break
                 elif user_input.strip() == '4':
                     new_id = input("Masukkan ID baru (maks 12 karakter): ")
                     ser.reset_input_buffer()
-                    send_set_device_id_command(ser, new_id)
-                    last_command_sent = 0x0E
+                    frame = send_set_device_id_command(ser, new_id)
                     break
                 elif user_input.strip() == '5':
                     try:
                         prefill = int(input("Masukkan target tekanan pre-fill untuk kalibrasi (mmHg): "))
                         ser.reset_input_buffer()
-                        send_start_calibration_command(ser, prefill)
-                        last_command_sent = 0x35
+                        # Sampel pre-fill bukan pengukuran: jangan buka siklus / watchdog
+                        cycle.calibration_started()
+                        frame = send_start_calibration_command(ser, prefill)
                     except ValueError:
                         print("⚠️ Harap masukkan angka yang valid.")
                     break
@@ -501,107 +458,121 @@ def read_serial_loop(port_info):
                     try:
                         actual = int(input("Masukkan Set tekanan aktual kalibrasi (mmHg): "))
                         ser.reset_input_buffer()
-                        send_set_calibration_pressure_command(ser, actual)
-                        last_command_sent = 0x36
+                        frame = send_set_calibration_pressure_command(ser, actual)
                     except ValueError:
                         print("⚠️ Harap masukkan angka yang valid.")
                     break
                 elif user_input.strip() == '7':
                     ser.reset_input_buffer()
-                    send_cancel_calibration_command(ser)
-                    last_command_sent = 0x37
+                    frame = send_cancel_calibration_command(ser)
                     break
                 elif user_input.strip() == '8':
                     choice = input("Pengaturan Tombol Fisik Alat -> [0]: Buka, [1]: Blokir: ")
                     if choice.strip() == '0':
                         ser.reset_input_buffer()
-                        send_toggle_button_command(ser, True)
+                        frame = send_toggle_button_command(ser, True)
                     elif choice.strip() == '1':
                         ser.reset_input_buffer()
-                        send_toggle_button_command(ser, False)
+                        frame = send_toggle_button_command(ser, False)
                     else:
                         print("⚠️ Pilihan tidak valid.")
-                    last_command_sent = 0x26
                     break
                 elif user_input.strip() == '9':
                     choice = input("Pilih Bahasa Modul -> [0]: Mandarin, [1]: Inggris, [2]: Thailand: ")
                     if choice.strip() in ['0', '1', '2']:
                         ser.reset_input_buffer()
-                        send_set_language_command(ser, int(choice.strip()))
-                        last_command_sent = 0x66
+                        frame = send_set_language_command(ser, int(choice.strip()))
                     else:
                         print("⚠️ Pilihan tidak valid.")
                     break
                 else:
                     print("⚠️ Input tidak sesuai.")
 
-            last_realtime_data = time.time()
-            wait_start_time = time.time()
+            # Buang sisa frame lama, sama seperti ser.reset_input_buffer()
+            conn.decoder.clear()
+
+            pending = conn.track(frame) if frame else None
 
             while True:
+                # Timeout baca mengikuti deadline watchdog, jadi emergency stop
+                # terdeteksi tepat waktu walau port diam
+                set_read_timeout(ser, cycle.time_until_deadline(READ_TIMEOUT))
 
-                if check_realtime_timeout():
-                    print("Restarting pembacaan...\n")
-                    break
+                stop_listening = False
 
-                start = find_start_byte(ser)
-                if not start:
-                    # Jika perintah bukanlah 'Start Measurement', jangan tunggu alat merespons tanpa henti.
-                    # Putus loop jika 3 detik berlalu dan tidak ada info/data baru.
-                    if last_command_sent != 0x21:
-                        if time.time() - wait_start_time > 3:
-                            print("\n⏳ Selesai mengeksekusi (Timeout balasan). Kembali...\n")
-                            break
-                    continue
+                for packet in conn.read_packets():
+                    # Status antara (0x01 Execute / 0x02 Busy): perintah masih ditunggu
+                    if type(packet) is ExecStatus and pending is not None and not pending.done:
+                        continue
 
-                length_byte = ser.read(1)
-                if not length_byte:
-                    continue
+                    print(render_packet(packet))
 
-                length = length_byte[0]
-                remaining = ser.read(length - 2)
+                    # Jika hasil final → masa istirahat berjalan di latar, kembali ke menu
+                    if type(packet) is MeasurementResult:
+                        print(f"Masa istirahat {RESULT_COOLDOWN} detik sebelum pengukuran berikutnya.\n")
+                        stop_listening = True
+                        break
 
-                if len(remaining) != length - 2:
-                    continue
+                    # Jika itu seputar urusan Device ID, Error, atau Eksekusi Khusus → langsung ke menu awal
+                    if type(packet) in (DeviceId, ExecStatus, ErrorReport):
+                        stop_listening = True
+                        break
 
-                full_packet = start + length_byte + remaining
-                result = parse_packet(full_packet)
+                if stop_listening:
+                    break
 
-                if result:
-                    print(result)
+                if cycle.poll():
+                    print("❌ EMERGENCY STOP (5 detik tanpa data)")
+                    print("Restarting pembacaan...\n")
+                    break
 
-                    # Jika hasil final → tunggu 5 detik lalu restart loop
-                    if "HASIL PENGUKURAN" in result:
-                        print("Menunggu 5 detik sebelum pengukuran berikutnya...\n")
-                        time.sleep(5)
-                        break
-                        
-                    # Jika itu seputar urusan Device ID, Error, atau Eksekusi Khusus → tunggu sebentar lalu langsung ke menu awal
-                    if any(key in result for key in ["DEVICE ID", "HASIL EKSEKUSI", "ERROR"]):
-                        time.sleep(1)
-                        # Reset flag timeout realtime agar tidak memicu reset semu 
-                        in_realtime_mode = False  
-                        break
+                # Perintah yang tetap tidak dibalas setelah dikirim ulang → kembali ke menu
+                conn.correlator.poll()
+                if pending is not None and pending.error is not None:
+                    print(f"\n⏳ {pending.error}. Kembali...\n")
+                    if pending.packet_id == PACKET_ID_START:
+                        cycle.cancel()
+                    break
 
             ser.close()
             print("Port ditutup.")
 
         except serial.SerialException:
-            print(f"❌ Gagal membuka {port_name}. Pastikan alat terhubung.")
-            time.sleep(3)
+            print(f"❌ Koneksi ke {port_name} gagal / terputus. Pastikan alat terhubung.")
+            if ser is not None:
+                ser.close()
+                ser = None
+            # Bisa jadi alat lain yang tercolok di port ini: cek ulang ID-nya
+            provisioned = False
+            port_name = follow_device(discovery, port_name, serial_number, reconnect_delay)
+            reconnect_delay = min(reconnect_delay * 2, RECONNECT_MAX_DELAY)
 
         except KeyboardInterrupt:
             print("\nProgram dihentikan oleh user.")
             break
 
+    if capture is not None:
+        capture.close()
+
 
 # ================= MAIN =================
 
 if __name__ == "__main__":
+    import sys
+
+    # Log lewat antrian + thread terpisah; format polos supaya tampilan menu tetap sama
+    setup_logging(LOG_LEVEL, stream=sys.stdout, fmt="%(message)s")
+
     print("=== BP MONITOR ===")
     print("Emergency stop jika 5 detik tanpa data realtime\n")
-    
-    selected_port = select_port()
+
+    if len(sys.argv) > 1:
+        # Port langsung dari argumen, mis. "sim://bpm_sim?speed=5" untuk simulator
+        from types import SimpleNamespace
+
+        selected_port = SimpleNamespace(device=sys.argv[1], vid=None, pid=None, serial_number=None)
+    else:
+        selected_port = select_port()
     if selected_port:
         read_serial_loop(selected_port)
     else:
@@ -0,0 +1,224 @@
+# ==========================================
+# DECODER PAKET TERSTRUKTUR BPMPRO 2
+# ==========================================
+#
+# `decode_packet()` mengubah satu frame (yang CRC-nya sudah valid) menjadi
+# record bertipe. Tidak ada string yang dibangun di sini; tampilan teks ada
+# di render.py.
+
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from crc16 import calc_crc
+
+START_BYTE = 0x5A
+PARAM_TYPE_SLEEVE = 0xF1
+PARAM_TYPE_BP = 0xF2
+
+PACKET_ID_HANDSHAKE = 0x01
+PACKET_ID_SET_DEVICE_ID = 0x0E
+PACKET_ID_GET_DEVICE_ID = 0x0F
+PACKET_ID_RESET = 0x1A
+PACKET_ID_STOP = 0x20
+PACKET_ID_START = 0x21
+PACKET_ID_RESULT = 0x22
+PACKET_ID_CLEAR_COUNT = 0x24
+PACKET_ID_ERROR = 0x25
+PACKET_ID_TOGGLE_BUTTON = 0x26
+PACKET_ID_REALTIME = 0x28
+PACKET_ID_PRESSURE_OUTPUT = 0x29
+PACKET_ID_CLEAR_RECORDS = 0x2A
+PACKET_ID_STORAGE_COUNT = 0x2B
+PACKET_ID_STORED_DATA = 0x2C
+PACKET_ID_START_CALIBRATION = 0x35
+PACKET_ID_SET_CALIBRATION_PRESSURE = 0x36
+PACKET_ID_CANCEL_CALIBRATION = 0x37
+PACKET_ID_SET_LANGUAGE = 0x66
+
+DEVICE_ID_LEN = 12
+
+# Status eksekusi umum (docs.md bagian 4)
+EXEC_OK = 0x00
+EXEC_RUNNING = 0x01
+EXEC_BUSY = 0x02
+EXEC_FAILED = 0x03
+EXEC_PROTECTION = 0x04
+EXEC_UNKNOWN = 0xFF
+
+
+# ================= RECORD =================
+
+class RealtimePressure(NamedTuple):
+    pressure: int
+
+
+class MeasurementResult(NamedTuple):
+    systolic: int
+    diastolic: int
+    mean: int
+    heart_rate: int
+    year: int
+    month: int
+    day: int
+    hour: int
+    minute: int
+
+    @property
+    def measured_at(self) -> Optional[datetime]:
+        """Waktu pengukuran dari perangkat, None jika tanggalnya tidak valid."""
+        try:
+            return datetime(self.year, self.month, self.day, self.hour, self.minute)
+        except ValueError:
+            return None
+
+
+class ExecStatus(NamedTuple):
+    packet_id: int
+    status: int
+
+
+class DeviceId(NamedTuple):
+    raw: bytes
+    text: str
+
+
+class ErrorReport(NamedTuple):
+    code: int
+
+
+class StorageCount(NamedTuple):
+    count: int
+
+
+class StoredResult(NamedTuple):
+    """
+    Satu record riwayat dari memori perangkat (0x2C). `index` hanya terisi
+    jika perangkat ikut mengirim nomor record (2 byte sebelum data 14 byte);
+    jika tidak, bernilai -1 dan diisi oleh pengunduh (history.py).
+    """
+    index: int
+    result: MeasurementResult
+
+
+# ================= DECODER PER PACKET ID =================
+
+def _u16(frame, offset: int) -> int:
+    return (frame[offset] << 8) | frame[offset + 1]
+
+
+def _decode_realtime(frame, length):
+    if length < 0x08:
+        return None
+    return RealtimePressure(_u16(frame, 4))
+
+
+def _decode_result(frame, length):
+    if length < 0x14:
+        return None
+    return MeasurementResult(
+        _u16(frame, 4),
+        _u16(frame, 6),
+        _u16(frame, 8),
+        _u16(frame, 10),
+        _u16(frame, 12),
+        frame[14],
+        frame[15],
+        frame[16],
+        frame[17],
+    )
+
+
+def _decode_storage_count(frame, length):
+    if length < 8:
+        return None
+    return StorageCount(_u16(frame, 4))
+
+
+def _decode_stored_data(frame, length):
+    # 14 byte data, atau 2 byte nomor record + 14 byte data
+    if length >= 0x16:
+        return StoredResult(_u16(frame, 4), _decode_result(memoryview(frame)[2:], length - 2))
+    if length >= 0x14:
+        return StoredResult(-1, _decode_result(frame, length))
+    return None
+
+
+def _decode_device_id(frame, length):
+    raw = bytes(frame[4:length - 2])
+    return DeviceId(raw, raw.decode('ascii', errors='replace').strip('\x00'))
+
+
+def _decode_exec_status(frame, length):
+    status = frame[4] if length > 6 else EXEC_UNKNOWN
+    return ExecStatus(frame[2], status)
+
+
+def _decode_error(frame, length):
+    return ErrorReport(frame[4] if length > 6 else EXEC_UNKNOWN)
+
+
+# Packet ID yang balasannya berupa satu byte status eksekusi umum
+EXEC_STATUS_PACKET_IDS = (
+    PACKET_ID_HANDSHAKE,
+    PACKET_ID_SET_DEVICE_ID,
+    PACKET_ID_STOP,
+    PACKET_ID_START,
+    PACKET_ID_TOGGLE_BUTTON,
+    PACKET_ID_START_CALIBRATION,
+    PACKET_ID_SET_CALIBRATION_PRESSURE,
+    PACKET_ID_CANCEL_CALIBRATION,
+    PACKET_ID_SET_LANGUAGE,
+    PACKET_ID_RESET,
+    PACKET_ID_CLEAR_COUNT,
+    PACKET_ID_PRESSURE_OUTPUT,
+    PACKET_ID_CLEAR_RECORDS,
+    # Perintah lain di docs.md yang juga membalas status umum (commands.py)
+    0x11, 0x12, 0x14, 0x1B, 0x1F, 0x31, 0x32, 0x33, 0x34, 0x38, 0x39, 0x3A,
+    0x3D, 0x3F, 0x51, 0x59, 0x5B, 0x5D, 0x61, 0x62, 0xFE,
+)
+
+# Perintah yang membalas "Execute command" (0x01) dulu, lalu status final
+STAGED_PACKET_IDS = (PACKET_ID_RESET, PACKET_ID_CLEAR_COUNT, PACKET_ID_CLEAR_RECORDS)
+
+DECODERS = {
+    PACKET_ID_REALTIME: _decode_realtime,
+    PACKET_ID_RESULT: _decode_result,
+    PACKET_ID_GET_DEVICE_ID: _decode_device_id,
+    PACKET_ID_ERROR: _decode_error,
+    PACKET_ID_STORAGE_COUNT: _decode_storage_count,
+    PACKET_ID_STORED_DATA: _decode_stored_data,
+}
+for _packet_id in EXEC_STATUS_PACKET_IDS:
+    DECODERS[_packet_id] = _decode_exec_status
+
+
+def decode_packet(frame):
+    """
+    Mengubah satu frame lengkap menjadi record terstruktur.
+    Mengembalikan None untuk frame yang bukan milik modul BP (0xF2),
+    packet ID yang tidak dikenal, atau panjang data yang kurang.
+    """
+    length = len(frame)
+    if length < 6 or frame[0] != START_BYTE or frame[3] != PARAM_TYPE_BP:
+        return None
+
+    decoder = DECODERS.get(frame[2])
+    if decoder is None:
+        return None
+    return decoder(frame, length)
+
+
+# ================= ENCODER =================
+
+def encode_frame(packet_id: int, data=b"", param_type: int = PARAM_TYPE_BP) -> bytes:
+    """
+    Menyusun frame perintah lengkap:
+    [Start Byte] + [Length] + [Packet ID] + [Parameter Type] + [Data] + [CRC16 big-endian]
+    """
+    payload = bytes((START_BYTE, len(data) + 6, packet_id, param_type)) + bytes(data)
+    return payload + calc_crc(payload)
+
+
+def encode_device_id(new_id: str) -> bytes:
+    """Device ID dipotong atau didempul (padding) agar tepat 12 byte ASCII."""
+    return new_id.encode('ascii', errors='ignore')[:DEVICE_ID_LEN].ljust(DEVICE_ID_LEN, b'\x00')
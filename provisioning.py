@@ -0,0 +1,214 @@
+# ==========================================
+# PROVISIONING DEVICE ID
+# ==========================================
+#
+# Device ID (0x0E / 0x0F) maksimal 12 byte ASCII. Skema lama menulis
+# `bpm_<vid><pid>` ke setiap alat, padahal semua board CP210x ber-VID/PID
+# sama, jadi semua alat di satu host mendapat ID `bpm_10c4ea60`.
+#
+# Skema yang tersedia:
+#   vidpid  `bpm_10c4ea60` (perilaku lama, sama untuk semua alat)
+#   serial  `bpm_` + 8 karakter terakhir nomor seri USB (unik per board)
+#   fleet   `bpm_0001`, `bpm_0002`, ... nomor urut yang dibagikan sekali per
+#           nomor seri USB dan disimpan di file cache
+#
+# Alur: baca 0x0F dulu, tulis 0x0E hanya bila berbeda dari ID yang
+# diharapkan, lalu catat hasilnya di cache (ID yang diharapkan per nomor
+# seri USB).
+#
+#   python provisioning.py --scheme fleet     # semua alat yang terhubung
+
+import json
+import time
+
+from packets import DEVICE_ID_LEN
+
+SCHEME_VIDPID = "vidpid"
+SCHEME_SERIAL = "serial"
+SCHEME_FLEET = "fleet"
+SCHEMES = (SCHEME_VIDPID, SCHEME_SERIAL, SCHEME_FLEET)
+
+ID_PREFIX = "bpm_"
+DEFAULT_CACHE_PATH = "bpm_ids.json"
+DEFAULT_VID = 0x10C4
+DEFAULT_PID = 0xEA60
+
+
+def vidpid_id(vid, pid, prefix: str = ID_PREFIX) -> str:
+    # 'bpm_' (4) + 8 byte VID/PID = 12 byte, pas dengan batas 0x0E
+    return f"{prefix}{vid or 0:04x}{pid or 0:04x}"[:DEVICE_ID_LEN]
+
+
+def serial_id(serial_number: str, prefix: str = ID_PREFIX) -> str:
+    tail = "".join(c for c in serial_number if c.isalnum()).lower()
+    return (prefix + tail[-(DEVICE_ID_LEN - len(prefix)):])[:DEVICE_ID_LEN]
+
+
+def fleet_id(number: int, prefix: str = ID_PREFIX) -> str:
+    return f"{prefix}{number:04d}"[:DEVICE_ID_LEN]
+
+
+class Provisioner:
+    """
+    Menentukan ID yang diharapkan per alat dan mengingatnya. Kunci alat
+    adalah nomor seri USB; tanpa nomor seri dipakai nama port (`@/dev/...`).
+    """
+
+    def __init__(self, scheme: str = SCHEME_VIDPID, cache_path: str = None, prefix: str = ID_PREFIX):
+        if scheme not in SCHEMES:
+            raise ValueError(f"Skema ID tidak dikenal: {scheme!r} (pilih {', '.join(SCHEMES)})")
+        self.scheme = scheme
+        self.cache_path = cache_path
+        self.prefix = prefix
+        self.devices = {}
+        self.next_number = 1
+        if cache_path:
+            self._load()
+
+    @staticmethod
+    def device_key(serial_number: str = None, port: str = "") -> str:
+        return serial_number or f"@{port}"
+
+    # ----- ID yang diharapkan -----
+
+    def expected_id(self, serial_number: str = None, port: str = "", vid=None, pid=None,
+                    current_id: str = None) -> str:
+        """
+        ID untuk alat ini menurut skema. Pada skema fleet, ID alat yang sudah
+        berformat fleet dan belum dipakai alat lain diadopsi (tidak ditulis
+        ulang); selain itu nomor berikutnya dibagikan.
+        """
+        if self.scheme == SCHEME_VIDPID:
+            return vidpid_id(vid or DEFAULT_VID, pid or DEFAULT_PID, self.prefix)
+        if self.scheme == SCHEME_SERIAL:
+            if not serial_number:
+                return vidpid_id(vid or DEFAULT_VID, pid or DEFAULT_PID, self.prefix)
+            return serial_id(serial_number, self.prefix)
+
+        key = self.device_key(serial_number, port)
+        entry = self.devices.get(key)
+        if entry is not None:
+            return entry["expected_id"]
+        if current_id and self._is_fleet_id(current_id) and not self._taken(current_id):
+            expected = current_id
+            self.next_number = max(self.next_number, int(current_id[len(self.prefix):]) + 1)
+        else:
+            expected = fleet_id(self.next_number, self.prefix)
+            while self._taken(expected):
+                self.next_number += 1
+                expected = fleet_id(self.next_number, self.prefix)
+            self.next_number += 1
+        self.devices[key] = {"expected_id": expected, "verified_at": None}
+        self._save()
+        return expected
+
+    def _is_fleet_id(self, device_id: str) -> bool:
+        number = device_id[len(self.prefix):]
+        return device_id.startswith(self.prefix) and number.isdigit() and len(number) >= 4
+
+    def _taken(self, device_id: str) -> bool:
+        return any(e["expected_id"] == device_id for e in self.devices.values())
+
+    # ----- hasil verifikasi -----
+
+    def confirm(self, device_id: str, serial_number: str = None, port: str = ""):
+        """Mencatat ID yang sudah terbaca dari alat (0x0F) sesuai harapan."""
+        key = self.device_key(serial_number, port)
+        self.devices[key] = {"expected_id": device_id, "verified_at": time.time()}
+        self._save()
+
+    def needs_write(self, current_id, expected_id: str) -> bool:
+        return current_id != expected_id
+
+    # ----- file cache -----
+
+    def _load(self):
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.devices = data.get("devices", {})
+        self.next_number = data.get("next_fleet_number", 1)
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump({"next_fleet_number": self.next_number, "devices": self.devices}, f, indent=2)
+
+
+# ================= PROVISIONING ASYNC (MULTI-PERANGKAT) =================
+
+async def provision_session(session, provisioner: Provisioner, serial_number: str = None,
+                            port: str = "", vid=None, pid=None):
+    """
+    Baca-dulu untuk satu BpmSession. Mengembalikan (id_lama, id_sekarang,
+    ditulis).
+    """
+    from packets import DeviceId
+
+    reply = await session.get_device_id()
+    current = reply.text if type(reply) is DeviceId else None
+    expected = provisioner.expected_id(serial_number, port, vid, pid, current)
+    if not provisioner.needs_write(current, expected):
+        provisioner.confirm(expected, serial_number, port)
+        return current, current, False
+
+    await session.set_device_id(expected)
+    reply = await session.get_device_id()
+    written = reply.text if type(reply) is DeviceId else None
+    if written == expected:
+        provisioner.confirm(expected, serial_number, port)
+    return current, written, True
+
+
+async def provision_all(provisioner: Provisioner, ports=None):
+    """Provisioning semua port BPMPRO 2 yang terhubung secara paralel."""
+    import asyncio
+
+    from discovery import DeviceDiscovery
+    from session import open_session
+
+    ports = ports if ports is not None else DeviceDiscovery().candidates()
+
+    async def one(port_info):
+        session = await open_session(port_info.device)
+        try:
+            return await provision_session(
+                session, provisioner, port_info.serial_number, port_info.device,
+                port_info.vid, port_info.pid,
+            )
+        finally:
+            await session.close()
+
+    results = await asyncio.gather(*(one(p) for p in ports), return_exceptions=True)
+    return list(zip(ports, results))
+
+
+def main():
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Provisioning Device ID BPMPRO 2")
+    parser.add_argument("--scheme", choices=SCHEMES, default=SCHEME_SERIAL)
+    parser.add_argument("--prefix", default=ID_PREFIX)
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="file cache ID per nomor seri USB")
+    args = parser.parse_args()
+
+    provisioner = Provisioner(args.scheme, args.cache, args.prefix)
+    results = asyncio.run(provision_all(provisioner))
+    if not results:
+        print("❌ Tidak ada perangkat yang cocok (Silicon Labs CP210x) ditemukan.")
+        return
+    for port_info, result in results:
+        if isinstance(result, BaseException):
+            print(f"❌ {port_info.device}: {result}")
+            continue
+        old, new, written = result
+        status = "ditulis" if written else "sudah sesuai"
+        print(f"✔ {port_info.device} [{port_info.serial_number or '-'}] {old!r} -> {new!r} ({status})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# ==========================================
+# TAMPILAN TEKS UNTUK RECORD PAKET
+# ==========================================
+#
+# Lapisan presentasi terpisah dari decoder (packets.py). Teks hanya dibangun
+# ketika memang akan dicetak ke terminal.
+
+import time
+from datetime import datetime
+
+from packets import (
+    DeviceId,
+    ErrorReport,
+    ExecStatus,
+    MeasurementResult,
+    RealtimePressure,
+    StorageCount,
+    StoredResult,
+)
+
+STATUS_MAP = {
+    0x00: "✅ Operasi Berhasil Diselesaikan!",
+    0x01: "Memproses Command...",
+    0x02: "Perangkat Sibuk",
+    0x03: "❌ Operasi Gagal",
+    0x04: "System Protection Aktif",
+}
+
+ERROR_MAP = {
+    0x00: "Hasil normal",
+    0x01: "Manset terlalu longgar atau tidak terhubung",
+    0x02: "Terjadi kebocoran pada sirkuit udara atau katup",
+    0x03: "Kesalahan tekanan udara, kemungkinan katup tidak terbuka normal",
+    0x04: "Sinyal lemah (denyut nadi terlalu lemah atau manset terlalu longgar)",
+    0x05: "Nilai tekanan darah objek berada di luar jangkauan pengukuran",
+    0x06: "Gerakan berlebihan selama pengukuran",
+    0x07: "Pengukuran tekanan berlebih (>290 mmHg untuk dewasa)",
+    0x08: "Saturasi sinyal, amplitudo terlalu besar karena gerakan",
+    0x09: "Waktu pengukuran berakhir (timeout melebihi 120s/90s)",
+    0x0A: "Dihentikan secara manual",
+    0x0B: "Kesalahan sistem",
+    0x0C: "Kesalahan saat membaca informasi kalibrasi",
+    0x0D: "Tidak ada sinyal yang terdeteksi",
+    0x0E: "Gelombang denyut nadi tidak teratur",
+    0x10: "Perlindungan tekanan berlebih aktif (>290 mmHg)",
+    0x11: "Kegagalan pada sleeve, kegagalan operasi motor",
+    0x12: "Pengukuran gagal dilakukan",
+    0x13: "Postur lengan salah atau sakelar siku tidak ditekan",
+    0x20: "Komunikasi handshake gagal",
+    0x23: "Pengukuran tidak dapat dimulai, tidak ada respons saat diinstruksikan",
+    0x24: "Tidak bisa mendapatkan hasil pengukuran",
+    0x25: "Batas waktu keseluruhan melebihi 180 detik",
+    0x26: "Komunikasi awal (Handshake) gagal dilakukan",
+    0x40: "Kertas pada printer habis",
+    0x41: "Penutup printer tidak ditutup dengan rapat",
+    0x42: "Penutup luar printer terbuka",
+    0x60: "Saat ini tidak ada rekaman/riwayat pengukuran",
+    0x64: "Tombol berhenti darurat (emergency stop) ditekan",
+}
+
+
+def status_text(status: int) -> str:
+    return STATUS_MAP.get(status, f"Kode Tak Dikenal: {status}")
+
+
+def error_text(code: int) -> str:
+    return ERROR_MAP.get(code, f"Kode Kesalahan Tak Dikenal: {hex(code)}")
+
+
+# Sampel realtime 0x28 datang ~25x/detik; terminal cukup 2x/detik
+REALTIME_DISPLAY_INTERVAL = 0.5
+
+
+class RealtimeThrottle:
+    """
+    Pembatas tampilan sampel realtime untuk satu koneksi (bukan variabel
+    global), jadi setiap alat / thread punya jedanya sendiri.
+    """
+
+    __slots__ = ("interval", "clock", "_last")
+
+    def __init__(self, interval: float = REALTIME_DISPLAY_INTERVAL, clock=time.monotonic):
+        self.interval = interval
+        self.clock = clock
+        self._last = None
+
+    def due(self) -> bool:
+        """True bila sampel sekarang perlu ditampilkan."""
+        now = self.clock()
+        if self._last is not None and now - self._last < self.interval:
+            return False
+        self._last = now
+        return True
+
+
+# ================= RENDER PER TIPE =================
+
+def _render_realtime(packet):
+    return f"Realtime Pressure: {packet.pressure} mmHg"
+
+
+def _render_result(packet):
+    measurement_time = packet.measured_at or datetime.now()
+    return (
+        "\n=== HASIL PENGUKURAN ===\n"
+        f"Sistolik     : {packet.systolic} mmHg\n"
+        f"Diastolik    : {packet.diastolic} mmHg\n"
+        f"Mean         : {packet.mean} mmHg\n"
+        f"Heart Rate   : {packet.heart_rate} bpm\n"
+        f"Waktu        : {measurement_time}\n"
+        "=========================\n"
+    )
+
+
+def _render_device_id(packet):
+    return (
+        "\n=== GET DEVICE ID ===\n"
+        f"Raw Hex : {packet.raw.hex().upper()}\n"
+        f"ASCII   : {packet.text}\n"
+        "=====================\n"
+    )
+
+
+def _render_exec_status(packet):
+    return (
+        f"\n=== HASIL EKSEKUSI (ID {hex(packet.packet_id).upper()}) ===\n"
+        f"Status: {status_text(packet.status)}\n"
+        "==================================\n"
+    )
+
+
+def _render_error(packet):
+    return (
+        "\n=== PENGUKURAN GAGAL (ERROR) ===\n"
+        f"Penyebab: {error_text(packet.code)}\n"
+        "================================\n"
+    )
+
+
+def _render_storage_count(packet):
+    return f"\nJumlah data tersimpan: {packet.count}\n"
+
+
+def _render_stored_result(packet):
+    return f"\n[Riwayat #{packet.index}]" + _render_result(packet.result)
+
+
+RENDERERS = {
+    RealtimePressure: _render_realtime,
+    MeasurementResult: _render_result,
+    DeviceId: _render_device_id,
+    ExecStatus: _render_exec_status,
+    ErrorReport: _render_error,
+    StorageCount: _render_storage_count,
+    StoredResult: _render_stored_result,
+}
+
+DEBUG_LABELS = {
+    RealtimePressure: "REALTIME",
+    MeasurementResult: "RESULT",
+    DeviceId: "GET ID",
+    ErrorReport: "ERROR",
+    StorageCount: "STORAGE COUNT",
+    StoredResult: "STORED DATA",
+}
+
+
+def render_packet(packet) -> str:
+    """Teks terminal untuk satu record paket."""
+    return RENDERERS[type(packet)](packet)
+
+
+def debug_label(packet) -> str:
+    """Label untuk baris hex dump `[DEBUG ...]`."""
+    if type(packet) is ExecStatus:
+        return f"EXEC ID: {hex(packet.packet_id).upper()}"
+    return DEBUG_LABELS[type(packet)]
+
+
+# ================= RECORD TERSTRUKTUR (JSON) =================
+
+PACKET_TYPE_NAMES = {
+    RealtimePressure: "realtime",
+    MeasurementResult: "result",
+    DeviceId: "device_id",
+    ExecStatus: "exec_status",
+    ErrorReport: "error",
+    StorageCount: "storage_count",
+    StoredResult: "stored_result",
+}
+
+
+def _fields(record) -> dict:
+    fields = {}
+    for name, value in zip(record._fields, record):
+        if isinstance(value, bytes):
+            value = value.hex()
+        elif isinstance(value, tuple):
+            value = _fields(value)
+        fields[name] = value
+    return fields
+
+
+def packet_to_dict(packet) -> dict:
+    """Record paket sebagai dict siap-JSON (untuk output JSON lines / gateway)."""
+    packet_type = type(packet)
+    data = {"type": PACKET_TYPE_NAMES[packet_type]}
+    data.update(_fields(packet))
+    if packet_type is ExecStatus:
+        data["message"] = status_text(packet.status)
+    elif packet_type is ErrorReport:
+        data["message"] = error_text(packet.code)
+    return data
@@ -0,0 +1,437 @@
+# ==========================================
+# SESI PERANGKAT ASYNCIO (NON-BLOCKING)
+# ==========================================
+#
+# `BpmSession` menjalankan satu task pembaca yang terus menguras port, jadi
+# tidak ada frame yang menumpuk di buffer OS saat menu atau perintah lain
+# sedang berjalan. Perintah bersifat awaitable dan selesai ketika paket
+# balasan final dengan packet ID yang sama datang (lihat correlation.py
+# untuk pengiriman ulang dan status antara 0x01 / 0x02).
+#
+#     async with await open_session("/dev/ttyUSB0") as session:
+#         await session.get_device_id()
+#         await session.start_measurement()
+#         async for sample in session.realtime():
+#             ...
+
+import asyncio
+from logging import DEBUG
+
+from capture import RX, TX
+from commands import encode_command
+from correlation import COMMAND_RETRIES, COMMAND_TIMEOUT, CommandTimeout, Correlator
+from framing import FrameDecoder
+from packets import (
+    PACKET_ID_CANCEL_CALIBRATION,
+    PACKET_ID_GET_DEVICE_ID,
+    PACKET_ID_SET_CALIBRATION_PRESSURE,
+    PACKET_ID_SET_DEVICE_ID,
+    PACKET_ID_SET_LANGUAGE,
+    PACKET_ID_START,
+    PACKET_ID_START_CALIBRATION,
+    PACKET_ID_STOP,
+    PACKET_ID_TOGGLE_BUTTON,
+    ErrorReport,
+    MeasurementResult,
+    RealtimePressure,
+    decode_packet,
+    encode_device_id,
+)
+from telemetry import HexDump, get_logger
+
+BAUD_RATE = 19200
+
+READ_CHUNK = 4096
+SUBSCRIBER_QUEUE_SIZE = 1024
+
+
+log = get_logger("session")
+
+
+class SessionClosed(Exception):
+    """Sesi ditutup atau port terputus saat perintah masih menunggu balasan."""
+
+
+# ================= LANGGANAN PAKET =================
+
+class PacketSubscription:
+    """
+    Async iterator atas record paket dengan tipe tertentu.
+
+    Antrian dibatasi; jika pelanggan terlalu lambat, record tertua dibuang
+    supaya task pembaca tidak pernah ikut tertahan.
+    """
+
+    __slots__ = ("_session", "types", "queue", "dropped")
+
+    def __init__(self, session, types, maxsize: int = SUBSCRIBER_QUEUE_SIZE):
+        self._session = session
+        self.types = types
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def _push(self, packet):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(packet)
+
+    def close(self):
+        self._session._subscriptions.discard(self)
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        packet = await self.queue.get()
+        if packet is None:
+            self._session._subscriptions.discard(self)
+            raise StopAsyncIteration
+        return packet
+
+
+# ================= SESI =================
+
+class BpmSession:
+    """
+    Satu koneksi ke satu BPMPRO 2 di atas pasangan asyncio StreamReader /
+    StreamWriter (serial_asyncio, pty, atau transport simulasi).
+    """
+
+    def __init__(self, reader, writer, name: str = "", capture=None):
+        self.name = name
+        self._reader = reader
+        self._writer = writer
+        self.decoder = FrameDecoder()
+        self.correlator = Correlator(self._write)
+        # CaptureWriter (capture.py) opsional: semua byte RX/TX direkam mentah
+        self.capture = capture
+        # DeviceMetrics (telemetry.py) opsional: counter tipe paket / kode error
+        self.metrics = None
+        self._timer = None
+        self._capture_timer = None
+        self._subscriptions = set()
+        self._listeners = []
+        self._task = None
+        self.closed = False
+
+    # ----- siklus hidup -----
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._read_loop())
+        return self
+
+    async def close(self):
+        if self._writer is None:
+            return
+        self.closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._writer.close()
+        self._writer = None
+        self._shutdown(SessionClosed(self.name))
+
+    async def wait_closed(self):
+        """Menunggu sampai port putus (EOF / error baca) atau sesi ditutup."""
+        if self._task is not None:
+            await asyncio.wait((self._task,))
+
+    async def __aenter__(self):
+        return self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _shutdown(self, exc):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._capture_timer is not None:
+            self._capture_timer.cancel()
+            self._capture_timer = None
+        if self.capture is not None:
+            self.capture.flush()
+        self.correlator.fail_all(exc)
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+    # ----- pembaca -----
+
+    async def _read_loop(self):
+        reader = self._reader
+        decoder = self.decoder
+        try:
+            while True:
+                data = await reader.read(READ_CHUNK)
+                if not data:
+                    break
+                if self.capture is not None:
+                    self._record(data, RX)
+                decoder.feed(data)
+                for frame in decoder.frames():
+                    self._dispatch(frame)
+        except (ConnectionError, OSError) as e:
+            log.warning("%s: port error: %s", self.name, e)
+            self.closed = True
+            self._shutdown(SessionClosed(f"{self.name}: {e}"))
+            return
+        # Port putus (cabut USB): perintah berikutnya langsung gagal, tidak menunggu timeout
+        log.info("%s: port tertutup", self.name)
+        self.closed = True
+        self._shutdown(SessionClosed(f"{self.name}: port tertutup"))
+
+    def _dispatch(self, frame):
+        if log.isEnabledFor(DEBUG):
+            log.debug("%s RX %s", self.name, HexDump(frame))
+        packet = decode_packet(frame)
+        if packet is None:
+            return
+        if self.metrics is not None:
+            self.metrics.on_packet(packet)
+
+        if self.correlator.on_packet(frame[2], packet):
+            self._arm_timer()
+
+        for listener in self._listeners:
+            listener(packet)
+
+        packet_type = type(packet)
+        for subscription in self._subscriptions:
+            if packet_type in subscription.types:
+                subscription._push(packet)
+
+    def add_listener(self, callback):
+        """
+        Callback sinkron `callback(packet)` untuk setiap record yang diterima.
+        Dipanggil langsung dari task pembaca, jadi harus cepat dan tidak blok.
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self._listeners.remove(callback)
+
+    def subscribe(self, *types) -> PacketSubscription:
+        """Berlangganan record dengan tipe tertentu (RealtimePressure, dsb)."""
+        subscription = PacketSubscription(self, types)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def realtime(self) -> PacketSubscription:
+        """Async iterator atas sampel tekanan manset realtime (0x28)."""
+        return self.subscribe(RealtimePressure)
+
+    async def wait_result(self, timeout=None):
+        """Menunggu hasil akhir pengukuran: MeasurementResult atau ErrorReport."""
+        subscription = self.subscribe(MeasurementResult, ErrorReport)
+        try:
+            packet = await asyncio.wait_for(subscription.__anext__(), timeout)
+        except StopAsyncIteration:
+            raise SessionClosed(self.name) from None
+        finally:
+            subscription.close()
+        return packet
+
+    # ----- perintah -----
+
+    def _write(self, frame):
+        if log.isEnabledFor(DEBUG):
+            log.debug("%s TX %s", self.name, HexDump(frame))
+        if self.capture is not None:
+            self._record(frame, TX)
+        self._writer.write(frame)
+
+    def _record(self, data, direction):
+        """Merekam ke capture dan menjadwalkan flush bila port lalu diam."""
+        self.capture.write(self.name, data, direction)
+        if self._capture_timer is None:
+            self._arm_capture_timer()
+
+    def _arm_capture_timer(self):
+        delay = self.capture.poll() if self.capture is not None else None
+        if delay is not None:
+            self._capture_timer = asyncio.get_running_loop().call_later(delay, self._on_capture_timer)
+
+    def _on_capture_timer(self):
+        self._capture_timer = None
+        self._arm_capture_timer()
+
+    async def send(self, frame: bytes):
+        if self.closed:
+            raise SessionClosed(self.name)
+        self._write(frame)
+        await self._writer.drain()
+
+    async def request(self, packet_id: int, data=b"", timeout: float = COMMAND_TIMEOUT,
+                      retries: int = COMMAND_RETRIES):
+        """
+        Mengirim perintah dan menunggu balasan final dengan packet ID yang sama.
+        Tanpa balasan, frame dikirim ulang sampai `retries` kali (correlation.py);
+        setelah itu melempar asyncio.TimeoutError.
+        """
+        if self.closed:
+            raise SessionClosed(self.name)
+        future = asyncio.get_running_loop().create_future()
+
+        def complete(packet, error):
+            if future.done():
+                return
+            if error is None:
+                future.set_result(packet)
+            elif isinstance(error, CommandTimeout):
+                future.set_exception(asyncio.TimeoutError(str(error)))
+            else:
+                future.set_exception(error)
+
+        pending = self.correlator.submit(
+            packet_id, encode_command(packet_id, data), complete, timeout, retries
+        )
+        self._arm_timer()
+        try:
+            await self._writer.drain()
+            return await future
+        finally:
+            if not pending.done:
+                self.correlator.cancel(pending)
+
+    def _arm_timer(self):
+        """Menjadwalkan poll korelator tepat di batas waktu terdekat."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        deadline = self.correlator.next_deadline()
+        if deadline is not None:
+            delay = max(0.0, deadline - self.correlator.clock())
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self.correlator.poll()
+        self._arm_timer()
+
+    async def start_measurement(self, timeout: float = COMMAND_TIMEOUT):
+        return await self.request(PACKET_ID_START, timeout=timeout)
+
+    async def stop_measurement(self, timeout: float = COMMAND_TIMEOUT):
+        return await self.request(PACKET_ID_STOP, timeout=timeout)
+
+    async def get_device_id(self, timeout: float = COMMAND_TIMEOUT):
+        return await self.request(PACKET_ID_GET_DEVICE_ID, timeout=timeout)
+
+    async def set_device_id(self, new_id: str, timeout: float = COMMAND_TIMEOUT):
+        return await self.request(PACKET_ID_SET_DEVICE_ID, encode_device_id(new_id), timeout)
+
+    async def start_calibration(self, prefill_pressure: int, timeout: float = COMMAND_TIMEOUT):
+        return await self.request(
+            PACKET_ID_START_CALIBRATION, prefill_pressure.to_bytes(2, 'big'), timeout
+        )
+
+    async def set_calibration_pressure(self, actual_pressure: int, timeout: float = COMMAND_TIMEOUT):
+        return await self.request(
+            PACKET_ID_SET_CALIBRATION_PRESSURE, actual_pressure.to_bytes(2, 'big'), timeout
+        )
+
+    async def cancel_calibration(self, timeout: float = COMMAND_TIMEOUT):
+        return await self.request(PACKET_ID_CANCEL_CALIBRATION, timeout=timeout)
+
+    async def set_button_lock(self, locked: bool, timeout: float = COMMAND_TIMEOUT):
+        return await self.request(PACKET_ID_TOGGLE_BUTTON, b"\x01" if locked else b"\x00", timeout)
+
+    async def set_language(self, lang_code: int, timeout: float = COMMAND_TIMEOUT):
+        return await self.request(PACKET_ID_SET_LANGUAGE, bytes((lang_code,)), timeout)
+
+
+async def open_session(port: str, baudrate: int = BAUD_RATE, name: str = "") -> BpmSession:
+    """
+    Membuka port serial (butuh paket pyserial-asyncio) dan memulai sesi.
+    Port "sim://..." membuka simulator di memori (simulator.py).
+    """
+    from transport import open_streams
+
+    reader, writer = await open_streams(port, baudrate)
+    return BpmSession(reader, writer, name or port).start()
+
+
+# ================= MENU INTERAKTIF =================
+
+async def _print_packets(session):
+    from render import render_packet
+
+    async for packet in session.subscribe(RealtimePressure, MeasurementResult, ErrorReport):
+        print(render_packet(packet))
+
+
+async def interactive(port: str):
+    """
+    Menu seperti new.py, tetapi input() dijalankan di thread terpisah sehingga
+    port tetap dibaca selama menu tampil.
+    """
+    from render import render_packet
+
+    session = await open_session(port)
+    printer = asyncio.get_running_loop().create_task(_print_packets(session))
+
+    menu = (
+        '\nMenu:\n[1] Start, [2] Stop, [3] Get ID, [4] Set ID.\n'
+        '[5] Start Kalibrasi, [6] Set Tkn Aktual, [7] Cancel Kalibrasi.\n'
+        '[8] Kunci Tombol Fisik Alat, [9] Pengaturan Bahasa, [0] Keluar.\nPilih Angka: '
+    )
+    try:
+        while True:
+            choice = (await asyncio.to_thread(input, menu)).strip()
+            try:
+                if choice == '0':
+                    break
+                elif choice == '1':
+                    reply = await session.start_measurement()
+                elif choice == '2':
+                    reply = await session.stop_measurement()
+                elif choice == '3':
+                    reply = await session.get_device_id()
+                elif choice == '4':
+                    new_id = await asyncio.to_thread(input, "Masukkan ID baru (maks 12 karakter): ")
+                    reply = await session.set_device_id(new_id)
+                elif choice == '5':
+                    prefill = int(await asyncio.to_thread(input, "Masukkan target tekanan pre-fill untuk kalibrasi (mmHg): "))
+                    reply = await session.start_calibration(prefill)
+                elif choice == '6':
+                    actual = int(await asyncio.to_thread(input, "Masukkan Set tekanan aktual kalibrasi (mmHg): "))
+                    reply = await session.set_calibration_pressure(actual)
+                elif choice == '7':
+                    reply = await session.cancel_calibration()
+                elif choice == '8':
+                    lock = await asyncio.to_thread(input, "Pengaturan Tombol Fisik Alat -> [0]: Buka, [1]: Blokir: ")
+                    reply = await session.set_button_lock(lock.strip() == '1')
+                elif choice == '9':
+                    lang = await asyncio.to_thread(input, "Pilih Bahasa Modul -> [0]: Mandarin, [1]: Inggris, [2]: Thailand: ")
+                    reply = await session.set_language(int(lang))
+                else:
+                    print("⚠️ Input tidak sesuai.")
+                    continue
+                print(render_packet(reply))
+            except ValueError:
+                print("⚠️ Harap masukkan angka yang valid.")
+            except asyncio.TimeoutError:
+                print("\n⏳ Timeout balasan perangkat.")
+    finally:
+        printer.cancel()
+        await session.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Pemakaian: python session.py <port>")
+        sys.exit(1)
+    try:
+        asyncio.run(interactive(sys.argv[1]))
+    except KeyboardInterrupt:
+        print("\nProgram dihentikan oleh user.")
@@ -0,0 +1,562 @@
+# ==========================================
+# SIMULATOR BPMPRO 2 & TRANSPORT LOOPBACK
+# ==========================================
+#
+# Perangkat tiruan untuk uji beban dan pengembangan tanpa hardware. Simulator
+# menjawab semua perintah yang dikirim fungsi send_* (0x21, 0x20, 0x0E, 0x0F,
+# 0x35-0x37, 0x26, 0x66) plus 0x01, 0x29, 0x2B/0x2C dengan frame ber-CRC
+# benar, mengirim aliran realtime 0x28 dan hasil 0x22 / error 0x25, dan bisa
+# menyisipkan noise, frame terpotong, CRC rusak, balasan sibuk (0x02) serta
+# perintah yang hilang tanpa balasan.
+#
+# Transport yang tersedia:
+# - LoopbackSerial     : pengganti serial.Serial (sinkron, di memori)
+# - open_sim_streams() : pasangan asyncio reader/writer untuk BpmSession
+# - PtyBridge          : pasangan pty Linux, dibuka seperti port serial biasa
+#
+# `speed` mengatur waktu simulasi relatif terhadap waktu nyata (1.0 = real
+# time, 10.0 = 10x lebih cepat, None = secepat mungkin).
+
+import heapq
+import math
+import os
+import random
+import threading
+import time
+
+from framing import FrameDecoder
+from packets import (
+    EXEC_BUSY,
+    EXEC_OK,
+    EXEC_RUNNING,
+    PACKET_ID_CANCEL_CALIBRATION,
+    PACKET_ID_CLEAR_RECORDS,
+    PACKET_ID_ERROR,
+    PACKET_ID_GET_DEVICE_ID,
+    PACKET_ID_HANDSHAKE,
+    PACKET_ID_PRESSURE_OUTPUT,
+    PACKET_ID_REALTIME,
+    PACKET_ID_RESULT,
+    PACKET_ID_SET_CALIBRATION_PRESSURE,
+    PACKET_ID_SET_DEVICE_ID,
+    PACKET_ID_SET_LANGUAGE,
+    PACKET_ID_START,
+    PACKET_ID_START_CALIBRATION,
+    PACKET_ID_STOP,
+    PACKET_ID_STORAGE_COUNT,
+    PACKET_ID_STORED_DATA,
+    PACKET_ID_TOGGLE_BUTTON,
+    EXEC_STATUS_PACKET_IDS,
+    STAGED_PACKET_IDS,
+    encode_device_id,
+    encode_frame,
+)
+from transport import SIM_URL_PREFIX
+
+BAUD_RATE = 19200
+
+SLOW_COMMAND_DELAY = 0.5
+
+ERROR_MANUAL_STOP = 0x0A
+SIM_ERROR_CODES = (0x01, 0x02, 0x04, 0x06, 0x0D)
+
+IDLE_POLL = 0.05
+
+
+class SimulatedBpm:
+    """
+    Inti protokol simulator, tanpa I/O. Waktu simulasi (detik) selalu
+    dimasukkan dari luar lewat `advance(now)`, jadi deterministik untuk tes.
+    """
+
+    def __init__(
+        self,
+        device_id: str = "bpm_sim",
+        realtime_rate: float = 25.0,
+        result=(120, 80, 93, 72),
+        target_pressure: int = 170,
+        end_pressure: int = 40,
+        inflate_rate: float = 20.0,
+        deflate_rate: float = 4.0,
+        error_rate: float = 0.0,
+        auto_interval: float = None,
+        noise: float = 0.0,
+        bad_crc: float = 0.0,
+        truncate: float = 0.0,
+        busy: float = 0.0,
+        drop: float = 0.0,
+        seed=None,
+    ):
+        self.device_id = encode_device_id(device_id)
+        self.realtime_rate = realtime_rate
+        self.result = tuple(result)
+        self.target_pressure = target_pressure
+        self.end_pressure = end_pressure
+        self.inflate_rate = inflate_rate
+        self.deflate_rate = deflate_rate
+        self.error_rate = error_rate
+        self.auto_interval = auto_interval
+        self.noise = noise
+        self.bad_crc = bad_crc
+        self.truncate = truncate
+        self.busy = busy
+        self.drop = drop
+        self.random = random.Random(seed)
+
+        self.now = 0.0
+        self.output = bytearray()
+        self._decoder = FrameDecoder()
+        self._scheduled = []
+        self._seq = 0
+
+        self.realtime_enabled = True
+        self.buttons_locked = False
+        self.language = 0x01
+        self.history = []
+
+        # Pengukuran
+        self._measuring = False
+        self._measure_start = 0.0
+        self._next_sample = 0.0
+        self._will_fail = False
+        self._next_auto = auto_interval if auto_interval else None
+
+        # Kalibrasi
+        self._calibrating = False
+        self._cal_target = 0
+        self._cal_pressure = 0.0
+        self.calibration_points = []
+
+        self.frames_sent = 0
+        self.commands_received = 0
+
+    # ================= OUTPUT =================
+
+    def _emit(self, frame: bytes):
+        rnd = self.random
+        if self.noise and rnd.random() < self.noise:
+            self.output += bytes(rnd.randrange(256) for _ in range(rnd.randint(1, 8)))
+        if self.bad_crc and rnd.random() < self.bad_crc:
+            frame = frame[:-1] + bytes((frame[-1] ^ 0xFF,))
+        if self.truncate and rnd.random() < self.truncate:
+            frame = frame[:rnd.randint(1, len(frame) - 1)]
+        self.output += frame
+        self.frames_sent += 1
+
+    def _schedule(self, at: float, frame: bytes):
+        self._seq += 1
+        heapq.heappush(self._scheduled, (at, self._seq, frame))
+
+    def _status(self, packet_id: int, status: int = EXEC_OK, extra=b""):
+        self._emit(encode_frame(packet_id, bytes((status,)) + extra))
+
+    def read_output(self) -> bytes:
+        data = bytes(self.output)
+        self.output.clear()
+        return data
+
+    # ================= PERINTAH =================
+
+    def receive(self, data):
+        """Byte dari host (perintah). Balasan masuk ke `output`."""
+        self._decoder.feed(data)
+        for frame in self._decoder.frames():
+            self.commands_received += 1
+            self._handle(frame[2], bytes(frame[4:-2]))
+
+    def _handle(self, packet_id: int, data: bytes):
+        rnd = self.random
+        if self.drop and rnd.random() < self.drop:
+            # Perintah hilang di jalan, tidak ada balasan
+            return
+        if self.busy and packet_id in EXEC_STATUS_PACKET_IDS and rnd.random() < self.busy:
+            self._status(packet_id, EXEC_BUSY)
+            return
+
+        if packet_id == PACKET_ID_START:
+            self._status(packet_id)
+            self._begin_measurement()
+        elif packet_id == PACKET_ID_STOP:
+            was_measuring = self._measuring
+            self._measuring = False
+            # Status + penanda deflasi
+            self._status(packet_id, EXEC_OK, b"\x01")
+            if was_measuring:
+                self._emit(encode_frame(PACKET_ID_ERROR, bytes((ERROR_MANUAL_STOP,))))
+        elif packet_id == PACKET_ID_SET_DEVICE_ID:
+            self.device_id = data[:12].ljust(12, b"\x00")
+            self._status(packet_id)
+        elif packet_id == PACKET_ID_GET_DEVICE_ID:
+            self._emit(encode_frame(packet_id, self.device_id))
+        elif packet_id == PACKET_ID_START_CALIBRATION:
+            self._calibrating = True
+            self._cal_target = int.from_bytes(data[:2], "big")
+            self._next_sample = self.now
+            self._status(packet_id)
+        elif packet_id == PACKET_ID_SET_CALIBRATION_PRESSURE:
+            self.calibration_points.append((self._cal_target, int.from_bytes(data[:2], "big")))
+            self._status(packet_id)
+        elif packet_id == PACKET_ID_CANCEL_CALIBRATION:
+            self._calibrating = False
+            self._cal_target = 0
+            self._status(packet_id)
+        elif packet_id == PACKET_ID_TOGGLE_BUTTON:
+            self.buttons_locked = data[:1] == b"\x01"
+            self._status(packet_id)
+        elif packet_id == PACKET_ID_SET_LANGUAGE:
+            self.language = data[0] if data else 0
+            self._status(packet_id)
+        elif packet_id == PACKET_ID_HANDSHAKE:
+            self._status(packet_id)
+        elif packet_id == PACKET_ID_PRESSURE_OUTPUT:
+            self.realtime_enabled = data[:1] != b"\x01"
+            self._status(packet_id)
+        elif packet_id == PACKET_ID_STORAGE_COUNT:
+            self._emit(encode_frame(packet_id, len(self.history).to_bytes(2, "big")))
+        elif packet_id == PACKET_ID_STORED_DATA:
+            index = int.from_bytes(data[:2], "big")
+            if index < len(self.history):
+                self._emit(encode_frame(packet_id, self.history[index]))
+        elif packet_id in STAGED_PACKET_IDS:
+            self._status(packet_id, EXEC_RUNNING)
+            if packet_id == PACKET_ID_CLEAR_RECORDS:
+                self.history.clear()
+            self._schedule(self.now + SLOW_COMMAND_DELAY, encode_frame(packet_id, bytes((EXEC_OK,))))
+
+    # ================= PENGUKURAN =================
+
+    def _begin_measurement(self):
+        self._measuring = True
+        self._measure_start = self.now
+        self._next_sample = self.now
+        self._will_fail = self.random.random() < self.error_rate
+
+    def _inflate_time(self) -> float:
+        return self.target_pressure / self.inflate_rate
+
+    def _measurement_duration(self) -> float:
+        return self._inflate_time() + (self.target_pressure - self.end_pressure) / self.deflate_rate
+
+    def pressure_at(self, t: float) -> int:
+        """Tekanan manset `t` detik sejak Start: inflasi linier lalu deflasi berosilasi."""
+        inflate = self._inflate_time()
+        if t < inflate:
+            return int(self.inflate_rate * t)
+        base = self.target_pressure - self.deflate_rate * (t - inflate)
+        mean = self.result[2]
+        amp = 3.0 * math.exp(-((base - mean) / 20.0) ** 2)
+        return max(0, int(base + amp * math.sin(2 * math.pi * 1.2 * t)))
+
+    def _result_payload(self) -> bytes:
+        sys_, dia, mean, hr = self.result
+        lt = time.localtime()
+        return (
+            sys_.to_bytes(2, "big") + dia.to_bytes(2, "big")
+            + mean.to_bytes(2, "big") + hr.to_bytes(2, "big")
+            + lt.tm_year.to_bytes(2, "big")
+            + bytes((lt.tm_mon, lt.tm_mday, lt.tm_hour, lt.tm_min))
+        )
+
+    def _finish_measurement(self):
+        self._measuring = False
+        if self._will_fail:
+            code = self.random.choice(SIM_ERROR_CODES)
+            self._emit(encode_frame(PACKET_ID_ERROR, bytes((code,))))
+        else:
+            payload = self._result_payload()
+            self.history.append(payload)
+            self._emit(encode_frame(PACKET_ID_RESULT, payload))
+        if self.auto_interval:
+            self._next_auto = self.now + self.auto_interval
+
+    def _sample_period(self) -> float:
+        return 1.0 / self.realtime_rate
+
+    def next_event_time(self):
+        """Waktu simulasi event berikutnya, atau None bila diam."""
+        times = []
+        if self._measuring or self._calibrating:
+            times.append(self._next_sample)
+        if self._scheduled:
+            times.append(self._scheduled[0][0])
+        if self._next_auto is not None and not self._measuring:
+            times.append(self._next_auto)
+        return min(times) if times else None
+
+    def advance(self, now: float):
+        """Menjalankan simulasi sampai waktu `now`."""
+        period = self._sample_period()
+        while True:
+            event = self.next_event_time()
+            if event is None or event > now:
+                break
+            self.now = event
+
+            while self._scheduled and self._scheduled[0][0] <= event:
+                self._emit(heapq.heappop(self._scheduled)[2])
+
+            if self._next_auto is not None and not self._measuring and self._next_auto <= event:
+                self._next_auto = None
+                self._begin_measurement()
+
+            if self._measuring and self._next_sample <= event:
+                t = event - self._measure_start
+                if t >= self._measurement_duration():
+                    self._finish_measurement()
+                else:
+                    if self.realtime_enabled:
+                        self._emit(encode_frame(PACKET_ID_REALTIME, self.pressure_at(t).to_bytes(2, "big")))
+                    self._next_sample += period
+
+            if self._calibrating and not self._measuring and self._next_sample <= event:
+                # Tekanan mendekati target pre-fill secara eksponensial lalu ditahan
+                self._cal_pressure += (self._cal_target - self._cal_pressure) * 0.2
+                if self.realtime_enabled:
+                    self._emit(encode_frame(PACKET_ID_REALTIME, int(round(self._cal_pressure)).to_bytes(2, "big")))
+                self._next_sample += period
+        self.now = max(self.now, now)
+
+
+# ================= JAM SIMULASI =================
+
+class _SimClock:
+    """Memetakan waktu nyata ke waktu simulasi sesuai `speed`."""
+
+    def __init__(self, sim: SimulatedBpm, speed):
+        self.sim = sim
+        self.speed = speed
+        self._t0 = time.monotonic()
+        self._s0 = sim.now
+
+    def sim_now(self) -> float:
+        return self._s0 + (time.monotonic() - self._t0) * self.speed
+
+    def step(self):
+        """Memajukan simulasi. Mengembalikan jeda nyata sampai event berikutnya."""
+        sim = self.sim
+        if self.speed is None:
+            event = sim.next_event_time()
+            if event is not None:
+                sim.advance(event)
+            return 0.0 if event is not None else IDLE_POLL
+        sim.advance(self.sim_now())
+        event = sim.next_event_time()
+        if event is None:
+            return IDLE_POLL
+        return max(0.0, (event - self.sim_now()) / self.speed)
+
+
+# ================= TRANSPORT SINKRON =================
+
+class LoopbackSerial:
+    """
+    Objek dengan API serial.Serial yang dipakai new.py / bp.py / FrameDecoder:
+    read(), write(), in_waiting, reset_input_buffer(), close().
+    """
+
+    def __init__(self, sim: SimulatedBpm = None, port: str = "sim://", baudrate: int = BAUD_RATE,
+                 timeout: float = 1, speed=1.0):
+        self.sim = sim or SimulatedBpm()
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.is_open = True
+        self._clock = _SimClock(self.sim, speed)
+        self._buf = bytearray()
+        self.bytes_written = 0
+        self.bytes_read = 0
+
+    def _pull(self):
+        self._clock.step()
+        if self.sim.output:
+            self._buf += self.sim.read_output()
+
+    @property
+    def in_waiting(self) -> int:
+        self._pull()
+        return len(self._buf)
+
+    def read(self, size: int = 1) -> bytes:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            self._pull()
+            if self._buf:
+                break
+            delay = self._clock.step()
+            if self._clock.speed is None and delay == 0.0:
+                continue
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return b""
+                delay = min(delay, remaining)
+            time.sleep(delay)
+        data = bytes(self._buf[:size])
+        del self._buf[:size]
+        self.bytes_read += len(data)
+        return data
+
+    def write(self, data) -> int:
+        self._clock.step()
+        self.sim.receive(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def reset_input_buffer(self):
+        self._pull()
+        self._buf.clear()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+# ================= TRANSPORT ASYNCIO =================
+
+class _SimWriter:
+    def __init__(self, bridge):
+        self._bridge = bridge
+
+    def write(self, data):
+        self._bridge.sim.receive(data)
+        self._bridge.wake()
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self._bridge.close()
+
+    def is_closing(self):
+        return self._bridge.closed
+
+
+class _AsyncBridge:
+    def __init__(self, sim, speed):
+        import asyncio
+
+        self.sim = sim
+        self.reader = asyncio.StreamReader()
+        self.clock = _SimClock(sim, speed)
+        self._wake = asyncio.Event()
+        self.closed = False
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def wake(self):
+        self._wake.set()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._task.cancel()
+            self.reader.feed_eof()
+
+    async def _run(self):
+        import asyncio
+
+        while True:
+            delay = self.clock.step()
+            if self.sim.output:
+                self.reader.feed_data(self.sim.read_output())
+            self._wake.clear()
+            if delay == 0.0:
+                # Mode secepat mungkin: beri kesempatan task lain berjalan
+                await asyncio.sleep(0)
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def open_sim_streams(sim: SimulatedBpm = None, speed=1.0):
+    """Pasangan (reader, writer) asyncio yang terhubung ke simulator."""
+    bridge = _AsyncBridge(sim or SimulatedBpm(), speed)
+    return bridge.reader, _SimWriter(bridge)
+
+
+# ================= TRANSPORT PTY =================
+
+class PtyBridge:
+    """
+    Menjalankan simulator di sisi master sebuah pty (Linux/macOS). Sisi slave
+    (`port`) bisa dibuka oleh serial.Serial / pyserial-asyncio / new.py.
+    """
+
+    def __init__(self, sim: SimulatedBpm = None, speed=1.0):
+        import tty
+
+        self.sim = sim or SimulatedBpm()
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._clock = _SimClock(self.sim, speed)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        import select
+
+        while not self._stop.is_set():
+            delay = self._clock.step()
+            if self.sim.output:
+                os.write(self._master, self.sim.read_output())
+            ready, _, _ = select.select([self._master], [], [], min(delay, IDLE_POLL))
+            if ready:
+                try:
+                    data = os.read(self._master, 4096)
+                except OSError:
+                    break
+                self.sim.receive(data)
+
+    def close(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(1)
+        os.close(self._master)
+        os.close(self._slave)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ================= URL sim:// =================
+
+_FLOAT_OPTIONS = (
+    "realtime_rate", "inflate_rate", "deflate_rate", "error_rate",
+    "auto_interval", "noise", "bad_crc", "truncate", "busy", "drop",
+)
+_INT_OPTIONS = ("target_pressure", "end_pressure", "seed")
+
+
+def parse_sim_url(url: str):
+    """
+    `sim://<nama>?noise=0.01&speed=10&auto_interval=5`
+    Mengembalikan (SimulatedBpm, speed). speed=max berarti secepat mungkin.
+    """
+    rest = url[len(SIM_URL_PREFIX):]
+    name, _, query = rest.partition("?")
+    options = {}
+    speed = 1.0
+    for item in filter(None, query.split("&")):
+        key, _, value = item.partition("=")
+        if key == "speed":
+            speed = None if value == "max" else float(value)
+        elif key in _FLOAT_OPTIONS:
+            options[key] = float(value)
+        elif key in _INT_OPTIONS:
+            options[key] = int(value)
+        elif key == "result":
+            options[key] = tuple(int(v) for v in value.split(","))
+        else:
+            raise ValueError(f"Opsi simulator tidak dikenal: {key}")
+    return SimulatedBpm(device_id=name or "bpm_sim", **options), speed
@@ -0,0 +1,283 @@
+# ==========================================
+# PENYIMPANAN HASIL PENGUKURAN (APPEND-ONLY)
+# ==========================================
+#
+# Hasil 0x22 dan error 0x25 disimpan sebagai record biner lebar tetap di
+# `records.bin`. File hanya pernah ditambah di ujung (kecuali saat kompaksi),
+# dibaca lewat mmap, dan diindeks di memori per waktu dan per perangkat
+# sehingga query rentang waktu tidak perlu memindai seluruh log.
+#
+# Struktur direktori:
+#     records.bin   record 32 byte per hasil/error
+#     devices.txt   tabel tag perangkat, nomor baris = device index
+
+import mmap
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import NamedTuple
+
+from packets import ErrorReport, MeasurementResult
+
+RECORDS_FILE = "records.bin"
+DEVICES_FILE = "devices.txt"
+
+KIND_RESULT = 0
+KIND_ERROR = 1
+
+# timestamp(d) device(I) kind(B) error_code(B) sys/dia/mean/hr(4H) year(H)
+# month/day/hour/minute(4B) + 4 byte cadangan = 32 byte
+RECORD = struct.Struct("<dIBB4HH4B4x")
+RECORD_SIZE = RECORD.size
+
+COMPACT_EVERY = 100_000
+
+
+class StoredRecord(NamedTuple):
+    timestamp: float
+    device: str
+    kind: int
+    error_code: int
+    systolic: int
+    diastolic: int
+    mean: int
+    heart_rate: int
+    year: int
+    month: int
+    day: int
+    hour: int
+    minute: int
+
+    def to_packet(self):
+        """Mengembalikan record paket asal (MeasurementResult / ErrorReport)."""
+        if self.kind == KIND_ERROR:
+            return ErrorReport(self.error_code)
+        return MeasurementResult(*self[4:])
+
+
+class MeasurementStore:
+    """
+        store = MeasurementStore("bpm_data")
+        store.append("bpm_10c4ea60", result)
+        for rec in store.query(device="bpm_10c4ea60", start=time.time() - 7 * 86400):
+            ...
+
+    Timestamp adalah waktu host saat record disimpan dan dijaga monoton naik
+    (jam mundur akan di-clamp) supaya indeks bisa dicari dengan bisect.
+    Hanya satu penulis per direktori.
+    """
+
+    def __init__(self, path: str, retention_seconds: float = None, compact_every: int = COMPACT_EVERY):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self.compact_every = compact_every
+        os.makedirs(path, exist_ok=True)
+
+        self._records_path = os.path.join(path, RECORDS_FILE)
+        self._devices_path = os.path.join(path, DEVICES_FILE)
+
+        self._devices = []
+        self._device_index = {}
+        self._load_devices()
+
+        self._file = None
+        self._mm = None
+        self._mapped = 0
+        self._appends_since_compact = 0
+        self._open_log()
+
+    # ================= TABEL PERANGKAT =================
+
+    def _load_devices(self):
+        if not os.path.exists(self._devices_path):
+            return
+        with open(self._devices_path, "r", encoding="utf-8") as f:
+            for line in f:
+                self._register_device(line.rstrip("\n"))
+
+    def _register_device(self, tag: str) -> int:
+        idx = len(self._devices)
+        self._devices.append(tag)
+        self._device_index[tag] = idx
+        return idx
+
+    def _device_id(self, tag: str) -> int:
+        idx = self._device_index.get(tag)
+        if idx is None:
+            idx = self._register_device(tag)
+            with open(self._devices_path, "a", encoding="utf-8") as f:
+                f.write(tag + "\n")
+        return idx
+
+    @property
+    def devices(self):
+        return list(self._devices)
+
+    # ================= LOG & INDEKS =================
+
+    def _open_log(self):
+        self._file = open(self._records_path, "ab")
+
+        # Buang sisa record yang terpotong (misalnya listrik mati saat menulis)
+        size = os.path.getsize(self._records_path)
+        if size % RECORD_SIZE:
+            self._file.truncate(size - size % RECORD_SIZE)
+
+        self._build_index()
+
+    def _build_index(self):
+        self._timestamps = array("d")
+        self._by_device = {}
+        self._remap()
+        if self._mapped:
+            for offset, (ts, dev) in enumerate(_iter_ts_device(self._mm, self._mapped)):
+                self._index(offset, ts, dev)
+
+    def _index(self, position: int, ts: float, device: int):
+        self._timestamps.append(ts)
+        entry = self._by_device.get(device)
+        if entry is None:
+            entry = self._by_device[device] = (array("I"), array("d"))
+        entry[0].append(position)
+        entry[1].append(ts)
+
+    def _remap(self):
+        self._file.flush()
+        size = os.path.getsize(self._records_path)
+        if size == self._mapped and self._mm is not None:
+            return
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._mapped = size
+        if size:
+            with open(self._records_path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    # ================= TULIS =================
+
+    def append(self, device: str, packet, timestamp: float = None):
+        """Menyimpan satu MeasurementResult atau ErrorReport. Tipe lain diabaikan."""
+        if type(packet) is MeasurementResult:
+            kind, error_code, values = KIND_RESULT, 0, packet
+        elif type(packet) is ErrorReport:
+            kind, error_code, values = KIND_ERROR, packet.code, (0,) * 9
+        else:
+            return False
+
+        ts = time.time() if timestamp is None else timestamp
+        if self._timestamps and ts < self._timestamps[-1]:
+            ts = self._timestamps[-1]
+
+        dev = self._device_id(device)
+        self._file.write(RECORD.pack(ts, dev, kind, error_code, *values))
+        self._index(len(self._timestamps), ts, dev)
+
+        self._appends_since_compact += 1
+        if self.retention_seconds is not None and self._appends_since_compact >= self.compact_every:
+            self.compact()
+        return True
+
+    def record(self, item):
+        """Menyimpan TaggedPacket dari DeviceManager.stream()."""
+        return self.append(item.device, item.packet, item.timestamp)
+
+    def flush(self):
+        self._file.flush()
+
+    # ================= BACA =================
+
+    def _read(self, position: int) -> StoredRecord:
+        fields = RECORD.unpack_from(self._mm, position * RECORD_SIZE)
+        return StoredRecord(fields[0], self._devices[fields[1]], *fields[2:])
+
+    def query(self, device: str = None, start: float = None, end: float = None, kind: int = None):
+        """
+        Record dengan start <= timestamp <= end (batas opsional), urut waktu.
+        Dengan `device`, hanya indeks perangkat itu yang dicari.
+        """
+        self._remap()
+
+        if device is not None:
+            dev = self._device_index.get(device)
+            if dev is None or dev not in self._by_device:
+                return
+            positions, timestamps = self._by_device[dev]
+        else:
+            positions, timestamps = None, self._timestamps
+
+        lo = 0 if start is None else bisect_left(timestamps, start)
+        hi = len(timestamps) if end is None else bisect_right(timestamps, end)
+
+        for i in range(lo, hi):
+            rec = self._read(positions[i] if positions is not None else i)
+            if kind is None or rec.kind == kind:
+                yield rec
+
+    def latest(self, device: str):
+        """Record terakhir satu perangkat, atau None."""
+        self._remap()
+        dev = self._device_index.get(device)
+        if dev is None or dev not in self._by_device:
+            return None
+        return self._read(self._by_device[dev][0][-1])
+
+    # ================= KOMPAKSI =================
+
+    def compact(self, before: float = None):
+        """
+        Menulis ulang log tanpa record yang lebih tua dari `before` (default:
+        sekarang - retention_seconds). File diganti secara atomik.
+        """
+        self._appends_since_compact = 0
+        if before is None:
+            if self.retention_seconds is None:
+                return 0
+            before = time.time() - self.retention_seconds
+
+        self._remap()
+        cut = bisect_left(self._timestamps, before)
+        if not cut:
+            return 0
+
+        tmp_path = self._records_path + ".compact"
+        with open(tmp_path, "wb") as out:
+            if self._mapped:
+                out.write(self._mm[cut * RECORD_SIZE:self._mapped])
+            out.flush()
+            os.fsync(out.fileno())
+
+        self._file.close()
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._mapped = 0
+        os.replace(tmp_path, self._records_path)
+        self._open_log()
+        return cut
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _iter_ts_device(buf, size: int):
+    """Hanya timestamp dan device index, untuk membangun indeks saat dibuka."""
+    head = struct.Struct("<dI")
+    for offset in range(0, size, RECORD_SIZE):
+        yield head.unpack_from(buf, offset)
@@ -0,0 +1,308 @@
+# ==========================================
+# LOGGING TERSTRUKTUR + METRIK (PROMETHEUS)
+# ==========================================
+#
+# Logging: semua modul memakai logger `bpmpro.*`. `setup_logging()` memasang
+# QueueHandler, jadi thread pembaca port hanya menaruh record ke antrian;
+# penulisan ke terminal/file dilakukan thread QueueListener. Hex dump frame
+# memakai `HexDump` yang baru diformat bila level DEBUG aktif:
+#
+#     log.debug("RX %s", HexDump(frame))
+#
+# Metrik: `MetricsRegistry` berisi DeviceMetrics per alat. Penghitung frame,
+# byte, CRC salah, resync (FrameDecoder) dan latensi perintah (Correlator)
+# tidak disalin per frame, tetapi dibaca dari objek aslinya saat di-scrape.
+# Per paket hanya ada satu penambahan counter tipe paket (dan kode error
+# 0x25). `render()` menghasilkan format teks Prometheus; frame/s dan byte/s
+# dihitung Prometheus dengan rate(), atau lewat `snapshot()` untuk /stats.
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+from correlation import LATENCY_BUCKETS
+from packets import ErrorReport
+from render import PACKET_TYPE_NAMES, error_text
+
+LOGGER_NAME = "bpmpro"
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+
+def get_logger(name: str = None) -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_NAME}.{name}" if name else LOGGER_NAME)
+
+
+class HexDump:
+    """Argumen log yang baru diubah ke hex saat record benar-benar diformat."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return bytes(self.data).hex().upper()
+
+
+# Atribut bawaan LogRecord; sisanya (dari `extra=`) ikut ke output JSON
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Satu objek JSON per baris: ts, level, logger, msg, plus field `extra=`."""
+
+    def format(self, record) -> str:
+        data = {
+            "ts": record.created,
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+def setup_logging(level="INFO", json_format: bool = False, stream=None, path: str = None,
+                  fmt: str = TEXT_FORMAT):
+    """
+    Memasang QueueHandler pada logger `bpmpro`. Mengembalikan QueueListener
+    yang sudah berjalan; panggil `.stop()` saat keluar untuk menguras antrian.
+    """
+    import atexit
+
+    if path:
+        handler = logging.FileHandler(path, encoding="utf-8")
+    else:
+        handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(fmt))
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=False)
+
+    logger = get_logger()
+    for old in list(logger.handlers):
+        logger.removeHandler(old)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+# ================= METRIK =================
+
+DECODER_COUNTERS = (
+    ("frames", "frames_ok", "Frame valid (CRC benar)"),
+    ("bytes", "bytes_in", "Byte mentah yang diterima dari port"),
+    ("crc_errors", "crc_errors", "Frame dengan CRC salah"),
+    ("crc_little_endian", "crc_little_endian", "Frame valid dengan CRC little-endian"),
+    ("length_errors", "length_errors", "Field length tidak valid"),
+    ("resyncs", "resyncs", "Pencarian ulang byte awal 0x5A"),
+    ("dropped_bytes", "dropped_bytes", "Byte yang dibuang saat resync"),
+)
+
+
+class _Latency:
+    """Akumulasi LatencyStats dari koneksi yang sudah ditutup."""
+
+    __slots__ = ("count", "total", "buckets", "retransmits", "timeouts")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.retransmits = 0
+        self.timeouts = 0
+
+    def add(self, stats):
+        self.count += stats.count
+        self.total += stats.total
+        for i, n in enumerate(stats.buckets):
+            self.buckets[i] += n
+        self.retransmits += stats.retransmits
+        self.timeouts += stats.timeouts
+
+
+class DeviceMetrics:
+    """
+    Metrik satu alat. `attach()` dipanggil setiap kali koneksi (decoder dan
+    correlator) baru dibuat; angka koneksi lama tetap dijumlahkan.
+    """
+
+    __slots__ = ("device", "decoder", "correlator", "packets", "errors", "_base", "_latency", "_last")
+
+    def __init__(self, device: str):
+        self.device = device
+        self.decoder = None
+        self.correlator = None
+        self.packets = {}
+        self.errors = {}
+        self._base = dict.fromkeys((name for name, _, _ in DECODER_COUNTERS), 0)
+        self._latency = {}
+        self._last = None
+
+    def attach(self, decoder=None, correlator=None):
+        self._fold()
+        self.decoder = decoder
+        self.correlator = correlator
+        return self
+
+    def _fold(self):
+        if self.decoder is not None:
+            for name, attr, _ in DECODER_COUNTERS:
+                self._base[name] += getattr(self.decoder, attr)
+        if self.correlator is not None:
+            for packet_id, stats in self.correlator.latency.items():
+                self._latency.setdefault(packet_id, _Latency()).add(stats)
+        self.decoder = self.correlator = None
+
+    def on_packet(self, packet):
+        """Satu record yang diterima (dipanggil dari jalur baca)."""
+        packet_type = type(packet)
+        name = PACKET_TYPE_NAMES[packet_type]
+        self.packets[name] = self.packets.get(name, 0) + 1
+        if packet_type is ErrorReport:
+            self.errors[packet.code] = self.errors.get(packet.code, 0) + 1
+
+    # ----- baca -----
+
+    def counters(self) -> dict:
+        totals = dict(self._base)
+        if self.decoder is not None:
+            for name, attr, _ in DECODER_COUNTERS:
+                totals[name] += getattr(self.decoder, attr)
+        return totals
+
+    def latency(self) -> dict:
+        """{packet_id: _Latency} gabungan koneksi lama dan sekarang."""
+        merged = {}
+        for packet_id, stats in self._latency.items():
+            merged.setdefault(packet_id, _Latency()).add(stats)
+        if self.correlator is not None:
+            for packet_id, stats in self.correlator.latency.items():
+                merged.setdefault(packet_id, _Latency()).add(stats)
+        return merged
+
+    def snapshot(self) -> dict:
+        """Counter + laju frame/s dan byte/s sejak snapshot sebelumnya."""
+        now = time.monotonic()
+        counters = self.counters()
+        data = dict(counters)
+        if self._last is not None and now > self._last[0]:
+            elapsed = now - self._last[0]
+            data["frames_per_s"] = (counters["frames"] - self._last[1]) / elapsed
+            data["bytes_per_s"] = (counters["bytes"] - self._last[2]) / elapsed
+        self._last = (now, counters["frames"], counters["bytes"])
+        data["packets"] = dict(self.packets)
+        data["errors"] = {error_text(code): n for code, n in self.errors.items()}
+        data["latency"] = {
+            _command_name(packet_id): {
+                "count": lat.count,
+                "mean": lat.total / lat.count if lat.count else None,
+                "retransmits": lat.retransmits,
+                "timeouts": lat.timeouts,
+            }
+            for packet_id, lat in sorted(self.latency().items())
+        }
+        return data
+
+
+def _command_name(packet_id: int) -> str:
+    from commands import COMMANDS_BY_ID
+
+    command = COMMANDS_BY_ID.get(packet_id)
+    return command.name if command else f"0x{packet_id:02X}"
+
+
+def _label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_label_value(v)}"' for k, v in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """Kumpulan DeviceMetrics, diekspor sebagai teks Prometheus."""
+
+    def __init__(self, prefix: str = "bpm"):
+        self.prefix = prefix
+        self.devices = {}
+
+    def device(self, name: str) -> DeviceMetrics:
+        metrics = self.devices.get(name)
+        if metrics is None:
+            metrics = self.devices[name] = DeviceMetrics(name)
+        return metrics
+
+    def snapshot(self) -> dict:
+        return {name: m.snapshot() for name, m in self.devices.items()}
+
+    def render(self) -> str:
+        p = self.prefix
+        devices = sorted(self.devices.items())
+        lines = []
+
+        def header(name, kind, text):
+            lines.append(f"# HELP {p}_{name} {text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+
+        counters = {name: m.counters() for name, m in devices}
+        for name, _, text in DECODER_COUNTERS:
+            header(f"{name}_total", "counter", text)
+            for device, _ in devices:
+                lines.append(f"{p}_{name}_total{_labels(device=device)} {counters[device][name]}")
+
+        header("packets_total", "counter", "Record paket per tipe")
+        for device, m in devices:
+            for packet_type, n in sorted(m.packets.items()):
+                lines.append(f"{p}_packets_total{_labels(device=device, type=packet_type)} {n}")
+
+        header("device_errors_total", "counter", "Laporan error 0x25 per kode")
+        for device, m in devices:
+            for code, n in sorted(m.errors.items()):
+                labels = _labels(device=device, code=f"0x{code:02X}", message=error_text(code))
+                lines.append(f"{p}_device_errors_total{labels} {n}")
+
+        latencies = {device: m.latency() for device, m in devices}
+        header("command_latency_seconds", "histogram", "Latensi kirim pertama -> balasan final")
+        for device, _ in devices:
+            for packet_id, lat in sorted(latencies[device].items()):
+                command = _command_name(packet_id)
+                cumulative = 0
+                for bound, n in zip((*LATENCY_BUCKETS, "+Inf"), lat.buckets):
+                    cumulative += n
+                    labels = _labels(device=device, command=command, le=bound)
+                    lines.append(f"{p}_command_latency_seconds_bucket{labels} {cumulative}")
+                labels = _labels(device=device, command=command)
+                lines.append(f"{p}_command_latency_seconds_sum{labels} {lat.total}")
+                lines.append(f"{p}_command_latency_seconds_count{labels} {lat.count}")
+
+        for name, attr, text in (("command_retransmits_total", "retransmits", "Pengiriman ulang perintah"),
+                                 ("command_timeouts_total", "timeouts", "Perintah tanpa balasan final")):
+            header(name, "counter", text)
+            for device, _ in devices:
+                for packet_id, lat in sorted(latencies[device].items()):
+                    labels = _labels(device=device, command=_command_name(packet_id))
+                    lines.append(f"{p}_{name}{labels} {getattr(lat, attr)}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Tulis atomik (untuk textfile collector node_exporter)."""
+        import os
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
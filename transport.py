@@ -0,0 +1,35 @@
+# ==========================================
+# PEMILIH TRANSPORT (SERIAL ASLI / SIMULATOR)
+# ==========================================
+#
+# Semua kode yang membuka port memanggil fungsi di sini, bukan serial.Serial
+# langsung. Port berawalan "sim://" dibuka ke simulator.py (lihat
+# parse_sim_url untuk opsinya), selain itu ke pyserial seperti biasa.
+
+SIM_URL_PREFIX = "sim://"
+
+
+def open_serial(port: str, baudrate: int, timeout: float = 1):
+    """Objek bergaya serial.Serial (read / write / in_waiting)."""
+    if port.startswith(SIM_URL_PREFIX):
+        from simulator import LoopbackSerial, parse_sim_url
+
+        sim, speed = parse_sim_url(port)
+        return LoopbackSerial(sim, port, baudrate, timeout, speed)
+
+    import serial
+
+    return serial.Serial(port, baudrate, timeout=timeout)
+
+
+async def open_streams(port: str, baudrate: int):
+    """Pasangan asyncio (reader, writer) untuk BpmSession."""
+    if port.startswith(SIM_URL_PREFIX):
+        from simulator import open_sim_streams, parse_sim_url
+
+        sim, speed = parse_sim_url(port)
+        return await open_sim_streams(sim, speed)
+
+    import serial_asyncio
+
+    return await serial_asyncio.open_serial_connection(url=port, baudrate=baudrate)
@@ -2,24 +2,7 @@
 # CRC16 MODBUS VALIDATOR (AUTO ENDIAN CHECK)
 # ==========================================
 
-def crc16_modbus(data: bytes):
-    """
-    CRC-16 MODBUS
-    Polynomial : 0xA001
-    Init value : 0xFFFF
-    """
-    crc = 0xFFFF
-
-    for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x0001:
-                crc >>= 1
-                crc ^= 0xA001
-            else:
-                crc >>= 1
-
-    return crc & 0xFFFF
+from crc16 import crc16_modbus
 
 
 def validate_crc(hex_string: str):
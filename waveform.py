@@ -0,0 +1,333 @@
+# ==========================================
+# REKAM KURVA TEKANAN MANSET (0x28)
+# ==========================================
+#
+# Semua sampel realtime disimpan (tidak di-throttle 0,5 detik seperti tampilan
+# di new.py) bersama timestamp monotonic di buffer cincin yang dialokasikan
+# sekali: array('H') + array('d'), atau array NumPy bila tersedia.
+#
+# Satu kurva = sampel realtime dari awal inflasi sampai hasil 0x22 / error
+# 0x25 (atau tidak ada sampel selama REALTIME_TIMEOUT). Sampel satu kurva
+# selalu bersebelahan di buffer, jadi `Curve.pressures` dan
+# `Curve.timestamps` adalah view tanpa salinan.
+
+import os
+import struct
+import time
+from array import array
+from numbers import Integral
+from typing import Any, NamedTuple
+
+from packets import ErrorReport, MeasurementResult, RealtimePressure
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+REALTIME_TIMEOUT = 5
+DEFAULT_CAPACITY = 1 << 16
+
+# magic, versi, jumlah sampel, waktu mulai (epoch), kode hasil
+CURVE_HEADER = struct.Struct("<4sHIdh")
+# Versi 2: header diikuti panjang tag alat (uint16) + tag UTF-8 apa adanya,
+# karena nama file hanya memuat versi tag yang sudah di-escape
+CURVE_TAG_LENGTH = struct.Struct("<H")
+CURVE_MAGIC = b"BPWF"
+CURVE_VERSION = 2
+CURVE_SUFFIX = ".bpwf"
+
+OUTCOME_NONE = -1
+OUTCOME_RESULT = 0
+
+
+class Curve(NamedTuple):
+    device: str
+    seq: int
+    started_at: float
+    timestamps: Any
+    pressures: Any
+    outcome: Any
+
+    @property
+    def samples(self) -> int:
+        return len(self.pressures)
+
+    @property
+    def duration(self) -> float:
+        if not len(self.timestamps):
+            return 0.0
+        return self.timestamps[-1] - self.timestamps[0]
+
+
+def _alloc(capacity: int):
+    if numpy is not None:
+        return numpy.zeros(capacity, dtype=numpy.uint16), numpy.zeros(capacity, dtype=numpy.float64)
+    return array("H", bytes(2 * capacity)), array("d", bytes(8 * capacity))
+
+
+def _view(buf, start: int, end: int):
+    if numpy is not None:
+        return buf[start:end]
+    return memoryview(buf)[start:end]
+
+
+class WaveformCapture:
+    """
+    Perekam kurva untuk satu perangkat. Dipasang sebagai listener sesi:
+
+        capture = WaveformCapture("bpm_01", save_dir="curves")
+        session.add_listener(capture.on_packet)
+
+    View dari kurva lama tetap valid sampai area buffernya ditimpa oleh
+    sampel baru (`is_valid()`); simpan ke disk atau salin bila perlu lebih lama.
+    """
+
+    def __init__(self, device: str = "", capacity: int = DEFAULT_CAPACITY, save_dir: str = None,
+                 realtime_timeout: float = REALTIME_TIMEOUT, on_curve=None):
+        self.device = device
+        self.capacity = capacity
+        self.save_dir = save_dir
+        self.realtime_timeout = realtime_timeout
+        self.on_curve = on_curve
+        self._pressures, self._timestamps = _alloc(capacity)
+
+        self._head = 0
+        self._curve_start = None
+        self._curve_wall = 0.0
+        self._last_sample = 0.0
+        self._seq = 0
+        # Kurva selesai yang datanya masih ada di buffer: seq -> (start, end)
+        self._live = {}
+
+        self.samples = 0
+        self.overwritten_samples = 0
+        self.curves = 0
+
+        if save_dir:
+            os.makedirs(save_dir, exist_ok=True)
+
+    # ================= TULIS =================
+
+    def _evict(self, start: int, end: int):
+        for seq, (a, b) in list(self._live.items()):
+            if a < end and start < b:
+                del self._live[seq]
+
+    def _make_room(self):
+        """Buffer habis di tengah kurva: geser kurva aktif ke awal buffer."""
+        start = self._curve_start
+        length = self._head - start
+        if length >= self.capacity:
+            # Satu kurva lebih panjang dari seluruh buffer: buang separuh awalnya
+            drop = self.capacity // 2
+            self.overwritten_samples += drop
+            start += drop
+            length -= drop
+        self._evict(0, length)
+        self._pressures[:length] = self._pressures[start:start + length]
+        self._timestamps[:length] = self._timestamps[start:start + length]
+        self._curve_start = 0
+        self._head = length
+
+    def add_sample(self, pressure: int, now: float = None):
+        if now is None:
+            now = time.monotonic()
+
+        if self._curve_start is not None and now - self._last_sample > self.realtime_timeout:
+            self.finish(None)
+
+        if self._curve_start is None:
+            if self._head >= self.capacity:
+                self._head = 0
+            self._curve_start = self._head
+            self._curve_wall = time.time()
+            # Kurva lama di depan posisi tulis akan tertimpa kurva baru ini
+            self._evict(self._head, self.capacity)
+
+        if self._head >= self.capacity:
+            self._make_room()
+
+        head = self._head
+        self._pressures[head] = pressure
+        self._timestamps[head] = now
+        self._head = head + 1
+        self._last_sample = now
+        self.samples += 1
+
+    def on_packet(self, packet):
+        packet_type = type(packet)
+        if packet_type is RealtimePressure:
+            self.add_sample(packet.pressure)
+        elif packet_type is MeasurementResult or packet_type is ErrorReport:
+            self.finish(packet)
+
+    def poll(self, now: float = None):
+        """Menutup kurva yang berhenti mendapat sampel (dipanggil berkala)."""
+        if now is None:
+            now = time.monotonic()
+        if self._curve_start is not None and now - self._last_sample > self.realtime_timeout:
+            return self.finish(None)
+        return None
+
+    def finish(self, outcome):
+        """Menutup kurva aktif. Mengembalikan Curve atau None bila tidak ada."""
+        start = self._curve_start
+        if start is None:
+            return None
+        end = self._head
+        self._curve_start = None
+
+        self._seq += 1
+        self._live[self._seq] = (start, end)
+        self.curves += 1
+
+        curve = Curve(
+            self.device,
+            self._seq,
+            self._curve_wall,
+            _view(self._timestamps, start, end),
+            _view(self._pressures, start, end),
+            outcome,
+        )
+        if self.save_dir:
+            save_curve(curve, self.save_dir)
+        if self.on_curve is not None:
+            self.on_curve(curve)
+        return curve
+
+    def is_valid(self, curve: Curve) -> bool:
+        return curve.seq in self._live
+
+    def current(self):
+        """View sampel kurva yang sedang berjalan (timestamps, pressures)."""
+        if self._curve_start is None:
+            return None
+        return (
+            _view(self._timestamps, self._curve_start, self._head),
+            _view(self._pressures, self._curve_start, self._head),
+        )
+
+
+# ================= SIMPAN / BACA =================
+
+def outcome_code(outcome) -> int:
+    """
+    Kode hasil kurva: OUTCOME_RESULT untuk MeasurementResult, kode error
+    untuk ErrorReport, OUTCOME_NONE bila belum ada. Kurva dari load_curve()
+    sudah berisi kode (int) dan dikembalikan apa adanya.
+    """
+    if type(outcome) is MeasurementResult:
+        return OUTCOME_RESULT
+    if type(outcome) is ErrorReport:
+        return outcome.code
+    if isinstance(outcome, Integral):
+        return int(outcome)
+    return OUTCOME_NONE
+
+
+def curve_filename(curve: Curve) -> str:
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(curve.started_at))
+    device = curve.device.replace(os.sep, "_").replace("@", "_") or "bpm"
+    return f"{device}_{stamp}_{curve.seq:06d}{CURVE_SUFFIX}"
+
+
+def _curve_header(curve: Curve, n: int) -> bytes:
+    tag = curve.device.encode("utf-8")
+    return (CURVE_HEADER.pack(CURVE_MAGIC, CURVE_VERSION, n, curve.started_at, outcome_code(curve.outcome))
+            + CURVE_TAG_LENGTH.pack(len(tag)) + tag)
+
+
+def save_curve(curve: Curve, directory: str) -> str:
+    """
+    Format file: header CURVE_HEADER + tag alat, lalu timestamp relatif
+    (float64, detik sejak sampel pertama) dan tekanan (uint16), little-endian.
+    """
+    path = os.path.join(directory, curve_filename(curve))
+    n = len(curve.pressures)
+    t0 = curve.timestamps[0] if n else 0.0
+
+    if numpy is not None:
+        rel = numpy.asarray(curve.timestamps, dtype="<f8") - t0
+        pressures = numpy.asarray(curve.pressures, dtype="<u2")
+        with open(path, "wb") as f:
+            f.write(_curve_header(curve, n))
+            rel.tofile(f)
+            pressures.tofile(f)
+        return path
+
+    rel = array("d", (t - t0 for t in curve.timestamps))
+    pressures = array("H", curve.pressures)
+    if struct.pack("=H", 1) != struct.pack("<H", 1):
+        rel.byteswap()
+        pressures.byteswap()
+    with open(path, "wb") as f:
+        f.write(_curve_header(curve, n))
+        rel.tofile(f)
+        pressures.tofile(f)
+    return path
+
+
+def load_curve(path: str) -> Curve:
+    """Membaca file kurva. `outcome` berisi kode hasil (lihat outcome_code)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, n, started_at, outcome = CURVE_HEADER.unpack_from(data)
+    if magic != CURVE_MAGIC or version not in (1, CURVE_VERSION):
+        raise ValueError(f"Bukan file kurva BPMPRO: {path}")
+
+    # Nama file: <device>_<tanggal-jam>_<seq>.bpwf
+    device, _, seq = os.path.basename(path)[:-len(CURVE_SUFFIX)].rsplit("_", 2)
+    offset = CURVE_HEADER.size
+    if version >= 2:
+        (length,) = CURVE_TAG_LENGTH.unpack_from(data, offset)
+        offset += CURVE_TAG_LENGTH.size
+        # Tag asli dari header; versi 1 hanya punya tag yang sudah di-escape di nama file
+        device = data[offset:offset + length].decode("utf-8")
+        offset += length
+    if numpy is not None:
+        timestamps = numpy.frombuffer(data, dtype="<f8", count=n, offset=offset)
+        pressures = numpy.frombuffer(data, dtype="<u2", count=n, offset=offset + 8 * n)
+    else:
+        timestamps = array("d", data[offset:offset + 8 * n])
+        pressures = array("H", data[offset + 8 * n:offset + 10 * n])
+        if struct.pack("=H", 1) != struct.pack("<H", 1):
+            timestamps.byteswap()
+            pressures.byteswap()
+
+    return Curve(device, int(seq), started_at, timestamps, pressures, outcome)
+
+
+# ================= MAIN =================
+
+async def main(port: str, directory: str):
+    import asyncio
+
+    from session import open_session
+
+    session = await open_session(port)
+    capture = WaveformCapture(
+        port, save_dir=directory,
+        on_curve=lambda c: print(f"✔ Kurva #{c.seq}: {c.samples} sampel, {c.duration:.1f} s"),
+    )
+    session.add_listener(capture.on_packet)
+    try:
+        while not session.closed:
+            await asyncio.sleep(1)
+            capture.poll()
+    finally:
+        capture.finish(None)
+        await session.close()
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+
+    if len(sys.argv) < 3:
+        print("Pemakaian: python waveform.py <port> <direktori_output>")
+        sys.exit(1)
+    try:
+        asyncio.run(main(sys.argv[1], sys.argv[2]))
+    except KeyboardInterrupt:
+        print("\nProgram dihentikan oleh user.")